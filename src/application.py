@@ -3,13 +3,22 @@ from tkinter import *
 from tkinter import filedialog as fd, messagebox
 from gui import *
 
+import os
 import json
+import time
+import multiprocessing as mp
 
 import colors as col
 import presets as ps
 import fractal as frc
 import mandelbrot as man
 import julia as jul
+import realtime as rt
+import rendercache as rc
+import sidecar as sc
+import export as ex
+import poster as po
+import viewport as vp
 
 from drawer import *
 
@@ -63,7 +72,7 @@ class Application:
 			"Image parameters": {
 				"imageWidth": {
 					'inputtype': 'int',
-					'valrange':  (100, 4096, 100),
+					'valrange':  (100, 65536, 100),
 					'initvalue': 800,
 					'widget':    'TKCSpinbox',
 					'label':     'Width',
@@ -73,7 +82,7 @@ class Application:
 				},
 				"imageHeight": {
 					'inputtype': 'int',
-					'valrange':  (100, 4096, 100),
+					'valrange':  (100, 65536, 100),
 					'initvalue': 800,
 					'widget':    'TKCSpinbox',
 					'label':     'Height',
@@ -88,6 +97,14 @@ class Application:
 					'widget':    'TKCCheckbox',
 					'label':     'Autoscale',
 					'notify':     self.onAutoscale
+				},
+				"viewport": {
+					'inputtype': 'int',
+					'valrange':  (0, 1),
+					'initvalue': 0,
+					'widget':    'TKCCheckbox',
+					'label':     'Viewport',
+					'tooltip':   "Calculate only the visible part of the image at display resolution. Always used for images larger than 4096 x 4096 pixels"
 				}
 			},
 			"Fractal selection": {
@@ -117,7 +134,7 @@ class Application:
 				"drawMode": {
 					'inputtype': 'str',
 					'valrange':  [
-						'Vectorized', 'SQEM Recursive', 'SQEM Linear'
+						'Vectorized', 'SQEM Linear', 'Tiled', 'Progressive', 'Boundary tracing', 'Solid guessing'
 					],
 					'initvalue': 'Vectorized',
 					'widget':    'TKCListbox',
@@ -127,6 +144,14 @@ class Application:
 						'justify': 'left'
 					},
 				},
+				"guessSafety": {
+					'inputtype': 'int',
+					'valrange':  (0, 3, 1),
+					'initvalue': 1,
+					'widget':    'TKCSpinbox',
+					'label':     'Guess safety:',
+					'width':     8
+				},
 				'colorPalette': {
 					'inputtype': 'str',
 					'valrange':  list(col.colorTables.keys()),
@@ -162,12 +187,40 @@ class Application:
 		# Default color palette
 		# self.palette = 'Grey'
 
-		# Image drawer
+		# Image drawer. Drawer or virtual Viewport for large images, see onDraw()
 		self.draw = None
 
+		# Larger images are shown in a virtual viewport
+		self.maxDrawPixels = 4096 * 4096
+
+		# Cache of drawn images and iteration data. If a directory is specified,
+		# entries removed from memory are stored on disk
+		self.renderCache = rc.RenderCache(maxMemory=512 * 2**20, directory=None)
+
+		# Recently drawn views for undo/redo. Settings returned by getSettings() in JSON format
+		self.history = []
+		self.historyPos = -1
+		self.maxHistory = 100
+
+		# Real time zoom: zoom object, zoom center, direction (1 = in, -1 = out) and time of last frame
+		self.zoom = None
+		self.zoomPoint = (0, 0)
+		self.zoomDirection = 0
+		self.zoomTime = 0.0
+
+		# Zoom factor per second of real time zoom
+		self.zoomSpeed = 2.0
+
 		# Fractal definition file
 		self.filename = None
 
+		# Save image, iteration data and reference orbit with fractal definitions, see sidecar.py
+		self.saveSidecar = True
+
+		# Images are saved in background, see onImageSaveAs()
+		self.exporter = ex.ImageExporter()
+		self.exportFormat = 'PNG (fast)'
+
 		# Create GUI
 		self.gui = GUI(self, title, width, height, statusHeight=50, controlWidth=400)
 
@@ -183,9 +236,18 @@ class Application:
 		self.fileMenu.add_command(label="Exit", command=self.gui.mainWindow.quit)
 		self.menubar.add_cascade(label="File", menu=self.fileMenu)
 
+		# Edit menu
+		self.editMenu = Menu(self.menubar, tearoff=0)
+		self.editMenu.add_command(label="Undo", accelerator="Ctrl+Z", state="disabled", command=self.onUndo)
+		self.editMenu.add_command(label="Redo", accelerator="Ctrl+Y", state="disabled", command=self.onRedo)
+		self.menubar.add_cascade(label="Edit", menu=self.editMenu)
+		self.gui.mainWindow.bind('<Control-z>', lambda event: self.onUndo())
+		self.gui.mainWindow.bind('<Control-y>', lambda event: self.onRedo())
+
 		# Image menu
 		self.imageMenu = Menu(self.menubar, tearoff=0)
 		self.imageMenu.add_command(label="Save as ...", state="disabled", command=self.onImageSaveAs)
+		self.imageMenu.add_command(label="Refine selection", state="disabled", command=self.onRefine)
 		self.menubar.add_cascade(label="Image", menu=self.imageMenu)
 
 		self.gui.mainWindow.config(menu=self.menubar)
@@ -195,7 +257,7 @@ class Application:
 		self.fractal.settings.createMask(self.gui.controlFrame, startrow=self.fractalRow, padx=2, pady=3)
 
 		# Define selection handler
-		self.gui.setSelectionHandler(self.onPointSelected, self.onAreaSelected, self.onSelectionCancelled)
+		self.gui.setSelectionHandler(self.onPointSelected, self.onAreaSelected, self.onSelectionCancelled, self.onPan, self.onZoom)
 
 	def __getitem__(self, index: str):
 		return self.settings.get(index)
@@ -243,53 +305,87 @@ class Application:
 
 		return True
 	
+	# Return application and fractal settings
+	def getSettings(self) -> dict:
+		return {
+			'application': self.settings.getConfig(simple=True),
+			'fractal':     self.fractal.settings.getConfig(simple=True)
+		}
+
+	# Set application and fractal settings returned by getSettings()
+	def setSettings(self, js: dict):
+		for section in ('application', 'fractal'):
+			if section not in js:
+				raise KeyError(f"Missing section {section} in JSON")
+
+		# Files of older versions may contain the removed recursive SQEM draw mode
+		if js['application'].get('drawMode') == 'SQEM Recursive':
+			js['application']['drawMode'] = 'SQEM Linear'
+
+		print("Set application parameters")
+		self.settings.setConfig(js['application'], simple=True, checkmissing=True)
+
+		if self.settings['fractalType'] not in ('Mandelbrot', 'Julia'):
+			raise KeyError(f"Unknow fractal type {self.settings['fractalType']}")
+
+		self.fractal.settings.deleteMask()
+
+		# The fractal is only created again, if the type changes. The drawer shows the previous
+		# image as preview, if it has been drawn with the same fractal, see Drawer.showPreview()
+		fractalClass = man.Mandelbrot if self.settings['fractalType'] == 'Mandelbrot' else jul.Julia
+		if type(self.fractal) is not fractalClass:
+			self.fractal = fractalClass()
+
+		# Files of older versions contain the perturbation flag instead of the engine
+		if js['fractal'].pop('perturbation', 0) == 1:
+			js['fractal']['engine'] = 'Perturbation'
+
+		self.fractal.settings.setConfig(js['fractal'], simple=True, checkmissing=True)
+		self.fractal.settings.createMask(self.gui.controlFrame, startrow=self.fractalRow, padx=2, pady=3)
+
 	def saveSettingsToFile(self, filename: str) -> bool:
 		try:
-			js = {
-				'application': self.settings.getConfig(simple=True),
-				'fractal':     self.fractal.settings.getConfig(simple=True)
-			}
+			js = self.getSettings()
 
 			with open(filename, "w") as outputFile:
 				outputFile.write(tkc.TKConfigure.toJSON(js))
-				return True
-			
+
 		except Exception as e:
 			print(e)
 			messagebox.showerror("Error", "Cannot save fractal settings to file")
 			return False
-		
+
+		# The fractal definition is usable without sidecar
+		if self.saveSidecar and self.draw is not None:
+			try:
+				self.draw.saveSidecar(sc.sidecarFile(filename))
+			except Exception as e:
+				print("ERROR: Cannot save sidecar file", e)
+
+		return True
+
+	# Load fractal settings. If a sidecar file exists, the fractal is shown
+	# immediately from its image or iteration data, see Drawer.drawSidecar()
 	def loadSettingsFromFile(self, filename: str) -> bool:
 		try:
 			with open(filename, "r") as inputFile:
 				js = json.load(inputFile, object_hook=tkc.TKConfigure._decodeJSON)
-
-				for section in ('application', 'fractal'):
-					if section not in js:
-						raise KeyError(f"Missing section {section} in JSON")
-
-				print("Set application parameters")
-				self.settings.setConfig(js['application'], simple=True, checkmissing=True)
-
-				if self.settings['fractalType'] not in ('Mandelbrot', 'Julia'):
-					raise KeyError(f"Unknow fractal type {self.settings['fractalType']}")
-				
-				self.fractal.settings.deleteMask()
-
-				if self.settings['fractalType'] == 'Mandelbrot':
-					self.fractal = man.Mandelbrot()
-				else:
-					self.fractal = jul.Julia()
-
-				self.fractal.settings.setConfig(js['fractal'], simple=True, checkmissing=True)
-				self.fractal.settings.createMask(self.gui.controlFrame, startrow=self.fractalRow, padx=2, pady=3)
-
-				return True
+				self.setSettings(js)
 
 		except Exception as e:
 			print("ERROR", e)
 			messagebox.showerror("Error", "Cannot read fractal settings from file")
 			return False
+
+		try:
+			sidecar = sc.Sidecar.load(sc.sidecarFile(filename))
+		except Exception as e:
+			print("ERROR: Cannot read sidecar file", e)
+			sidecar = None
+		if sidecar is not None:
+			self.onDraw(sidecar=sidecar)
+
+		return True
 	
 
 	###########################################################################
@@ -322,12 +418,68 @@ class Application:
 		if self.saveSettingsToFile(fileName):
 			self.filename = fileName
 
-	# Save image
+	# Save image. The image is encoded in background, the file type selects format and compression
 	def onImageSaveAs(self):
-		fileTypes = [('PNG Image', '*.png')]
-		fileName = fd.asksaveasfilename(filetypes=fileTypes, initialfile="image.png", defaultextension="png")
-		if fileName is not None and self.draw is not None and self.draw.image is not None:
-			self.draw.image.save(fileName, "png")
+		if isinstance(self.draw, vp.Viewport):
+			self.onPosterSaveAs()
+			return
+
+		fileTypes = [(name, '*' + extension) for name, (extension, _, _) in ex.formats.items()]
+		fileTypes.sort(key=lambda fileType: fileType[0] != self.exportFormat)
+		typeVar = StringVar(value=self.exportFormat)
+		fileName = fd.asksaveasfilename(filetypes=fileTypes, initialfile="image", defaultextension=".png", typevariable=typeVar)
+		if not fileName or self.draw is None or not self.draw.bImage:
+			return
+
+		# The selected file type is ignored, if the file name has the extension of another format
+		fileFormat = typeVar.get() if typeVar.get() in ex.formats else self.exportFormat
+		if ex.formats[fileFormat][0] != os.path.splitext(fileName)[1].lower():
+			fileFormat = ex.getFormat(fileName, fileFormat)
+		self.exportFormat = fileFormat
+
+		self.gui.statusFrame.setFieldValue('drawing', f"Saving {os.path.basename(fileName)} ...")
+		self.checkExport(self.exporter.submit(self.draw.imageMap, fileName, fileFormat), fileName)
+
+	# Calculate image of the viewport in full resolution, see poster.py. The image is calculated
+	# and written tile by tile in a separate process. The calculation kernels must not run in a
+	# background thread while the GUI thread is drawing
+	def onPosterSaveAs(self):
+		fileTypes = [('Tiled TIFF', '*.tif'), ('Deep Zoom', '*.dzi')]
+		fileName = fd.asksaveasfilename(filetypes=fileTypes, initialfile="image", defaultextension=".tif")
+		if not fileName:
+			return
+
+		w, h = self.settings.getValues(['imageWidth', 'imageHeight'])
+		js = json.loads(tkc.TKConfigure.toJSON(self.getSettings()), object_hook=tkc.TKConfigure._decodeJSON)
+		process = mp.get_context('spawn').Process(target=po.renderPoster, args=(js, fileName, w, h), daemon=True)
+		process.start()
+
+		self.gui.statusFrame.setFieldValue('drawing', f"Rendering {os.path.basename(fileName)} ...")
+		self.checkPoster(process, fileName)
+
+	# Show result of poster process in status bar
+	def checkPoster(self, process, fileName: str):
+		if process.is_alive():
+			self.gui.mainWindow.after(500, self.checkPoster, process, fileName)
+		elif process.exitcode != 0:
+			self.gui.statusFrame.setFieldValue('drawing', "Rendering failed")
+			messagebox.showerror("Error", f"Cannot render image {fileName}")
+		else:
+			self.gui.statusFrame.setFieldValue('drawing', f"Saved {os.path.basename(fileName)}")
+
+	# Show result of background image export in status bar
+	def checkExport(self, future, fileName: str):
+		if future is None:
+			self.gui.statusFrame.setFieldValue('drawing', "Export queue full")
+			messagebox.showwarning("Warning", f"Cannot save {os.path.basename(fileName)}, please wait until the pending exports are finished")
+		elif not future.done():
+			self.gui.mainWindow.after(100, self.checkExport, future, fileName)
+		elif future.exception() is not None:
+			print("ERROR", future.exception())
+			self.gui.statusFrame.setFieldValue('drawing', "Saving failed")
+			messagebox.showerror("Error", f"Cannot save image to file {fileName}")
+		else:
+			self.gui.statusFrame.setFieldValue('drawing', f"Saved {os.path.basename(fileName)}")
 
 
 	###########################################################################
@@ -336,14 +488,35 @@ class Application:
 
 	def onPointSelected(self, x, y):
 		self.gui.controlFrame.btnApply.config(state=NORMAL)
+		self.imageMenu.entryconfig('Refine selection', state="disabled")
 		print(f"Selected point {x}, {y}")
 
 	def onAreaSelected(self, x1, y1, x2, y2):
 		self.gui.controlFrame.btnApply.config(state=NORMAL)
+		if isinstance(self.draw, Drawer):
+			self.imageMenu.entryconfig('Refine selection', state="normal")
 		print(f"Selected area: {x1},{y1} - {x2},{y2}")
 
 	def onSelectionCancelled(self):
 		self.gui.controlFrame.btnApply.config(state=DISABLED)
+		self.imageMenu.entryconfig('Refine selection', state="disabled")
+
+	# Image moved with the mouse, redraw only the exposed parts
+	def onPan(self, dx: float, dy: float):
+		if isinstance(self.draw, vp.Viewport):
+			self.draw.panFractal(dx, dy)
+			return
+		if self.draw is None or self.draw.bDrawing:
+			return
+		print(f"Move fractal by {dx}, {dy} pixels")
+		self.gui.drawFrame.clearCanvas()
+		self.onStatusUpdate({'drawing': 'Drawing ...'})
+		if self.draw.panFractal(dx, dy, onStatus=self.onStatusUpdate):
+			self.onStatusUpdate({'drawing': "{:.2f} s".format(self.draw.calcTime)})
+			self.addHistory()
+		elif self.draw.cancel:
+			self.onStatusUpdate({'drawing': "Cancelled"})
+		self.gui.selection.enable(scalefactor=self.draw.scaleFactor)
 
 
 	###########################################################################
@@ -359,9 +532,9 @@ class Application:
 			x1, y1, x2, y2 = self.gui.selection.getArea()
 			print(f"x1={x1}, y1={y1}, x2={x2}, y2={y2}")
 			size   = self.fractal.mapWH(x2-x1+1, y2-y1+1, imageWidth, imageHeight)
-			corner = self.fractal.mapXY(x1, y1, imageWidth, imageHeight)
+			corner, cornerLo = self.fractal.mapXYDD(x1, y1, imageWidth, imageHeight)
 			print("corner=", corner, "size=", size)
-			self.fractal.setDimensions(corner, size)
+			self.fractal.setDimensions(corner, size, cornerLo=cornerLo)
 
 		elif self.gui.selection.isPointSelected():
 			if self.settings['fractalType'] == 'Mandelbrot':
@@ -376,21 +549,112 @@ class Application:
 			self.settings.apply()
 			self.fractal.settings.apply()
 
-	# Draw button pressed
-	def onDraw(self):
+	# Draw selected area again with the current settings, i.e. with higher maximum number
+	# of iterations or more oversampling. The rest of the image is kept, see Drawer.refineArea()
+	def onRefine(self):
+		if not isinstance(self.draw, Drawer) or self.draw.bDrawing or not self.gui.selection.isAreaSelected():
+			return
+		x1, y1, x2, y2 = self.gui.selection.getArea()
+		self.gui.selection.reset(enabled=True)
+		self.gui.controlFrame.btnApply.config(state=DISABLED)
+		self.imageMenu.entryconfig('Refine selection', state="disabled")
+
+		self.onStatusUpdate({'drawing': 'Refining ...'})
+		if self.draw.refineArea(x1, y1, x2, y2, onStatus=self.onStatusUpdate):
+			self.onStatusUpdate({'drawing': "{:.2f} s".format(self.draw.calcTime)})
+		self.gui.selection.enable(scalefactor=self.draw.scaleFactor)
+
+	# Draw button pressed. sidecar is the Sidecar of a loaded fractal definition
+	def onDraw(self, sidecar: sc.Sidecar | None = None):
 		self.gui.drawFrame.clearCanvas()
 		self.gui.selection.reset()
 
 		self.gui.statusFrame.setFieldValue('drawing', 'Drawing ...')
 		self.onStatusUpdate({'drawing': 'Drawing ...'})
 		w, h = self.settings.getValues(['imageWidth', 'imageHeight'])
-		self.draw = Drawer(self, w, h)
-		self.draw.drawFractal(self.fractal, 0, 0, w, h, onStatus=self.onStatusUpdate)
-		self.onStatusUpdate({'drawing': "{:.2f} s".format(self.draw.calcTime)})
+		previous = self.draw
+		if isinstance(previous, vp.Viewport):
+			previous.close()
+
+		if self.settings['viewport'] or w * h > self.maxDrawPixels:
+			# Tiles of the viewport are calculated in the event loop
+			self.draw = vp.Viewport(self, w, h)
+			if self.draw.drawFractal(self.fractal, onStatus=self.onStatusUpdate):
+				self.addHistory()
+		else:
+			self.draw = Drawer(self, w, h, cache=self.renderCache)
+			if self.draw.drawFractal(self.fractal, 0, 0, w, h, onStatus=self.onStatusUpdate, preview=previous, sidecar=sidecar):
+				self.onStatusUpdate({'drawing': "{:.2f} s".format(self.draw.calcTime)})
+				self.addHistory()
+			elif self.draw.cancel:
+				self.onStatusUpdate({'drawing': "Cancelled"})
 		
 		self.imageMenu.entryconfig('Save as ...', state="normal")
 		self.gui.selection.enable(scalefactor=self.draw.scaleFactor)
 
+	# Real time zoom started (direction 1 or -1), moved (direction None) or stopped (direction 0)
+	def onZoom(self, x: int, y: int, direction: int | None):
+		if direction is None:
+			self.zoomPoint = (x, y)
+		elif direction == 0:
+			if self.zoom is not None:
+				# Draw final image with selected draw mode
+				self.zoom = None
+				self.onDraw()
+		elif self.draw is not None and not self.draw.bDrawing and not isinstance(self.draw, vp.Viewport):
+			self.zoom = rt.RealtimeZoom(self.draw, self.settings['fractalType'])
+			self.zoomPoint = (x, y)
+			self.zoomDirection = direction
+			self.zoomTime = time.perf_counter()
+			self.gui.mainWindow.after(1, self.onZoomFrame)
+
+	# Draw next frame of real time zoom
+	def onZoomFrame(self):
+		if self.zoom is None:
+			return
+
+		now = time.perf_counter()
+		factor = self.zoomSpeed ** ((now - self.zoomTime) * self.zoomDirection)
+		self.zoomTime = now
+		if not self.zoom.frame(factor, *self.zoomPoint):
+			self.onStatusUpdate({'drawing': 'Max. zoom depth'})
+			return
+
+		self.gui.mainWindow.after(1, self.onZoomFrame)
+
+	# Add current view to history. Views after the current history position are removed
+	def addHistory(self):
+		js = tkc.TKConfigure.toJSON(self.getSettings())
+		if self.historyPos >= 0 and self.history[self.historyPos] == js:
+			return
+		del self.history[self.historyPos+1:]
+		self.history.append(js)
+		if len(self.history) > self.maxHistory:
+			del self.history[0]
+		self.historyPos = len(self.history)-1
+		self.updateHistoryMenu()
+
+	def updateHistoryMenu(self):
+		self.editMenu.entryconfig('Undo', state="normal" if self.historyPos > 0 else "disabled")
+		self.editMenu.entryconfig('Redo', state="normal" if self.historyPos < len(self.history)-1 else "disabled")
+
+	# Draw view at history position. Recently drawn views are taken from the render cache
+	def drawHistory(self, pos: int):
+		if pos < 0 or pos >= len(self.history) or (self.draw is not None and self.draw.bDrawing):
+			return
+		self.historyPos = pos
+		self.setSettings(json.loads(self.history[pos], object_hook=tkc.TKConfigure._decodeJSON))
+		self.updateHistoryMenu()
+		self.onDraw()
+
+	# Undo menu item selected
+	def onUndo(self):
+		self.drawHistory(self.historyPos-1)
+
+	# Redo menu item selected
+	def onRedo(self):
+		self.drawHistory(self.historyPos+1)
+
 	# Cancel button pressed
 	def onCancel(self):
 		if self.draw is not None:
@@ -452,6 +716,8 @@ class Application:
 	def onStatusUpdate(self, statusInfo: dict):
 		if 'drawing' in statusInfo:
 			self.gui.statusFrame.setFieldValue('drawing', statusInfo['drawing'])
+		if 'engine' in statusInfo:
+			self.gui.statusFrame.setFieldValue('engine', statusInfo['engine'])
 		if 'progress' in statusInfo:
 			self.gui.statusFrame.setFieldValue('progress', statusInfo['progress'])
 			# self.gui.statusFrame.setProgress(statusInfo['progress'])
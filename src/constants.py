@@ -27,6 +27,24 @@ FO_BLINNPHONG_3D = 8      # Blinn/Phong 3D shading
 FO_SHADING       = 12     # Bitmask: Combination of FO_BLINNPHONG_3D, FO_SIMPLE_3D
 FO_NOSHADING     = 3      # Bitmask: No 3D shading
 
+# Symmetries of fractals
+FS_NONE      = 0          # No symmetry
+FS_CONJUGATE = 1          # Symmetric to the real axis: f(conj(z)) = conj(f(z))
+FS_POINT     = 2          # Symmetric to the origin: f(-z) = f(z)
+
+# Iteration data of a point, returned by the point calculation functions
+ID_ITER      = 0          # Smooth iteration count. ID_INSIDE or ID_ORBIT for points inside the set
+ID_NZ        = 1          # abs(Z)^2 at bailout. Iteration of orbit detection for ID_ORBIT
+ID_NORMAL_RE = 2          # Normal vector Z/D for 3D shading. Orbit length for ID_ORBIT
+ID_NORMAL_IM = 3
+ID_DIST      = 4          # Normalized distance to fractal
+ID_STRIPE    = 5          # Stripe average
+ID_POT       = 6          # Potential
+ID_SIZE      = 7          # Number of values
+
+ID_INSIDE    = -1.0       # Point inside the set
+ID_ORBIT     = -2.0       # Point inside the set with detected orbit
+
 
 #####################################################################
 # Numeric constants
@@ -0,0 +1,113 @@
+#
+# Double-double arithmetic
+#
+# A double-double number is the unevaluated sum hi + lo of two float64 values
+# with |lo| <= ulp(hi)/2. This gives about 106 bits (32 decimal digits) of
+# precision, twice the precision of float64, while the exponent range stays
+# the same.
+#
+# All functions take and return the parts hi, lo as separate float values, so
+# numba can keep them in registers. Complex double-double numbers are stored
+# in arrays with 4 elements [real hi, real lo, imag hi, imag lo].
+#
+# References:
+#
+#   - T.J. Dekker: A floating-point technique for extending the available precision, 1971
+#   - Y. Hida, X.S. Li, D.H. Bailey: Library for double-double and quad-double arithmetic, 2007
+#
+
+import numpy as np
+import numba as nb
+
+
+# Dekker's split constant 2^27 + 1
+DD_SPLITTER = 134217729.0
+
+# Error free sum of a and b: a + b = s + e
+@nb.njit(cache=False)
+def twoSum(a: float, b: float) -> tuple:
+	s = a + b
+	bb = s - a
+	e = (a - (s - bb)) + (b - bb)
+	return s, e
+
+# Error free sum of a and b, requires |a| >= |b|
+@nb.njit(cache=False)
+def quickTwoSum(a: float, b: float) -> tuple:
+	s = a + b
+	e = b - (s - a)
+	return s, e
+
+# Split a into two 26 bit values: a = hi + lo
+@nb.njit(cache=False)
+def split(a: float) -> tuple:
+	t = DD_SPLITTER * a
+	hi = t - (t - a)
+	return hi, a - hi
+
+# Error free product of a and b: a * b = p + e
+@nb.njit(cache=False)
+def twoProd(a: float, b: float) -> tuple:
+	p = a * b
+	ah, al = split(a)
+	bh, bl = split(b)
+	e = ((ah * bh - p) + ah * bl + al * bh) + al * bl
+	return p, e
+
+# Sum of double-double numbers a and b
+@nb.njit(cache=False)
+def add(ah: float, al: float, bh: float, bl: float) -> tuple:
+	s, e = twoSum(ah, bh)
+	e += al + bl
+	return quickTwoSum(s, e)
+
+# Difference of double-double numbers a and b
+@nb.njit(cache=False)
+def sub(ah: float, al: float, bh: float, bl: float) -> tuple:
+	return add(ah, al, -bh, -bl)
+
+# Product of double-double numbers a and b
+@nb.njit(cache=False)
+def mul(ah: float, al: float, bh: float, bl: float) -> tuple:
+	p, e = twoProd(ah, bh)
+	e += ah * bl + al * bh
+	return quickTwoSum(p, e)
+
+# Product of double-double number a and float b
+@nb.njit(cache=False)
+def mulFloat(ah: float, al: float, b: float) -> tuple:
+	p, e = twoProd(ah, b)
+	e += al * b
+	return quickTwoSum(p, e)
+
+# Square of double-double number a
+@nb.njit(cache=False)
+def sqr(ah: float, al: float) -> tuple:
+	p, e = twoProd(ah, ah)
+	e += 2.0 * ah * al
+	return quickTwoSum(p, e)
+
+###############################################################################
+#
+# Create array with equally spaced double-double values start + i * step
+#
+#   start - First value
+#   step - Distance between values
+#   n - Number of values
+#   startLo - Low part of the first value
+#
+# The values are calculated from the exact products i * step, so they don't
+# accumulate rounding errors.
+#
+# Returns:
+#
+#   Array with shape (n, 2), column 0 = hi, column 1 = lo
+#
+###############################################################################
+@nb.njit(cache=False)
+def linspace(start: float, step: float, n: int, startLo: float = 0.0) -> np.ndarray:
+	T = np.zeros((n, 2), dtype=np.float64)
+	for i in range(n):
+		p, e = twoProd(float(i), step)
+		T[i, 0], T[i, 1] = add(start, startLo, p, e)
+	return T
@@ -0,0 +1,145 @@
+#
+# Reconstruction filters for oversampling
+#
+# Oversampled images are reduced to the image size with a separable filter.
+# The sub-samples are converted to linear light before they are weighted,
+# so bright and dark details are not darkened by averaging sRGB values.
+# The image is reduced in strips of rows, see Drawer.drawFiltered(). Only
+# the sub-samples of a strip and a float buffer of the horizontally filtered
+# strip are held in memory. The result is written directly into the uint8
+# image map.
+#
+# The box filter is applied inside the kernels, see Engine.calculate(). The
+# kernels average the sub-samples in linear light, too, see addLinear().
+#
+# References:
+#
+#   - D. Mitchell, A. Netravali: Reconstruction Filters in Computer Graphics, 1988
+#
+
+import math
+
+import numpy as np
+import numba as nb
+
+
+# Filter functions of distance x in pixels
+def tentFilter(x: np.ndarray) -> np.ndarray:
+	return np.maximum(1.0 - np.abs(x), 0.0)
+
+# Mitchell-Netravali filter with B = C = 1/3
+def mitchellFilter(x: np.ndarray, B: float = 1/3, C: float = 1/3) -> np.ndarray:
+	x = np.abs(x)
+	near = ((12 - 9*B - 6*C) * x**3 + (-18 + 12*B + 6*C) * x**2 + (6 - 2*B)) / 6
+	far = ((-B - 6*C) * x**3 + (6*B + 30*C) * x**2 + (-12*B - 48*C) * x + (8*B + 24*C)) / 6
+	return np.where(x < 1, near, np.where(x < 2, far, 0.0))
+
+def lanczos3Filter(x: np.ndarray) -> np.ndarray:
+	return np.where(np.abs(x) < 3, np.sinc(x) * np.sinc(x / 3), 0.0)
+
+# Filter functions and radius in pixels by filter name
+filters = {
+	'Tent':     (tentFilter, 1.0),
+	'Mitchell': (mitchellFilter, 2.0),
+	'Lanczos3': (lanczos3Filter, 3.0)
+}
+
+###############################################################################
+#
+# Create filter weights
+#
+#   filterName - Name of filter, see filters
+#   oversampling - Number of sub-samples per pixel
+#
+# Sub-sample k of a line is located at pixel position (k + 0.5) / oversampling - 0.5.
+# The weights are the same for every pixel, the sub-sample of tap t of
+# pixel i is i * oversampling + first + t.
+#
+# Returns:
+#
+#   Tuple (weights, first) with normalized weights
+#
+###############################################################################
+def createFilterWeights(filterName: str, oversampling: int) -> tuple[np.ndarray, int]:
+	filterFnc, radius = filters[filterName]
+	first = math.floor((0.5 - radius) * oversampling)
+	last = math.ceil((radius + 0.5) * oversampling) - 1
+	taps = np.arange(first, last+1)
+	weights = filterFnc((taps + 0.5) / oversampling - 0.5)
+	return (weights / weights.sum(), first)
+
+# Pixels outside of a pixel range, which contribute to the filtered pixels, as tuple (before, after)
+def getMargins(weights: np.ndarray, first: int, oversampling: int) -> tuple[int, int]:
+	return (-(first // oversampling), (first + weights.shape[0] - 1) // oversampling)
+
+# Conversion table from sRGB values 0-255 to linear light
+srgbToLinear = np.array([c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4 for c in np.arange(256) / 255.0],
+						dtype=np.float32)
+
+# Convert linear light value to sRGB value 0-255, values outside of 0-1 are clipped
+@nb.njit(cache=False)
+def linearToSrgb(c: float) -> int:
+	c = min(max(c, 0.0), 1.0)
+	c = c * 12.92 if c <= 0.0031308 else 1.055 * c ** (1.0 / 2.4) - 0.055
+	return int(c * 255.0 + 0.5)
+
+# Add linear light values of sRGB color to sums A. Used for the box filter inside
+# the kernels, see storeAverage()
+@nb.njit(cache=False)
+def addLinear(A: np.ndarray, color: np.ndarray):
+	for c in range(3):
+		A[c] += srgbToLinear[color[c]]
+
+# Store average of n colors summed up by addLinear() as sRGB color in R
+@nb.njit(cache=False)
+def storeAverage(A: np.ndarray, n: int, R: np.ndarray):
+	for c in range(3):
+		R[c] = linearToSrgb(A[c] / n)
+
+###############################################################################
+#
+# Reduce strip of sub-samples
+#
+#   subMap - Sub-samples with shape (rows * oversampling, columns * oversampling, 3)
+#     of pixel rows subY .. and pixel columns subX ..
+#   subX, subY - Pixel coordinates of the first sub-sample
+#   weights, first - Filter weights, see createFilterWeights()
+#   oversampling - Number of sub-samples per pixel in each direction
+#   lut - Conversion table sRGB to linear light
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   x1, y1, x2, y2 - Pixels to be calculated, end points included
+#
+# Sub-samples outside of the image are replaced by the nearest sub-sample
+# of the image. subMap must contain all other sub-samples of the filter
+# taps, see getMargins(). Rows are filtered horizontally into a float
+# buffer, then the buffer is filtered vertically.
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def reduceStrip(subMap: np.ndarray, subX: int, subY: int, weights: np.ndarray, first: int, oversampling: int, lut: np.ndarray,
+				imageMap: np.ndarray, x1: int, y1: int, x2: int, y2: int):
+	height, width = imageMap.shape[:2]
+	maxX = width * oversampling - 1
+	maxY = height * oversampling - 1
+	x0 = subX * oversampling
+	y0 = subY * oversampling
+	taps = weights.shape[0]
+
+	# Horizontal pass
+	rows = subMap.shape[0]
+	buffer = np.zeros((rows, x2-x1+1, 3), dtype=np.float32)
+	for r in nb.prange(rows):
+		for x in range(x1, x2+1):
+			for t in range(taps):
+				k = min(max(x * oversampling + first + t, 0), maxX) - x0
+				for c in range(3):
+					buffer[r, x-x1, c] += weights[t] * lut[subMap[r, k, c]]
+
+	# Vertical pass
+	for y in nb.prange(y1, y2+1):
+		for x in range(x2-x1+1):
+			for c in range(3):
+				value = 0.0
+				for t in range(taps):
+					value += weights[t] * buffer[min(max(y * oversampling + first + t, 0), maxY) - y0, x, c]
+				imageMap[y, x1+x, c] = linearToSrgb(value)
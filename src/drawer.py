@@ -1,6 +1,7 @@
 
+import time
+import math
 from typing import Type
-from PIL import Image as Img
 from PIL import ImageTk
 
 import numpy as np
@@ -8,44 +9,98 @@ import numba as nb
 
 import colors as col
 import fractal as frc
-import mandelbrot as man
-import julia as jul
+import engine as eng
+import drawmodes as dm
+import downsample as ds
+import rendercache as rc
+import reforbit as ro
+import sidecar as sc
+import export as ex
+
+from constants import *
 
 
 class Drawer:
 
-	def __init__(self, app: object, width: int, height: int):
+	def __init__(self, app: object, width: int, height: int, cache: rc.RenderCache | None = None):
 		self.app      = app
+		self.cache    = cache
 		self.bDrawing = False
 		self.cancel   = False
 		self.width    = width
 		self.height   = height
 		self.minLen   = -1
 		self.maxLen   = -1
-		self.image    = None
+		self.bImage   = False
+		self.fractal  = None
+		self.drawMode = None
+
+		# Fractal area (corner, size, cornerLo) of the image, set by drawFractal(), see Fractal.getCornerDD()
+		self.area = None
+
+		# Cache keys (iteration data, image) of the completely drawn image, see getCacheKeys()
+		self.cacheKeys = None
+
+		# Parts of the image have been drawn with other settings than the rest, see refineArea()
+		self.bRefined = False
 
 		# Create color table
 		defColor = col.str2rgb(app['defColor'])
 		self.palette = col.createPalette(app['colorPalette'], defColor=defColor)
 
-		self.iterFnc = {
-			'Mandelbrot': man.calculateVectorZ2,
-			'Julia': jul.calculateVectorZ2
-		}
+		# Calculation engine, selected in drawFractal()
+		self.engine = None
 
-		self.iterFncPert = {
-			'Mandelbrot': man.calculateVectorZ2Pert,
-			'Julia': None	# To be implemented
-		}
+		# Iteration data of drawing modes working on iteration data, see ID_xxx constants
+		self.dataMap = None
+		self.bDataDrawn = False
+
+		# Calculate only the unique part of symmetric fractals, see drawSymmetric()
+		self.useSymmetry = True
 
 		self.drawFnc = {
 			'Vectorized': self.drawVectorized,
-			'SQEM Recursive': self.drawSquareEstimationRec,
-			'SQEM Linear': self.drawSquareEstimation
+			'SQEM Linear': self.drawSquareEstimation,
+			'Tiled': self.drawTiled,
+			'Progressive': self.drawProgressive,
+			'Boundary tracing': self.drawBoundaryTrace,
+			'Solid guessing': self.drawGrid
 		}
 
+		# Tile size for tiled drawing, block size of 1st pass of progressive drawing
+		self.tileSize = 64
+		self.blockSize = 8
+
+		# Tile size for boundary tracing. Larger tiles need less calculated tile borders
+		self.traceTileSize = 256
+
+		# Distance of calculated grid pixels of solid guessing
+		self.gridStep = 16
+
+		# Number of rows reduced at once by oversampling filters, see drawFiltered()
+		self.stripRows = 16
+		self.oversampling = 1
+		self.filterWeights = None
+
+		# Maximum deviation of moved fractal area from whole pixels in pixels, see panFractal()
+		self.maxPanError = 0.01
+
+		# Minimum time between updates of the image drawn over a preview in seconds, see showPreview()
+		self.refreshTime = 0.25
+		self.bRefresh = False
+		self.lastRefresh = 0.0
+
 		self.canvas = app.gui.drawFrame.canvas
 
+		# Photo image of the display size and its canvas item. Both are kept and
+		# updated in place, see updateDisplay()
+		self.tkImage = None
+		self.canvasImage = None
+		self.scaleFactor = 1.0
+
+		# Areas changed since the last display update while drawing, see showProgress()
+		self.dirty = []
+
 		# Adjust canvas size
 		if width != self.canvas.winfo_reqwidth() or height != self.canvas.winfo_reqheight():
 			self.canvas.configure(width=width, height=height, scrollregion=(0, 0, width, height))
@@ -53,54 +108,88 @@ class Drawer:
 		# Create graphics environment
 		self.imageMap = np.zeros([height, width, 3], dtype=np.uint8)
 
-	@staticmethod
-	@nb.njit(cache=False)
-	def getLineColor(x1: int, y1: int, x2: int, y2: int, imageMap: np.ndarray) -> np.ndarray:
-		bUnique = 2
-		if y1 == y2 and np.all(imageMap[y1, x1:x2+1] == imageMap[y1,x1,:]):
-			bUnique = 1
-		elif x1 == x2 and np.all(imageMap[y1:y2+1, x1] == imageMap[y1,x1,:]):
-			bUnique = 1
-		
-		# Return [ red, green, blue, bUnique ] of start point of line
-		return np.append(imageMap[y1, x1], bUnique)
-
+	# Show image map on canvas. If scale is 1, large images are reduced to fit in the drawing frame
 	def showImage(self, scale: int):
-		if self.image is not None:
-			maxImageRes = max(self.width, self.height)
-			minFrameRes = min(self.app.gui.drawFrame.winfo_width(), self.app.gui.drawFrame.winfo_height())
-			if scale == 1 and maxImageRes > minFrameRes:
-				# Reduce image size to fit in drawing frame if autoScale=1
-				self.scaleFactor = minFrameRes / maxImageRes
-				newWidth = int(self.width * self.scaleFactor)
-				newHeight = int(self.height * self.scaleFactor)
-				self.canvas.configure(width=newWidth, height=newHeight, scrollregion=(0, 0, newWidth, newHeight))
-				self.zoomImage = self.image.resize((newWidth, newHeight))
-				self.tkImage = ImageTk.PhotoImage(self.zoomImage)
-			else:
-				self.scaleFactor = 1.0
-				self.canvas.configure(width=self.width, height=self.height, scrollregion=(0, 0, self.width, self.height))
-				self.tkImage = ImageTk.PhotoImage(self.image)
-			self.canvas.create_image(0, 0, image=self.tkImage, state='normal', anchor='nw')
-			self.canvas.update()
+		if not self.bImage:
+			return
 
-	def drawFractal(self, fractal: Type[frc.Fractal], x: int, y: int, width: int = -1, height: int = -1, onStatus=None):
+		maxImageRes = max(self.width, self.height)
+		minFrameRes = min(self.app.gui.drawFrame.winfo_width(), self.app.gui.drawFrame.winfo_height())
+		if scale == 1 and maxImageRes > minFrameRes:
+			self.scaleFactor = minFrameRes / maxImageRes
+		else:
+			self.scaleFactor = 1.0
+		displaySize = (int(self.width * self.scaleFactor), int(self.height * self.scaleFactor))
+
+		if self.tkImage is None or (self.tkImage.width(), self.tkImage.height()) != displaySize:
+			self.tkImage = ImageTk.PhotoImage('RGB', displaySize)
+			self.canvas.configure(width=displaySize[0], height=displaySize[1], scrollregion=(0, 0, *displaySize))
+		self.dirty = []
+		self.updateDisplay(0, 0, self.width-1, self.height-1)
+
+		# The canvas item is deleted, when the canvas is cleared
+		if self.canvasImage is None or self.canvas.type(self.canvasImage) is None:
+			self.canvasImage = self.canvas.create_image(0, 0, image=self.tkImage, state='normal', anchor='nw')
+		else:
+			self.canvas.itemconfigure(self.canvasImage, image=self.tkImage)
+		self.canvas.update()
+
+	###############################################################################
+	#
+	# Update area of the displayed image
+	#
+	#   x1, y1, x2, y2 - Area of the image map, end points included
+	#
+	# Only the area is converted and copied into the photo image, so the
+	# costs depend on the size of the area. Rows of the image map are
+	# reversed by the raw decoder of PIL while converting, see export.toImage().
+	# For reduced images the display pixels covering the area are resampled
+	# from the area and a margin for the resampling filter.
+	#
+	###############################################################################
+	def updateDisplay(self, x1: int, y1: int, x2: int, y2: int):
+		displayWidth, displayHeight = self.tkImage.width(), self.tkImage.height()
+		if self.scaleFactor == 1.0:
+			tile = ex.toImage(self.imageMap[y1:y2+1, x1:x2+1])
+			dx, dy = x1, self.height-1-y2
+		else:
+			# Display size is rounded, so the scale factors of width and height differ slightly
+			sx, sy = displayWidth / self.width, displayHeight / self.height
+			dx, dy = int(x1 * sx), int((self.height-1-y2) * sy)
+			dx2, dy2 = min(math.ceil((x2+1) * sx), displayWidth), min(math.ceil((self.height-y1) * sy), displayHeight)
+			if dx2 <= dx or dy2 <= dy:
+				return
+			margin = math.ceil(2 / self.scaleFactor) + 1
+			mx1, mx2 = max(x1-margin, 0), min(x2+margin, self.width-1)
+			my1, my2 = max(y1-margin, 0), min(y2+margin, self.height-1)
+			top = self.height-1-my2
+			box = (max(dx / sx - mx1, 0), max(dy / sy - top, 0), min(dx2 / sx - mx1, mx2-mx1+1), min(dy2 / sy - top, my2-my1+1))
+			tile = ex.toImage(self.imageMap[my1:my2+1, mx1:mx2+1]).resize((dx2-dx, dy2-dy), box=box)
+
+		if tile.size == (displayWidth, displayHeight):
+			self.tkImage.paste(tile)
+		else:
+			self.canvas.tk.call(str(self.tkImage), 'copy', str(ImageTk.PhotoImage(tile)), '-to', dx, dy)
+
+	# Draw fractal. If areas is a list of rectangles (x1, y1, x2, y2), only these parts
+	# of the image are drawn, the rest of the image map is kept, see panFractal().
+	# If preview is a Drawer with an image of the same fractal, the image is shown
+	# as a preview of the new fractal area, see showPreview()
+	# If sidecar is the Sidecar of a loaded fractal definition, its image or iteration
+	# data are used, if the cache keys match. Otherwise its image is the preview and
+	# its reference orbit is reused, see drawSidecar()
+	# If refine is True, the areas are drawn with settings, which differ from the settings
+	# of the rest of the image, see refineArea()
+	# Returns False, if drawing failed or has been cancelled
+	def drawFractal(self, fractal: Type[frc.Fractal], x: int, y: int, width: int = -1, height: int = -1, onStatus=None,
+					areas: list | None = None, preview: object = None, sidecar: sc.Sidecar | None = None, refine: bool = False):
 		self.fractal = fractal
 		self.onStatus = onStatus
 
-		# Get drawing and calculation methods
-		drawFnc = self.drawFnc[self.app['drawMode']]
+		# Get drawing method
+		self.drawMode = self.app['drawMode']
+		drawFnc = self.drawFnc[self.drawMode]
 		fractalType = self.app['fractalType']
-		if fractal.settings['perturbation']:
-			iterFnc = self.iterFncPert[fractalType]
-			print("Using perturbation method")
-		else:
-			iterFnc = self.iterFnc[fractalType]
-		if iterFnc is None:
-			print(f"Error: Fractal type '{fractalType}' not supported")
-			return False
-		else:
-			print(f"Drawing fractal type: {fractalType}")
 
 		if width == -1:
 			width = self.width
@@ -111,23 +200,80 @@ class Drawer:
 		else:
 			self.height = height
 
-		oversampling = max(1, min(3, fractal.settings['oversampling']))
-		print(f"oversampling={oversampling}")
-		
-		oWidth = width * oversampling
-		oHeight = height * oversampling
-
-		self.maxLen = max(int(min(oWidth, oHeight)/2), 16)
-		self.minLen = min(max(int(min(oWidth, oHeight)/8), 16), self.maxLen)
-
-		x2 = x + oWidth -1
-		y2 = y + oHeight -1
+		# Oversampling with box filter is done inside the kernels, only the image size is allocated.
+		# With adaptive oversampling the image is drawn without oversampling first, see antiAlias().
+		# Other filters reduce the sub-samples in strips, see drawFiltered()
+		oversampling, jitter, adaptive, aaThreshold, aaFilter = fractal.settings.getValues(['oversampling', 'jitter', 'adaptiveAA',
+																							 'aaThreshold', 'aaFilter'])
+		oversampling = max(1, min(8, oversampling))
+		adaptive = bool(adaptive) and oversampling > 1
+		filtered = oversampling > 1 and aaFilter != 'Box' and not adaptive
+		jitter = bool(jitter) and oversampling > 1 and not filtered
+		sampling = (oversampling, jitter, adaptive, aaThreshold if adaptive else 0, aaFilter if filtered else 'Box')
+		print(f"oversampling={oversampling} jitter={jitter} adaptive={adaptive} filter={sampling[4]}")
+
+		self.oversampling = oversampling
+		if filtered:
+			drawFnc = self.drawFiltered
+			self.filterWeights = ds.createFilterWeights(aaFilter, oversampling)
+
+		self.maxLen = max(int(min(width, height)/2), 16)
+		# Compiled SQEM splits rectangles down to small sizes at low cost
+		self.minLen = min(max(int(min(width, height)/32), 16), self.maxLen)
+
+		x2 = x + width -1
+		y2 = y + height -1
+
+		# Select calculation engine depending on zoom depth. The fractal area is snapped
+		# to the symmetry of the fractal before, because this can shift the corner.
+		# Jittered sub-samples are not symmetric, adaptive oversampling refines the mirrored pixels
+		self.fractal.updateParameters()
+		useSymmetry = self.useSymmetry and areas is None and (not jitter or adaptive)
+		symmetry = self.fractal.snapSymmetry(width, height) if useSymmetry else None
+
+		# Show previous image resampled to the new fractal area, before the engine
+		# is prepared, which can take a while on deep zooms
+		self.bRefresh = False
+		if preview is not None and areas is None:
+			self.showPreview(preview)
+		elif sidecar is not None and areas is None and sidecar.header['fractalType'] == fractalType:
+			self.showPreviewMap(sidecar.imageMap, (complex(*sidecar.header['corner']), complex(*sidecar.header['size'])))
+
+		engineClass, reason = eng.selectEngine(fractal, fractalType, width, height, self.palette)
+		if engineClass is None:
+			print(f"Error: Fractal type '{fractalType}' not supported by engine")
+			return False
+		else:
+			print(f"Drawing fractal type: {fractalType} with {engineClass.name} engine, {reason}")
+			if self.onStatus is not None:
+				self.onStatus({'engine': f"{engineClass.name} ({reason})", 'update': False})
+
+		# Use image or iteration data of the sidecar or the cache. The cache keys depend on
+		# the fractal area, which is adjusted to the aspect ratio of the image before
+		cacheKeys = None
+		reference = None
+		self.cacheKeys = None
+		if not self.bDrawing:
+			corner, size = self.fractal.adjustAspectRatio(width, height, *self.fractal.settings.getValues(['corner', 'size']))
+			cacheKeys = self.getCacheKeys(engineClass, width, height, sampling)
+			if areas is None and sidecar is not None:
+				if self.drawSidecar(sidecar, *cacheKeys):
+					return True
+				if engineClass.perturbation:
+					reference = self.getSidecarReference(sidecar, corner, size)
+			if areas is None and self.cache is not None and self.drawCached(*cacheKeys):
+				return True
+			if refine and engineClass.perturbation:
+				reference = self.getRefineReference(areas)
 
 		if self.bDrawing == False:
 			# Prepare fractal parameters for drawing
-			if self.fractal.beginCalc(oWidth, oHeight) == False: return False
+			if self.fractal.beginCalc(width, height, engineClass.perturbation, engineClass.getDeltaScale(fractal),
+									  keepReference=areas is not None, reference=reference,
+									  oversampling=1 if adaptive or filtered else oversampling, jitter=jitter) == False: return False
 			self.cancel = False
 			self.bDrawing = True
+			self.bRefined = refine or (self.bRefined and areas is not None)
 		else:
 			return False
 
@@ -135,6 +281,8 @@ class Drawer:
 		self.statCalc = 0
 		self.statSplit = 0
 		self.statOrbits = 0
+		self.statGuess = 0
+		self.statRefined = 0
 
 		# Prepare calculation parameters
 		calcParameters = self.fractal.getCalcParameters()
@@ -143,282 +291,556 @@ class Drawer:
 		print("Calc parameters =", calcParameters)
 		print("Palette length =", len(self.palette), self.palette.shape)
 
-		# Prepare image map for oversampling
-		if oversampling > 1:
-			self.imageMap = np.resize(self.imageMap, (oHeight, oWidth, 3))
-		
-		# Draw fractal
-		drawFnc(x, y, x2, y2, iterFnc, calcParameters)
+		self.engine = engineClass(self.fractal, fractalType, self.palette, calcParameters)
+
+		# Draw fractal. Draw modes calculating iteration data create the data map, see createDataMap()
+		bDataValid = areas is None or (self.dataMap is not None and self.dataMap.shape[:2] == self.imageMap.shape[:2])
+		self.bDataDrawn = False
+		if areas is not None:
+			for area in areas:
+				drawFnc(*area)
+		elif symmetry is not None:
+			self.dataMap = None
+			self.drawSymmetric(drawFnc, *symmetry, x, y, x2, y2)
+		else:
+			self.dataMap = None
+			drawFnc(x, y, x2, y2)
+
+		# Filtered pixels and other draw modes have no iteration data. A data map created for drawing
+		# areas contains no data of the other pixels. Incomplete iteration data are dropped, so they
+		# are neither used for adaptive oversampling or recoloring nor saved or cached
+		if not self.bDataDrawn or not bDataValid:
+			self.dataMap = None
 
-		# Reduce image map to original size
-		if oversampling > 1:
-			self.imageMap = self.imageMap.reshape((height, oversampling, width, oversampling, 3)).mean(3).mean(1).astype(np.uint8)
+		if adaptive and not self.cancel:
+			self.antiAlias(areas if areas is not None else [(x, y, x2, y2)], oversampling, jitter, aaThreshold)
 
-		print(f"statCalc={self.statCalc} statFill={self.statFill} statSplit={self.statSplit} statOrbits={self.statOrbits}")
+		print(f"statCalc={self.statCalc} statFill={self.statFill} statSplit={self.statSplit} statOrbits={self.statOrbits} statGuess={self.statGuess} "
+			  f"statRefined={self.statRefined}")
 
 		self.calcTime = self.fractal.endCalc()
 		self.bDrawing = False
 
-		# Full size image
-		self.image = Img.fromarray(self.imageMap, 'RGB').transpose(Img.Transpose.FLIP_TOP_BOTTOM)
+		# Cache completely drawn fractal. With oversampling the iteration data contain only
+		# one sub-sample per pixel, so they are not suitable for recoloring. Refined images
+		# don't match the cache keys of their settings
+		if cacheKeys is not None and not self.cancel and not self.bRefined:
+			self.cacheKeys = cacheKeys
+			dataKey, imageKey = cacheKeys
+			if self.cache is not None:
+				if self.dataMap is not None and oversampling == 1:
+					self.cache.put(dataKey, self.dataMap.copy())
+				self.cache.put(imageKey, self.imageMap.copy())
 
-		# Show image
-		self.showImage(self.app['autoScale'])
+		self.showResult()
 
 		print(f"{self.calcTime} seconds")
 
+		return not self.cancel
+
+	###############################################################################
+	#
+	# Adaptive oversampling
+	#
+	#   areas - List of drawn areas (x1, y1, x2, y2)
+	#   oversampling - Number of sub-samples per pixel in each direction
+	#   jitter - Jittered sub-samples
+	#   threshold - Contrast threshold, see drawmodes.findContrastPixels()
+	#
+	# The areas have been drawn without oversampling. Pixels with high
+	# contrast in color or iteration count to their neighbours are calculated
+	# again with all sub-samples. Uniform regions like the inside of the set
+	# or smooth color bands are not oversampled. All pixels are checked
+	# before the first pixel is recalculated.
+	#
+	###############################################################################
+	def antiAlias(self, areas: list, oversampling: int, jitter: bool, threshold: int):
+		dataMap = self.dataMap if self.dataMap is not None else np.zeros((0, 0, ID_SIZE), dtype=np.float64)
+		xs, ys = [], []
+		for x1, y1, x2, y2 in areas:
+			ay, ax = np.nonzero(dm.findContrastPixels(self.imageMap, dataMap, x1, y1, x2, y2, threshold))
+			xs.append(ax + x1)
+			ys.append(ay + y1)
+		xs = np.concatenate(xs)
+		ys = np.concatenate(ys)
+
+		self.fractal.setOversampling(oversampling, jitter)
+		dm.refinePixels(*self.engine.getPixelFunction(), self.engine.getColorArgs(), self.imageMap, xs, ys)
+		self.fractal.setOversampling(1)
+
+		self.statRefined = len(xs)
+		total = sum((x2-x1+1)*(y2-y1+1) for x1, y1, x2, y2 in areas)
+		print(f"Adaptive oversampling refined {len(xs)} of {total} pixels with {oversampling*oversampling} sub-samples")
+
+	# Create and show image of drawn fractal
+	def showResult(self):
+		self.bRefresh = False
+		corner, cornerLo = self.fractal.getCornerDD()
+		self.area = (corner, self.fractal.settings['size'], cornerLo)
+
+		self.bImage = True
+		self.showImage(self.app['autoScale'])
+
+	###############################################################################
+	#
+	# Render cache
+	#
+	# The iteration data key covers all parameters of the point calculation,
+	# the fractal area, the image size, the engine and the draw mode. The image
+	# key additionally covers the color parameters and the palette. So the
+	# image of a fractal with a different palette is recolored from cached
+	# iteration data, if the draw mode creates iteration data.
+	#
+	###############################################################################
+
+	# Return cache keys (iteration data, image) of the fractal area to be drawn
+	# sampling is the tuple (oversampling, jitter, adaptive, threshold, filter)
+	def getCacheKeys(self, engineClass: Type[eng.Engine], width: int, height: int, sampling: tuple) -> tuple[str, str]:
+		calcParameters = self.fractal.getCalcParameters()
+		corner, cornerLo = self.fractal.getCornerDD()
+		dataKey = rc.hashKey(type(self.fractal).__name__, engineClass.name, self.app['drawMode'], self.app['guessSafety'],
+							 corner, cornerLo, self.fractal.settings['size'], width, height, sampling, self.fractal.getPointParameters(calcParameters))
+		imageKey = rc.hashKey(dataKey, self.palette, self.fractal.getColorParameters(calcParameters))
+		return (dataKey, imageKey)
+
+	# Show cached image or recolor cached iteration data
+	# Returns False, if neither the image nor the iteration data are cached
+	def drawCached(self, dataKey: str, imageKey: str) -> bool:
+		imageMap = self.cache.get(imageKey)
+		dataMap = self.cache.get(dataKey)
+		if imageMap is None:
+			if dataMap is None:
+				return False
+			imageMap = self.recolor(dataMap)
+			self.cache.put(imageKey, imageMap)
+			print("Recolored cached iteration data")
+		else:
+			print("Using cached image")
+
+		self.showMaps(imageMap, dataMap, (dataKey, imageKey))
 		return True
-	
-	def drawVectorized(self, x1: int, y1: int, x2: int, y2: int, iterFnc, calcParameters: tuple):
-		if self.fractal.settings['perturbation']:
-			self.imageMap[y1:y2+1,x1:x2+1] = iterFnc(self.fractal.cplxGrid[y1:y2+1,x1:x2+1], self.fractal.refOrbit, self.palette, *calcParameters)
+
+	# Create image map from iteration data with the current palette and color parameters
+	def recolor(self, dataMap: np.ndarray) -> np.ndarray:
+		calcParameters = self.fractal.getCalcParameters()
+		imageMap = np.zeros(dataMap.shape[:2] + (3,), dtype=np.uint8)
+		dm.colorizeMap((self.palette,) + self.fractal.getColorParameters(calcParameters), imageMap, dataMap)
+		return imageMap
+
+	# Show image map without drawing. The maps are copied, the drawer modifies them when panning
+	def showMaps(self, imageMap: np.ndarray, dataMap: np.ndarray | None, cacheKeys: tuple[str, str]):
+		self.imageMap = np.array(imageMap)
+		self.dataMap = None if dataMap is None else np.array(dataMap)
+		self.cacheKeys = cacheKeys
+		self.calcTime = 0.0
+		self.showResult()
+
+	###############################################################################
+	#
+	# Sidecar files
+	#
+	# The image, the iteration data and the reference orbit of a drawn fractal
+	# are saved together with the fractal definition, see sidecar.py. The
+	# header contains the cache keys, so the data are only used for the
+	# same fractal area and calculation parameters.
+	#
+	###############################################################################
+
+	# Key of the parameters (maxIter, bailout) of a reference orbit, see Fractal.mapScreenCoordinates()
+	def getOrbitKey(self, refParameters: tuple) -> str:
+		return rc.hashKey(type(self.fractal).__name__, refParameters)
+
+	# Show image of sidecar or recolor its iteration data
+	# Returns False, if the cache keys don't match
+	def drawSidecar(self, sidecar: sc.Sidecar, dataKey: str, imageKey: str) -> bool:
+		imageMap = sidecar.imageMap if sidecar.header['imageKey'] == imageKey else None
+		dataMap = sidecar.dataMap if sidecar.header['dataKey'] == dataKey else None
+		if imageMap is None:
+			if dataMap is None:
+				print("Sidecar doesn't match the fractal settings")
+				return False
+			imageMap = self.recolor(dataMap)
+			print("Recolored iteration data of sidecar")
 		else:
-			self.imageMap[y1:y2+1,x1:x2+1] = iterFnc(self.fractal.cplxGrid[y1:y2+1,x1:x2+1], self.palette, *calcParameters)
+			print("Using image of sidecar")
 
-	def drawLineByLine(self, x1: int, y1: int, x2: int, y2: int, iterFnc, calcParameters: tuple):
-		for y in range(y1, y2+1):
-			self.imageMap[y,x1:x2+1] = frc.calculateSlices(self.fractal.cplxGrid[y,x1:x2+1], self.palette, iterFnc, calcParameters)
+		self.showMaps(imageMap, dataMap, (dataKey, imageKey))
+		if self.cache is not None:
+			if dataMap is not None:
+				self.cache.put(dataKey, self.dataMap.copy())
+			self.cache.put(imageKey, self.imageMap.copy())
+		return True
+
+	# Return reference orbit of sidecar, if it can be used for the fractal area (corner, size)
+	def getSidecarReference(self, sidecar: sc.Sidecar, corner: complex, size: complex) -> ro.ReferenceOrbit | None:
+		bailout = frc.Fractal.getBailout(*self.fractal.settings.getValues(['colorize', 'paletteMode', 'colorOptions']))
+		reference = sidecar.getReference(self.getOrbitKey((self.fractal.getMaxValue(), bailout)))
+		if reference is not None:
+			offset = reference.C - corner
+			if 0 <= offset.real <= size.real and 0 <= offset.imag <= size.imag:
+				print(f"Using reference orbit of sidecar with length {len(reference)}")
+				return reference
+		return None
+
+	# Save image, iteration data and reference orbit of the drawn fractal to a sidecar file
+	# Returns False, if no completely drawn fractal is available
+	def saveSidecar(self, fileName: str) -> bool:
+		if self.bDrawing or self.cacheKeys is None or self.area is None:
+			return False
+
+		dataKey, imageKey = self.cacheKeys
+		corner, size, cornerLo = self.area
+		header = {
+			'fractalType': self.app['fractalType'],
+			'width':       self.width,
+			'height':      self.height,
+			'corner':      [corner.real, corner.imag],
+			'cornerLo':    [cornerLo.real, cornerLo.imag],
+			'size':        [size.real, size.imag],
+			'dataKey':     dataKey,
+			'imageKey':    imageKey
+		}
+
+		# With oversampling the iteration data contain only one sub-sample per pixel
+		dataMap = self.dataMap if self.oversampling == 1 else None
+		refOrbit = None
+		if self.engine is not None and self.engine.perturbation:
+			header['orbitKey'] = self.getOrbitKey(self.fractal.refParameters)
+			refOrbit = self.fractal.refOrbit
+
+		sc.Sidecar.save(fileName, header, self.imageMap, dataMap, refOrbit)
+		print(f"Saved sidecar file {fileName}")
+		return True
 	
-	# Calculate and draw a line, detect unique color
-	def drawLine(self, C, x1, y1, x2, y2, iterFnc, calcParameters):
-		if y1 == y2:
-			self.imageMap[y1,x1:x2+1] = frc.calculateSlices(self.fractal.cplxGrid[y1,x1:x2+1], self.palette, iterFnc, calcParameters)
-			bUnique = 1 if np.all(self.imageMap[y1, x1:x2+1] == self.imageMap[y1,x1,:]) else 0
-		else:
-			self.imageMap[y1:y2+1,x1] = frc.calculateSlices(self.fractal.cplxGrid[y1:y2+1,x1], self.palette, iterFnc, calcParameters)
-			bUnique = 1 if np.all(self.imageMap[y1:y2+1, x1] == self.imageMap[y1,x1,:]) else 0
-		return np.append(self.imageMap[y1,x1], bUnique)
-
-	def drawGrid(self, x1: int, y1: int, x2: int, y2: int, iterFnc, calcParameters: tuple):
-		width  = x2-x1+1
-		height = y2-y1+1
-		recSize = 16
-		rectangles = int(min(width, height)/recSize)
-
-		xc = np.linspace(x1, x2, rectangles, dtype=np.int32)
-		yc = np.linspace(y1, y2, rectangles, dtype=np.int32)
-		xr = len(xc)-1
-		yr = len(yc)-1
-
-		"""
-		for y in yc:
-			self.drawLine(self.fractal.cplxGrid[y,x1:x2+1], x1, y, x2, y, iterFnc, colorMapping, calcParameters)
-		for x in xc:
-			self.drawLine(self.fractal.cplxGrid[y1:y2+1,x], x, y1, x, y2, iterFnc, colorMapping, calcParameters)
-		"""
-
-		vColorLines = np.empty((yr,len(xc),4), dtype=np.uint8)
-		hColorLines = np.empty((len(yc),xc,4), dtype=np.uint8)
-
-		for y in range(yr):
-			for x in range(len(xc)):
-				x1 = xc[x]
-				y1 = yc[y]
-				y2 = yc[y+1]
-				vColorLines[y,x] = self.drawLine(self.fractal.cplxGrid[y1:y2+1,x1], x1, y1, x1, y2, iterFnc, calcParameters)
-		for y in range(len(yc)):
-			for x in range(xr):
-				x1 = xc[x]
-				x2 = xc[x+1]
-				y1 = yc[y]
-				hColorLines[y,x] = self.drawLine(self.fractal.cplxGrid[y1,x1:x2+1], x1, y1, x1, y2, iterFnc, calcParameters)
-
-		"""
-		for y in range(yr):
-			for x in range(xr):
-				if (np.array_equal(hColorLines[y,x], hColorLines[y+1,x]) and
-				   np.array_equal(vColorLines[y,x], vColorLines[y,x+1]) and
-				   np.array_equal(hColorLines[y,x], vColorLines[y,x])):
-					self.graphics.setColor(hColorLines[y,x])
-					self.graphics.fillRect(x1+1, y1+1, x2, y2)
-				else:
-					self.drawLineByLine(x1+1, y1+1, x2-1, y2-1, iterFnc, colorMapping, calcParameters)
-		"""
-
-	def drawSquareEstimationRec(self, x1: int, y1: int, x2: int, y2: int, iterFnc, calcParameters: tuple, 
-			colors: np.ndarray = np.zeros((4, 4), dtype=np.uint8)):
-
-		width  = x2-x1+1
-		height = y2-y1+1
-		minLen = min(width, height)
-		if minLen < 2: return	# Nothing else to draw
-
-		# Calculate missing color lines of rectangle
-		# Start/end points are calculated twice
-		clcoList = [
-			[ x1, y1, x2, y1 ],
-			[ x1, y2, x2, y2 ],
-			[ x1, y1, x1, y2 ],
-			[ x2, y1, x2, y2 ]
-		]
-
-		for i, c in enumerate(colors):
-			if c[3] != 1:
-				colors[i] = self.drawLine(self.fractal.cplxGrid, *clcoList[i], iterFnc, calcParameters)
-
-		# Fill rectangle if all sides have the same unique color
-		if minLen < self.maxLen and np.all(colors == colors[0]):
-			self.statFill += 1
-			self.imageMap[y1+1:y2, x1+1:x2] = colors[0,0:3]
-
-		elif minLen < self.minLen:
-			# Draw line by line
-			# Do not draw the surrounding rectangle (already drawn)
-			self.drawVectorized(x1+1, y1+1, x2-1, y2-1, iterFnc, calcParameters)
-			self.statCalc += 1
+	###############################################################################
+	#
+	# Draw area of the image again with the current settings
+	#
+	#   x1, y1, x2, y2 - Area, end points included
+	#
+	# The settings may differ from the settings of the rest of the image, i.e.
+	# a higher maximum number of iterations, more oversampling or another
+	# engine. The area is drawn into the image and the iteration data, the
+	# rest of the image is kept. The refined image is not cached. The fractal
+	# area of the image is restored before, if the corner or the size have
+	# been changed in the settings since the image has been drawn.
+	#
+	###############################################################################
+	def refineArea(self, x1: int, y1: int, x2: int, y2: int, onStatus=None) -> bool:
+		if self.bDrawing or self.fractal is None or self.area is None or not self.bImage or self.imageMap.shape[:2] != (self.height, self.width):
+			return False
+		x1, y1 = max(x1, 0), max(y1, 0)
+		x2, y2 = min(x2, self.width-1), min(y2, self.height-1)
+		if x2 < x1 or y2 < y1:
+			return False
 
+		print(f"Refining area {x1},{y1} - {x2},{y2}")
+		corner, size, cornerLo = self.area
+		self.fractal.setDimensions(corner, size, cornerLo=cornerLo)
+		return self.drawFractal(self.fractal, 0, 0, self.width, self.height, onStatus=onStatus, areas=[(x1, y1, x2, y2)], refine=True)
+
+	# Return reference orbit for refined areas. The reference point is selected inside the
+	# areas. Returns None, if the current reference orbit matches the settings
+	def getRefineReference(self, areas: list) -> ro.ReferenceOrbit | None:
+		maxIter = self.fractal.getMaxValue()
+		bailout = frc.Fractal.getBailout(*self.fractal.settings.getValues(['colorize', 'paletteMode', 'colorOptions']))
+		if self.fractal.refParameters == (maxIter, bailout):
+			return None
+
+		x1, y1 = min(area[0] for area in areas), min(area[1] for area in areas)
+		x2, y2 = max(area[2] for area in areas), max(area[3] for area in areas)
+		corner = self.fractal.mapXY(x1, y1, self.width, self.height)
+		size = self.fractal.mapWH(x2-x1+1, y2-y1+1, self.width, self.height)
+		if self.fractal.settings['autoReference']:
+			refPoint = self.fractal.selectReference(corner, size, maxIter, bailout)
 		else:
-			# Split rectangle into child rectangles
-			self.statSplit += 1
-
-			# Calculate middle lines
-			midX = x1+int(width/2)
-			midY = y1+int(height/2)
-
-			self.drawLine(self.fractal.cplxGrid, x1, midY, x2, midY, iterFnc, calcParameters)
-			self.drawLine(self.fractal.cplxGrid, midX, y1, midX, y2, iterFnc, calcParameters)
-
-			# Split color lines
-			#
-			#  +---0---+---1---+
-			#  |       |       |
-			#  4   R1  10  R2  6
-			#  |       |       |
-			#  +---8---+---9---+
-			#  |       |       |
-			#  5   R3  11  R4  7
-			#  |       |       |
-			#  +---2---+---3---+
-			#
-			# Line coordinates			
-			lcoList = [
-				[x1, y1, midX, y1],
-				[midX, y1, x2, y1],
-				[x1, y2, midX, y2],
-				[midX, y2, x2, y2],
-				[x1, y1, x1, midY],
-				[x1, midY, x1, y2],
-				[x2, y1, x2, midY],
-				[x2, midY, x2, y2],
-				[x1, midY, midX, midY],
-				[midX, midY, x2, midY],
-				[midX, y1, midX, midY],
-				[midX, midY, midX, y2]
-			]
-
-			clList = np.empty((12, 4), dtype=np.uint8)
-			for i in range(12):
-				clList[i] = Drawer.getLineColor(*lcoList[i], self.imageMap)
-
-			rcoList = [
-				[ x1, y1, midX, midY ],	# R1
-				[ midX, y1, x2, midY ],	# R2
-				[ x1, midY, midX, y2 ],	# R3
-				[ midX, midY, x2, y2 ]	# R4
-			]
-
-			clnoList = [
-				[ 0, 8, 4, 10 ],
-				[ 1, 9, 10, 6 ],
-				[ 8, 2, 5, 11 ],
-				[ 9, 3, 11, 7 ]
-			]		
-
-			# Recursively call the function for rectangles R1-4
-			for i, coord in enumerate(rcoList):
-				self.drawSquareEstimationRec(*coord, iterFnc, calcParameters, clList[clnoList[i]])
-
-	def drawSquareEstimation(self, x1: int, y1: int, x2: int, y2: int, iterFnc, calcParameters: tuple):
-
-		tColor = self.drawLine(self.fractal.cplxGrid, x1, y1, x2, y1, iterFnc, calcParameters)
-		bColor = self.drawLine(self.fractal.cplxGrid, x1, y2, x2, y2, iterFnc, calcParameters)
-		lColor = self.drawLine(self.fractal.cplxGrid, x1, y1, x1, y2, iterFnc, calcParameters)
-		rColor = self.drawLine(self.fractal.cplxGrid, x2, y1, x2, y2, iterFnc, calcParameters)
-		colors = np.array([tColor, bColor, lColor, rColor], dtype=np.uint8)
-
-		areaStack = [
-			[ x1, y1, x2, y2, colors]
-		]
-
-		while len(areaStack) > 0:
-			area = areaStack.pop()
-			lineColorList = area.pop()
-			x1, y1, x2, y2 = area
-
-			width  = x2-x1+1
-			height = y2-y1+1
-			rectLen = min(width, height)
-			if rectLen < 2:
-				continue
-
-			# Fill rectangle if all sides have the same unique color
-			if rectLen < self.maxLen and np.all(lineColorList == lineColorList[0]):
-				self.statFill += 1
-				self.imageMap[y1+1:y2, x1+1:x2] = lineColorList[0,0:3]
-
-			elif rectLen < self.minLen:
-				# Draw line by line
-				# Do not draw the surrounding rectangle (already drawn)
-				self.drawVectorized (x1+1, y1+1, x2-1, y2-1, iterFnc, calcParameters)
-				self.statCalc += 1
-
-			else:
-				# Split rectangle into child rectangles
-				self.statSplit += 1
-
-				# Calculate middle lines
-				midX = x1+int(width/2)
-				midY = y1+int(height/2)
-
-				self.drawLine(self.fractal.cplxGrid, x1, midY, x2, midY, iterFnc, calcParameters)
-				self.drawLine(self.fractal.cplxGrid, midX, y1, midX, y2, iterFnc, calcParameters)
-
-				# Split color lines
-				#
-				#  +---0---+---1---+
-				#  |       |       |
-				#  4   R1  10  R2  6
-				#  |       |       |
-				#  +---8---+---9---+
-				#  |       |       |
-				#  5   R3  11  R4  7
-				#  |       |       |
-				#  +---2---+---3---+
-				#
-				# Line coordinates			
-				lcoList = [
-					[x1, y1, midX, y1],
-					[midX, y1, x2, y1],
-					[x1, y2, midX, y2],
-					[midX, y2, x2, y2],
-					[x1, y1, x1, midY],
-					[x1, midY, x1, y2],
-					[x2, y1, x2, midY],
-					[x2, midY, x2, y2],
-					[x1, midY, midX, midY],
-					[midX, midY, x2, midY],
-					[midX, y1, midX, midY],
-					[midX, midY, midX, y2]
-				]
-
-				clList = np.empty((12, 4), dtype=np.uint8)
-				for i, lco in enumerate(lcoList):
-					clList[i] = Drawer.getLineColor(*lco, self.imageMap)
-
-				rcoList = [
-					[ x1, y1, midX, midY ],	# R1
-					[ midX, y1, x2, midY ],	# R2
-					[ x1, midY, midX, y2 ],	# R3
-					[ midX, midY, x2, y2 ]	# R4
-				]
-
-				clnoList = [
-					[ 0, 8, 4, 10 ],
-					[ 1, 9, 10, 6 ],
-					[ 8, 2, 5, 11 ],
-					[ 9, 3, 11, 7 ]
-				]
-
-				for i, coord in enumerate(rcoList):
-					areaStack.append([ *coord, clList[clnoList[i]] ])
+			refPoint = corner + size / 2.0
+		reference = self.fractal.createReferenceOrbit(refPoint, maxIter, bailout)
+		print(f"Reference point {refPoint} of refined area, reference orbit length {len(reference)}")
+		return reference
+
+	###############################################################################
+	#
+	# Move fractal area and redraw the image
+	#
+	#   dx, dy - Distance in pixels. Pixel (x, y) of the new image is pixel
+	#     (x+dx, y+dy) of the current image. Fractions of pixels are rounded
+	#   onStatus - Status callback, see drawFractal()
+	#
+	# The image map and the iteration data are shifted, only the exposed
+	# strips at the borders are drawn. Perturbation engines keep the reference
+	# orbit, as long as the reference point is inside the fractal area. The
+	# whole image is drawn, if nothing has been drawn before, the draw mode has
+	# changed, the distance exceeds the image size or
+	# the corner of the fractal area cannot be moved by whole pixels.
+	#
+	# Returns:
+	#
+	#   True on success
+	#
+	###############################################################################
+	def panFractal(self, dx: float, dy: float, onStatus=None) -> bool:
+		if self.bDrawing or self.fractal is None:
+			return False
+		dx = round(dx)
+		dy = round(dy)
+		w, h = self.width, self.height
+		movedX, movedY = self.fractal.pan(dx, dy, w, h)
+
+		if (not self.bImage or self.drawMode != self.app['drawMode'] or
+			abs(dx) >= w or abs(dy) >= h or self.imageMap.shape[:2] != (h, w) or
+			abs(movedX - dx) > self.maxPanError or abs(movedY - dy) > self.maxPanError):
+			return self.drawFractal(self.fractal, 0, 0, w, h, onStatus=onStatus)
+
+		# Shift maps
+		dst = (slice(max(0, -dy), h-max(0, dy)), slice(max(0, -dx), w-max(0, dx)))
+		src = (slice(max(0, dy), h-max(0, -dy)), slice(max(0, dx), w-max(0, -dx)))
+		self.imageMap[dst] = self.imageMap[src]
+		if self.dataMap is not None:
+			self.dataMap[dst] = self.dataMap[src]
+
+		# Exposed columns over the full height, exposed rows without the exposed columns
+		areas = []
+		x1, x2 = 0, w-1
+		if dx > 0:
+			areas.append((w-dx, 0, w-1, h-1))
+			x2 = w-dx-1
+		elif dx < 0:
+			areas.append((0, 0, -dx-1, h-1))
+			x1 = -dx
+		if dy > 0:
+			areas.append((x1, h-dy, x2, h-1))
+		elif dy < 0:
+			areas.append((x1, 0, x2, -dy-1))
+
+		print(f"Panned by {dx}, {dy} pixels, drawing {sum((ax2-ax1+1)*(ay2-ay1+1) for ax1, ay1, ax2, ay2 in areas)} of {w*h} pixels")
+		return self.drawFractal(self.fractal, 0, 0, w, h, onStatus=onStatus, areas=areas)
+
+	###############################################################################
+	#
+	# Show image of another drawer as preview of the fractal area to be drawn
+	#
+	#   drawer - Drawer with the previous image
+	#
+	# The part of the previous image, which covers the new fractal area, is
+	# resampled to the new image size (nearest neighbour). Parts outside of
+	# the previous image are black. The preview is the initial image map,
+	# which is overwritten by the drawing methods. Drawing methods, which
+	# report their progress, show the partly drawn image.
+	#
+	###############################################################################
+	def showPreview(self, drawer: object):
+		if not drawer.bImage or drawer.area is None or drawer.fractal is not self.fractal:
+			return
+		self.showPreviewMap(drawer.imageMap, drawer.area[:2])
+
+	# Show image map of fractal area (corner, size) as preview
+	def showPreviewMap(self, imageMap: np.ndarray, area: tuple[complex, complex]):
+		h, w = imageMap.shape[:2]
+		oldCorner, oldSize = area
+		corner, size = self.fractal.adjustAspectRatio(self.width, self.height, *self.fractal.settings.getValues(['corner', 'size']))
+		xs = (corner.real - oldCorner.real + np.arange(self.width) * size.real / (self.width-1)) * (w-1) / oldSize.real
+		ys = (corner.imag - oldCorner.imag + np.arange(self.height) * size.imag / (self.height-1)) * (h-1) / oldSize.imag
+		xs = np.round(xs)
+		ys = np.round(ys)
+		inside = ((ys >= 0) & (ys < h))[:, np.newaxis] & ((xs >= 0) & (xs < w))[np.newaxis, :]
+		previewMap = imageMap[np.clip(ys, 0, h-1).astype(np.int64)][:, np.clip(xs, 0, w-1).astype(np.int64)]
+		previewMap[~inside] = 0
+
+		self.imageMap = previewMap
+		self.bImage = True
+		self.showImage(self.app['autoScale'])
 
+		self.bRefresh = True
+		self.lastRefresh = time.perf_counter()
+
+	# Update progress bar. Also processes GUI events, so drawing can be cancelled.
+	# The partly drawn image is shown, if it has been initialized with a preview.
+	# area (x1, y1, x2, y2) is the part of the image drawn since the last call,
+	# only the changed parts are updated on the display
+	def showProgress(self, done: int, total: int, area: tuple | None = None):
+		if self.bRefresh and area is not None:
+			self.dirty.append(area)
+		if self.bRefresh and time.perf_counter() - self.lastRefresh >= self.refreshTime:
+			for dirty in self.dirty:
+				self.updateDisplay(*dirty)
+			self.dirty = []
+			self.canvas.update()
+			self.lastRefresh = time.perf_counter()
+		if self.onStatus is not None:
+			self.onStatus({'progress': int(done * 100 / max(total, 1))})
+
+	# Create iteration data map for drawing modes working on iteration data. An existing
+	# map is reused, if the area is drawn in several parts
+	def createDataMap(self):
+		self.bDataDrawn = True
+		if self.dataMap is None or self.dataMap.shape[:2] != self.imageMap.shape[:2]:
+			self.dataMap = np.zeros(self.imageMap.shape[:2] + (ID_SIZE,), dtype=np.float64)
+
+	###############################################################################
+	#
+	# Draw area of symmetric fractal
+	#
+	#   drawFnc - Drawing method
+	#   kx, ky - Symmetry, see Fractal.snapSymmetry(). Pixel (x, y) is mirrored
+	#     to (kx-x, ky-y). If kx is None, columns are not mirrored
+	#   x1, y1, x2, y2 - Area, end points included
+	#
+	# The rows on the larger side of the symmetry axis are drawn with drawFnc.
+	# The mirrored rows are copied from the drawn rows. Parts of the mirrored
+	# rows without mirrored columns are also drawn with drawFnc.
+	#
+	###############################################################################
+	def drawSymmetric(self, drawFnc, kx: int | None, ky: int, x1: int, y1: int, x2: int, y2: int):
+		if ky >= y1+y2:
+			# Axis in 2nd half of rows: draw rows up to the axis
+			dy1, dy2 = y1, ky//2
+			my1, my2 = ky//2+1, y2
+		else:
+			dy1, dy2 = (ky+1)//2, y2
+			my1, my2 = y1, (ky+1)//2-1
+		if kx is None:
+			mx1, mx2 = x1, x2
+			srcX = slice(x1, x2+1)
+			stepX = 1
+		else:
+			mx1, mx2 = max(x1, kx-x2), min(x2, kx-x1)
+			srcX = slice(kx-mx2, kx-mx1+1)
+			stepX = -1
+
+		drawFnc(x1, dy1, x2, dy2)
+		if mx1 > x1:
+			drawFnc(x1, my1, mx1-1, my2)
+		if mx2 < x2:
+			drawFnc(mx2+1, my1, x2, my2)
+
+		# Mirror drawn rows
+		srcY = slice(ky-my2, ky-my1+1)
+		self.imageMap[my1:my2+1, mx1:mx2+1] = self.imageMap[srcY, srcX][::-1, ::stepX]
+		if self.dataMap is not None:
+			self.dataMap[my1:my2+1, mx1:mx2+1] = self.dataMap[srcY, srcX][::-1, ::stepX]
+		print(f"Symmetric fractal, mirrored {(my2-my1+1)*(mx2-mx1+1)} of {(x2-x1+1)*(y2-y1+1)} pixels")
+
+	def drawVectorized(self, x1: int, y1: int, x2: int, y2: int):
+		self.imageMap[y1:y2+1,x1:x2+1] = self.engine.calculateArea(x1, y1, x2, y2)
+
+	def drawLineByLine(self, x1: int, y1: int, x2: int, y2: int):
+		for y in range(y1, y2+1):
+			self.imageMap[y,x1:x2+1] = self.engine.calculateLine(x1, y, x2, y)
+	
+	# Draw area tile by tile
+	def drawTiled(self, x1: int, y1: int, x2: int, y2: int):
+		tiles = [(tx, ty) for ty in range(y1, y2+1, self.tileSize) for tx in range(x1, x2+1, self.tileSize)]
+
+		for n, (tx, ty) in enumerate(tiles):
+			if self.cancel: break
+			tile = (tx, ty, min(tx+self.tileSize-1, x2), min(ty+self.tileSize-1, y2))
+			self.drawVectorized(*tile)
+			self.showProgress(n+1, len(tiles), tile)
+
+	# Draw area in passes with decreasing block size. The 1st pass calculates every
+	# blockSize-th pixel and fills the blocks with the pixel color. Every further pass
+	# halves the block size and calculates only the pixels not calculated before
+	def drawProgressive(self, x1: int, y1: int, x2: int, y2: int):
+		step = self.blockSize
+		self.fillBlocks(self.engine.calculateArea(x1, y1, x2, y2, step, step), x1, y1, x2, y2, step, step, step)
+		self.showProgress(1, step.bit_length(), (x1, y1, x2, y2))
+
+		while step > 1 and not self.cancel:
+			step //= 2
+
+			# Odd rows of current pass, all columns
+			self.fillBlocks(self.engine.calculateArea(x1, y1+step, x2, y2, step, step*2), x1, y1+step, x2, y2, step, step*2, step)
+
+			# Even rows of current pass, odd columns
+			self.fillBlocks(self.engine.calculateArea(x1+step, y1, x2, y2, step*2, step*2), x1+step, y1, x2, y2, step*2, step*2, step)
+
+			self.showProgress(self.blockSize.bit_length() - step.bit_length() + 1, self.blockSize.bit_length(), (x1, y1, x2, y2))
+
+	# Fill blocks of size blockSize with colors of calculated pixels. Pixel (0, 0) of colors
+	# is located at (x1, y1), xStep and yStep are the distances of calculated pixels
+	def fillBlocks(self, colors: np.ndarray, x1: int, y1: int, x2: int, y2: int, xStep: int, yStep: int, blockSize: int):
+		for dy in range(blockSize):
+			for dx in range(blockSize):
+				block = self.imageMap[y1+dy:y2+1:yStep, x1+dx:x2+1:xStep]
+				block[...] = colors[:block.shape[0], :block.shape[1]]
+
+	###############################################################################
+	#
+	# Draw area with oversampling filter
+	#
+	# The area is drawn in strips of stripRows rows. The sub-samples of a strip
+	# and the margins required by the filter are calculated with the engine,
+	# one sub-sample position of all pixels at once. Then the strip is reduced
+	# with downsample.reduceStrip(). Sub-samples of the margin are kept for
+	# the next strip. Every draw mode uses this method with filters other
+	# than the box filter.
+	#
+	###############################################################################
+	def drawFiltered(self, x1: int, y1: int, x2: int, y2: int):
+		weights, first = self.filterWeights
+		n = self.oversampling
+		before, after = ds.getMargins(weights, first, n)
+		h, w = self.imageMap.shape[:2]
+		cx1, cx2 = max(x1-before, 0), min(x2+after, w-1)
+
+		subMap = np.zeros((0, (cx2-cx1+1)*n, 3), dtype=np.uint8)
+		subY = 0
+		strips = range(y1, y2+1, self.stripRows)
+		for i, sy1 in enumerate(strips):
+			if self.cancel: break
+			sy2 = min(sy1+self.stripRows-1, y2)
+			ry1, ry2 = max(sy1-before, 0), min(sy2+after, h-1)
+
+			# Reuse sub-samples of the previous strip
+			subMap = subMap[max(ry1-subY, 0)*n:]
+			subY = ry1
+			ny1 = ry1 + subMap.shape[0] // n
+			if ny1 <= ry2:
+				subMap = np.concatenate((subMap, self.calculateSubsamples(cx1, ny1, cx2, ry2)))
+				self.statCalc += (cx2-cx1+1) * (ry2-ny1+1) * n * n
+
+			ds.reduceStrip(subMap, cx1, subY, weights, first, n, ds.srgbToLinear, self.imageMap, x1, sy1, x2, sy2)
+			self.showProgress(i+1, len(strips), (x1, sy1, x2, sy2))
+
+		self.fractal.setOversampling(1)
+
+	# Calculate all sub-samples of area (x1, y1) - (x2, y2)
+	# Returns array with shape (rows * oversampling, columns * oversampling, 3)
+	def calculateSubsamples(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+		n = self.oversampling
+		offsets = (np.arange(n) + 0.5) / n - 0.5
+		subMap = np.empty(((y2-y1+1)*n, (x2-x1+1)*n, 3), dtype=np.uint8)
+		for j, dy in enumerate(offsets):
+			for i, dx in enumerate(offsets):
+				self.fractal.setSampleOffset(dx, dy)
+				subMap[j::n, i::n] = self.engine.calculateArea(x1, y1, x2, y2)
+		return subMap
+
+	# Draw area with compiled solid guessing method, see drawmodes.solidGuessing()
+	def drawGrid(self, x1: int, y1: int, x2: int, y2: int):
+		self.createDataMap()
+		stats = dm.solidGuessing(*self.engine.getPixelFunction(), self.engine.getColorArgs(), self.imageMap, self.dataMap,
+								 x1, y1, x2, y2, self.gridStep, self.app['guessSafety'])
+		self.statGuess += stats[0]
+		self.statCalc += stats[1]
+		print(f"Calculated {stats[1]} of {(x2-x1+1)*(y2-y1+1)} pixels, guessed {stats[0]} pixels")
+
+	# Draw area with compiled square estimation method, see drawmodes.squareEstimation()
+	def drawSquareEstimation(self, x1: int, y1: int, x2: int, y2: int):
+		self.createDataMap()
+		stats = dm.squareEstimation(*self.engine.getPixelFunction(), self.engine.getColorArgs(), self.imageMap, self.dataMap,
+									x1, y1, x2, y2, self.minLen, self.maxLen, 4 * nb.get_num_threads())
+		self.statFill += stats[0]
+		self.statCalc += stats[1]
+		self.statSplit += stats[2]
+		pixels = stats[3]
+		print(f"Calculated {pixels} of {(x2-x1+1)*(y2-y1+1)} pixels")
+
+	# Draw area with compiled boundary tracing method, see drawmodes.boundaryTrace()
+	def drawBoundaryTrace(self, x1: int, y1: int, x2: int, y2: int):
+		self.createDataMap()
+		pixels = dm.boundaryTrace(*self.engine.getPixelFunction(), self.engine.getColorArgs(), self.imageMap, self.dataMap,
+								  x1, y1, x2, y2, self.traceTileSize)
+		self.statCalc += pixels
+		print(f"Calculated {pixels} of {(x2-x1+1)*(y2-y1+1)} pixels")
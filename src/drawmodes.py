@@ -0,0 +1,740 @@
+#
+# Compiled draw strategies
+#
+# The draw functions calculate pixel colors with the pixel function of the
+# calculation engine, see Engine.getPixelFunction(). They are compiled
+# together with the point calculation function, so the whole drawing loop
+# runs without returning to the Python interpreter.
+#
+# Pixel function parameters:
+#
+#   pointFnc - Point calculation function
+#   gridFnc - Function returning grid value of sub-sample s of pixel: gridFnc(grid, x, y, s)
+#   grid - Grid data, the last element are the sub-sample offsets
+#   args - Tuple with parameters of point calculation function
+#
+
+import math
+
+import numpy as np
+import numba as nb
+
+import fractal as frc
+import downsample as ds
+
+from constants import *
+
+
+# Maximum number of rectangles on stack of square estimation. Every split
+# replaces 1 rectangle by 4, so 3 entries per split level are sufficient
+SQEM_STACK_SIZE = 3 * 64 + 1
+
+# Minimum cosine of angle between normal vectors of border pixels of a
+# rectangle, which is filled by interpolation (30 degrees)
+SQEM_MIN_NORMAL_COS = math.cos(math.pi / 6.0)
+
+# Maximum difference of stripe averages of border pixels of a rectangle,
+# which is filled by interpolation
+SQEM_MAX_STRIPE_DIFF = 0.05
+
+# Maximum difference of smooth iteration counts of neighbour pixels, which are
+# not oversampled by adaptive anti-aliasing
+AA_MAX_ITER_DIFF = 1.0
+
+# Border test results of square estimation
+SQEM_SPLIT       = 0	# Border is not uniform
+SQEM_FILL        = 1	# All border pixels have the same color
+SQEM_INTERPOLATE = 2	# All border pixels in the same iteration band
+
+# Calculate iteration data and color of pixel (x, y). The color is the average color of all
+# sub-samples in linear light, the iteration data are the data of the first sub-sample
+@nb.njit(cache=False)
+def calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray, x: int, y: int):
+	data = pointFnc(gridFnc(grid, x, y, 0), *args)
+	for i in range(ID_SIZE):
+		dataMap[y, x, i] = data[i]
+	color = frc.colorizeData(colorArgs[0], data, *colorArgs[1:])
+
+	samples = grid[-1].shape[0]
+	if samples == 1:
+		imageMap[y, x] = color
+	else:
+		total = np.zeros(3, dtype=np.float64)
+		ds.addLinear(total, color)
+		for s in range(1, samples):
+			ds.addLinear(total, frc.colorizeData(colorArgs[0], pointFnc(gridFnc(grid, x, y, s), *args), *colorArgs[1:]))
+		ds.storeAverage(total, samples, imageMap[y, x])
+
+# Map iteration data of all pixels to colors
+@nb.njit(cache=False, parallel=True)
+def colorizeMap(colorArgs, imageMap: np.ndarray, dataMap: np.ndarray):
+	for y in nb.prange(dataMap.shape[0]):
+		for x in range(dataMap.shape[1]):
+			imageMap[y, x] = frc.colorizeData(colorArgs[0], dataMap[y, x], *colorArgs[1:])
+
+# Calculate pixels of area (x1, y1) - (x2, y2), end points included
+# Returns number of calculated pixels
+@nb.njit(cache=False)
+def calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+				  x1: int, y1: int, x2: int, y2: int) -> int:
+	for y in range(y1, y2+1):
+		for x in range(x1, x2+1):
+			calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x, y)
+	return max(x2-x1+1, 0) * max(y2-y1+1, 0)
+
+# Coordinates of k-th pixel on the border of rectangle (x1, y1) - (x2, y2).
+# Top and bottom line first, then left and right line without end points
+@nb.njit(cache=False)
+def borderPixel(x1: int, y1: int, x2: int, y2: int, k: int) -> tuple:
+	width = x2-x1+1
+	if k < width:
+		return x1+k, y1
+	elif k < 2*width:
+		return x1+k-width, y2
+	k -= 2*width
+	if k < y2-y1-1:
+		return x1, y1+1+k
+	return x2, y1+1+k-(y2-y1-1)
+
+# Check if iteration data of a pixel belongs to the same area as reference data ref. Pixels
+# inside the set need identical data, other pixels the same integer iteration count. With
+# shading, the normal vectors must point in nearly the same direction, with stripes the
+# stripe averages must be nearly the same
+@nb.njit(cache=False)
+def isSameData(ref: np.ndarray, data: np.ndarray, bShading: bool, bStripes: bool) -> bool:
+	if ref[ID_ITER] < 0:
+		for i in range(ID_SIZE):
+			if data[i] != ref[i]:
+				return False
+		return True
+	if data[ID_ITER] < 0 or math.floor(data[ID_ITER]) != math.floor(ref[ID_ITER]):
+		return False
+	if bShading and (data[ID_NORMAL_RE] * ref[ID_NORMAL_RE] + data[ID_NORMAL_IM] * ref[ID_NORMAL_IM] <
+					 SQEM_MIN_NORMAL_COS * math.hypot(ref[ID_NORMAL_RE], ref[ID_NORMAL_IM]) * math.hypot(data[ID_NORMAL_RE], data[ID_NORMAL_IM])):
+		return False
+	if bStripes and abs(data[ID_STRIPE] - ref[ID_STRIPE]) > SQEM_MAX_STRIPE_DIFF:
+		return False
+	return True
+
+# Stripes and steps vary inside of iteration bands, so the colors of pixels between
+# calculated pixels cannot be guessed from their iteration data. Only pixels inside
+# the set can be guessed, see solidGuessing() and boundaryTraceTile()
+@nb.njit(cache=False)
+def hasPatterns(colorArgs) -> bool:
+	return colorArgs[5][0] > 0 or colorArgs[5][2] > 0
+
+###############################################################################
+#
+# Check the border pixels of rectangle (x1, y1) - (x2, y2)
+#
+#   imageMap - Image array
+#   dataMap - Iteration data, shape (height, width, ID_SIZE)
+#   bShading - Check direction of normal vectors for 3D shading
+#   bStripes - Check stripe averages
+#   bColorFill - Fill rectangles with the same border color, even if the
+#     iteration data differs
+#
+# Returns:
+#
+#   SQEM_FILL - All pixels have the same color
+#   SQEM_INTERPOLATE - All pixels have the same iteration data, see isSameData()
+#   SQEM_SPLIT - Otherwise
+#
+###############################################################################
+@nb.njit(cache=False)
+def checkBorder(imageMap: np.ndarray, dataMap: np.ndarray, x1: int, y1: int, x2: int, y2: int, bShading: bool, bStripes: bool,
+				bColorFill: bool = True) -> int:
+	r, g, b = imageMap[y1, x1]
+	ref = dataMap[y1, x1]
+
+	bSameColor = True
+	bSameData = True
+	for k in range(2*(x2-x1+1) + 2*(y2-y1-1)):
+		x, y = borderPixel(x1, y1, x2, y2, k)
+		if bSameColor and (imageMap[y, x, 0] != r or imageMap[y, x, 1] != g or imageMap[y, x, 2] != b):
+			bSameColor = False
+
+		if bSameData and not isSameData(ref, dataMap[y, x], bShading, bStripes):
+			bSameData = False
+
+		if not bSameData and (not bSameColor or not bColorFill):
+			return SQEM_SPLIT
+
+	return SQEM_FILL if bSameColor else SQEM_INTERPOLATE
+
+# Fill inner pixels of rectangle (x1, y1) - (x2, y2) by interpolating the iteration data of
+# the border pixels (Coons patch). The interpolated data is mapped to colors, if bColorize
+# is True. Otherwise the rectangle is filled with the color of pixel (x1, y1). Inside the
+# set, data and color of pixel (x1, y1) are copied. Colors of interpolated data contain
+# only one sub-sample, so with oversampling only rectangles with the same border color
+# can be filled, see squareEstimation()
+@nb.njit(cache=False)
+def interpolateArea(colorArgs, imageMap: np.ndarray, dataMap: np.ndarray, x1: int, y1: int, x2: int, y2: int, bColorize: bool):
+	if dataMap[y1, x1, ID_ITER] < 0:
+		# Inside the set, interpolation would change the flags in ID_ITER
+		dataMap[y1+1:y2, x1+1:x2] = dataMap[y1, x1]
+		imageMap[y1+1:y2, x1+1:x2] = imageMap[y1, x1]
+		return
+
+	for y in range(y1+1, y2):
+		v = (y-y1) / (y2-y1)
+		for x in range(x1+1, x2):
+			u = (x-x1) / (x2-x1)
+			for i in range(ID_SIZE):
+				dataMap[y, x, i] = ((1-v) * dataMap[y1, x, i] + v * dataMap[y2, x, i] +
+									(1-u) * dataMap[y, x1, i] + u * dataMap[y, x2, i] -
+									(1-u) * (1-v) * dataMap[y1, x1, i] - u * (1-v) * dataMap[y1, x2, i] -
+									(1-u) * v * dataMap[y2, x1, i] - u * v * dataMap[y2, x2, i])
+			if bColorize:
+				imageMap[y, x] = frc.colorizeData(colorArgs[0], dataMap[y, x], *colorArgs[1:])
+			else:
+				imageMap[y, x] = imageMap[y1, x1]
+
+# Split rectangle (x1, y1) - (x2, y2) by calculating the inner pixels of the middle lines
+# Returns tuple (midX, midY, number of calculated pixels)
+@nb.njit(cache=False)
+def splitRectangle(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+				   x1: int, y1: int, x2: int, y2: int) -> tuple:
+	midX = x1 + (x2-x1+1) // 2
+	midY = y1 + (y2-y1+1) // 2
+	n = calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1+1, midY, x2-1, midY)
+	n += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, midX, y1+1, midX, midY-1)
+	n += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, midX, midY+1, midX, y2-1)
+	return midX, midY, n
+
+# Sub rectangles R1-R4 of split rectangle
+#
+#  +-------+-------+
+#  |  R1   |  R2   |
+#  +----midX,midY--+
+#  |  R3   |  R4   |
+#  +-------+-------+
+#
+@nb.njit(cache=False)
+def subRectangles(x1: int, y1: int, x2: int, y2: int, midX: int, midY: int) -> tuple:
+	return ((x1, y1, midX, midY), (midX, y1, x2, midY), (x1, midY, midX, y2), (midX, midY, x2, y2))
+
+###############################################################################
+#
+# Draw area with square estimation method (SQEM)
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   dataMap - Iteration data with shape (height, width, ID_SIZE)
+#   x1, y1, x2, y2 - Area, end points included
+#   minLen - Rectangles with a smaller side length are calculated completely
+#   maxLen - Only rectangles with a smaller side length are filled
+#   minRects - Minimum number of rectangles processed in parallel
+#
+# The border of the area is calculated first. The border test is based on
+# the iteration data, see checkBorder(). A rectangle inside the set is filled
+# with the border data. A rectangle within one iteration band is filled by
+# interpolating the border data. Otherwise the rectangle is split into 4
+# rectangles by calculating the middle lines. The pixel colors are calculated
+# from the iteration data, so filled rectangles also get smooth coloring and
+# shading. With oversampling, colors of interpolated data would contain only
+# one sub-sample. So only rectangles with the same border color are filled,
+# all other pixels are calculated with all sub-samples.
+#
+# Before drawing, the area is split into at least minRects rectangles, which
+# are processed in parallel. Each rectangle is processed depth first with an
+# explicit stack. Splitting before drawing only adds calculated middle lines
+# to rectangles, which otherwise would have been filled.
+#
+# Returns:
+#
+#   Statistics array [filled, calculated, split rectangles, calculated pixels]
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def squareEstimation(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+					 x1: int, y1: int, x2: int, y2: int, minLen: int, maxLen: int, minRects: int) -> np.ndarray:
+	stats = np.zeros(4, dtype=np.int64)
+	bShading = colorArgs[3] & FO_SHADING != 0
+	bStripes = colorArgs[5][0] > 0
+	bOversampling = grid[-1].shape[0] > 1
+
+	# Border of area
+	stats[3] += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1, y1, x2, y1)
+	stats[3] += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1, y2, x2, y2)
+	stats[3] += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1, y1+1, x1, y2-1)
+	stats[3] += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x2, y1+1, x2, y2-1)
+
+	# Split area until there are enough rectangles for parallel processing
+	rects = np.array([[x1, y1, x2, y2]], dtype=np.int64)
+	while rects.shape[0] < minRects:
+		split = np.zeros(rects.shape[0], dtype=np.bool_)
+		for r in range(rects.shape[0]):
+			rx1, ry1, rx2, ry2 = rects[r]
+			split[r] = min(rx2-rx1+1, ry2-ry1+1) >= max(minLen, 3)
+		if not np.any(split):
+			break
+
+		nextRects = np.zeros((rects.shape[0] + 3 * np.count_nonzero(split), 4), dtype=np.int64)
+		n = 0
+		for r in range(rects.shape[0]):
+			rx1, ry1, rx2, ry2 = rects[r]
+			if split[r]:
+				midX, midY, pixels = splitRectangle(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, rx1, ry1, rx2, ry2)
+				stats[2] += 1
+				stats[3] += pixels
+				for rect in subRectangles(rx1, ry1, rx2, ry2, midX, midY):
+					nextRects[n] = rect
+					n += 1
+			else:
+				nextRects[n] = rects[r]
+				n += 1
+		rects = nextRects
+
+	# Process rectangles in parallel
+	rectStats = np.zeros((rects.shape[0], 4), dtype=np.int64)
+	for r in nb.prange(rects.shape[0]):
+		stack = np.zeros((SQEM_STACK_SIZE, 4), dtype=np.int64)
+		stack[0] = rects[r]
+		top = 1
+
+		while top > 0:
+			top -= 1
+			rx1, ry1, rx2, ry2 = stack[top]
+			rectLen = min(rx2-rx1+1, ry2-ry1+1)
+			if rectLen < 3:
+				# No inner pixels
+				continue
+
+			border = checkBorder(imageMap, dataMap, rx1, ry1, rx2, ry2, bShading, bStripes) if rectLen < maxLen else SQEM_SPLIT
+			if border == SQEM_INTERPOLATE and bOversampling:
+				border = SQEM_SPLIT
+
+			if border != SQEM_SPLIT:
+				# Fill rectangle with interpolated data. Colors are only calculated, if border colors differ
+				interpolateArea(colorArgs, imageMap, dataMap, rx1, ry1, rx2, ry2, border == SQEM_INTERPOLATE)
+				rectStats[r, 0] += 1
+
+			elif rectLen < minLen:
+				# Calculate inner pixels
+				rectStats[r, 3] += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, rx1+1, ry1+1, rx2-1, ry2-1)
+				rectStats[r, 1] += 1
+
+			else:
+				midX, midY, pixels = splitRectangle(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, rx1, ry1, rx2, ry2)
+				rectStats[r, 2] += 1
+				rectStats[r, 3] += pixels
+				for rect in subRectangles(rx1, ry1, rx2, ry2, midX, midY):
+					stack[top] = rect
+					top += 1
+
+	return stats + rectStats.sum(axis=0)
+
+# Pixel flags of boundary tracing
+BT_CALCULATED = 1
+BT_QUEUED     = 2
+
+# Check if pixels (x1, y1) and (x2, y2) belong to different regions. Pixels of the same
+# region have the same iteration data, see isSameData()
+@nb.njit(cache=False)
+def isRegionBorder(dataMap: np.ndarray, x1: int, y1: int, x2: int, y2: int, bShading: bool, bStripes: bool) -> bool:
+	return not isSameData(dataMap[y1, x1], dataMap[y2, x2], bShading, bStripes)
+
+###############################################################################
+#
+# Draw tile with boundary tracing method
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   dataMap - Iteration data with shape (height, width, ID_SIZE)
+#   x1, y1, x2, y2 - Tile, end points included
+#
+# The pixels on the border of the tile are queued first. For every pixel
+# taken from the queue, the 4 neighbours are calculated. Neighbours belonging
+# to another region are queued, so the queue follows the contours between
+# the regions. Regions are based on the iteration data, see isSameData().
+# Finally the remaining pixels, which are inside of regions surrounded by
+# calculated pixels, are filled line by line by interpolating the iteration
+# data of the calculated pixels left and right of them, see interpolateLine().
+# With oversampling, pixels between calculated pixels of different colors
+# are calculated. With stripes or steps, all pixels outside of the set are
+# calculated, see hasPatterns().
+#
+# Memory usage is 5 bytes per tile pixel for pixel flags and queue.
+#
+# Returns:
+#
+#   Number of calculated pixels
+#
+###############################################################################
+@nb.njit(cache=False)
+def boundaryTraceTile(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+					  x1: int, y1: int, x2: int, y2: int) -> int:
+	bShading = colorArgs[3] & FO_SHADING != 0
+	bStripes = colorArgs[5][0] > 0
+	bPatterns = hasPatterns(colorArgs)
+	bOversampling = grid[-1].shape[0] > 1
+	width  = x2-x1+1
+	height = y2-y1+1
+	flags = np.zeros(width * height, dtype=np.uint8)
+	queue = np.zeros(width * height, dtype=np.int32)
+	head = 0
+	tail = 0
+	calculated = 0
+
+	# Queue border pixels. Every pixel is queued only once, so the queue cannot overflow
+	for p in range(width * height):
+		x = p % width
+		y = p // width
+		if x == 0 or y == 0 or x == width-1 or y == height-1:
+			flags[p] = BT_QUEUED
+			queue[tail] = p
+			tail += 1
+
+	while head < tail:
+		p = queue[head]
+		head += 1
+		x = p % width
+		y = p // width
+
+		# Calculate pixel and its neighbours
+		for nx, ny in ((x, y), (x-1, y), (x+1, y), (x, y-1), (x, y+1)):
+			if nx >= 0 and ny >= 0 and nx < width and ny < height and flags[ny*width+nx] & BT_CALCULATED == 0:
+				calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1+nx, y1+ny)
+				flags[ny*width+nx] |= BT_CALCULATED
+				calculated += 1
+
+		# Queue neighbours in other regions. Diagonal neighbours are queued, if an
+		# adjacent horizontal or vertical neighbour is in another region
+		l = x > 0 and isRegionBorder(dataMap, x1+x, y1+y, x1+x-1, y1+y, bShading, bStripes)
+		r = x < width-1 and isRegionBorder(dataMap, x1+x, y1+y, x1+x+1, y1+y, bShading, bStripes)
+		u = y > 0 and isRegionBorder(dataMap, x1+x, y1+y, x1+x, y1+y-1, bShading, bStripes)
+		d = y < height-1 and isRegionBorder(dataMap, x1+x, y1+y, x1+x, y1+y+1, bShading, bStripes)
+
+		for nx, ny, bQueue in ((x-1, y, l), (x+1, y, r), (x, y-1, u), (x, y+1, d),
+							   (x-1, y-1, l or u), (x+1, y-1, r or u), (x-1, y+1, l or d), (x+1, y+1, r or d)):
+			if bQueue and nx >= 0 and ny >= 0 and nx < width and ny < height and flags[ny*width+nx] & BT_QUEUED == 0:
+				flags[ny*width+nx] |= BT_QUEUED
+				queue[tail] = ny*width+nx
+				tail += 1
+
+	# Fill regions. The left and right border pixels of each line have been calculated
+	for y in range(height):
+		left = 0
+		for x in range(1, width):
+			if flags[y*width+x] & BT_CALCULATED != 0:
+				if x-left > 1:
+					ax, bx, py = x1+left, x1+x, y1+y
+					bSameColor = (imageMap[py, ax, 0] == imageMap[py, bx, 0] and imageMap[py, ax, 1] == imageMap[py, bx, 1] and
+								  imageMap[py, ax, 2] == imageMap[py, bx, 2])
+					if bPatterns and dataMap[py, ax, ID_ITER] >= 0:
+						calculated += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, ax+1, py, bx-1, py)
+					elif bSameColor or not bOversampling:
+						interpolateLine(colorArgs, imageMap, dataMap, ax, py, bx, py, not bSameColor)
+					else:
+						calculated += calculateArea(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, ax+1, py, bx-1, py)
+				left = x
+
+	return calculated
+
+###############################################################################
+#
+# Draw area with boundary tracing method (Mariani-Silver)
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   dataMap - Iteration data with shape (height, width, ID_SIZE)
+#   x1, y1, x2, y2 - Area, end points included
+#   tileSize - Size of tiles processed in parallel
+#
+# The area is split into tiles. Tiles are traced independently and in
+# parallel, see boundaryTraceTile(). Memory usage for tracing is limited
+# by the tile size and the number of threads.
+#
+# Returns:
+#
+#   Number of calculated pixels
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def boundaryTrace(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+				  x1: int, y1: int, x2: int, y2: int, tileSize: int) -> int:
+	columns = (x2-x1) // tileSize + 1
+	rows = (y2-y1) // tileSize + 1
+	calculated = np.zeros(columns * rows, dtype=np.int64)
+
+	for t in nb.prange(columns * rows):
+		tx = x1 + (t % columns) * tileSize
+		ty = y1 + (t // columns) * tileSize
+		calculated[t] = boundaryTraceTile(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap,
+										  tx, ty, min(tx+tileSize-1, x2), min(ty+tileSize-1, y2))
+
+	return calculated.sum()
+
+# Maximum number of line segments on stack of solid guessing. Every split replaces
+# 1 segment by 2, so 1 entry per split level is sufficient
+SG_STACK_SIZE = 64
+
+# Coordinates of grid lines with distance step between c1 and c2, c2 included
+@nb.njit(cache=False)
+def gridLines(c1: int, c2: int, step: int) -> np.ndarray:
+	n = (c2-c1+step-1) // step + 1
+	lines = np.zeros(n, dtype=np.int64)
+	for i in range(n):
+		lines[i] = min(c1 + i*step, c2)
+	return lines
+
+# Fill inner pixels of horizontal or vertical line (x1, y1) - (x2, y2) by interpolating the
+# iteration data of the end points. The interpolated data is mapped to colors, if bColorize
+# is True. Otherwise the line is filled with the color of pixel (x1, y1). Inside the set,
+# data and color of pixel (x1, y1) are copied
+@nb.njit(cache=False)
+def interpolateLine(colorArgs, imageMap: np.ndarray, dataMap: np.ndarray, x1: int, y1: int, x2: int, y2: int, bColorize: bool):
+	n = x2-x1+y2-y1
+	dx = 1 if x2 > x1 else 0
+	dy = 1 if y2 > y1 else 0
+	for k in range(1, n):
+		x = x1+k*dx
+		y = y1+k*dy
+		if dataMap[y1, x1, ID_ITER] < 0:
+			# Inside the set, interpolation would change the flags in ID_ITER
+			dataMap[y, x] = dataMap[y1, x1]
+			imageMap[y, x] = imageMap[y1, x1]
+			continue
+
+		t = k / n
+		for i in range(ID_SIZE):
+			dataMap[y, x, i] = (1-t) * dataMap[y1, x1, i] + t * dataMap[y2, x2, i]
+		if bColorize:
+			imageMap[y, x] = frc.colorizeData(colorArgs[0], dataMap[y, x], *colorArgs[1:])
+		else:
+			imageMap[y, x] = imageMap[y1, x1]
+
+###############################################################################
+#
+# Guess inner pixels of horizontal or vertical line (x1, y1) - (x2, y2)
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap, dataMap - Image array and iteration data
+#   x1, y1, x2, y2 - Line, end points must be calculated or guessed
+#   maxGuess - Maximum length of guessed line segments
+#   bShading, bStripes - See isSameData()
+#   bPatterns - Guess only segments inside the set, see hasPatterns()
+#
+# A line segment is guessed by interpolating the iteration data of its end
+# points, if the data of both end points is the same, see isSameData(). With
+# oversampling, the colors of the end points must be the same, too.
+# Otherwise the middle pixel is calculated and both halves are processed
+# in the same way.
+#
+# Returns:
+#
+#   Number of calculated pixels
+#
+###############################################################################
+@nb.njit(cache=False)
+def guessLine(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+			  x1: int, y1: int, x2: int, y2: int, maxGuess: int, bShading: bool, bStripes: bool, bPatterns: bool) -> int:
+	dx = 1 if x2 > x1 else 0
+	dy = 1 if y2 > y1 else 0
+	bOversampling = grid[-1].shape[0] > 1
+	stack = np.zeros((SG_STACK_SIZE, 2), dtype=np.int64)
+	stack[0, 0] = 0
+	stack[0, 1] = x2-x1+y2-y1
+	top = 1
+	calculated = 0
+
+	while top > 0:
+		top -= 1
+		a, b = stack[top]
+		if b-a < 2:
+			# No inner pixels
+			continue
+
+		ax, ay = x1+a*dx, y1+a*dy
+		bx, by = x1+b*dx, y1+b*dy
+		bGuess = (b-a <= maxGuess and (not bPatterns or dataMap[ay, ax, ID_ITER] < 0) and
+				  isSameData(dataMap[ay, ax], dataMap[by, bx], bShading, bStripes))
+		bSameColor = (imageMap[ay, ax, 0] == imageMap[by, bx, 0] and imageMap[ay, ax, 1] == imageMap[by, bx, 1] and
+					  imageMap[ay, ax, 2] == imageMap[by, bx, 2])
+		if bGuess and (bSameColor or not bOversampling):
+			interpolateLine(colorArgs, imageMap, dataMap, ax, ay, bx, by, not bSameColor)
+		else:
+			m = (a+b) // 2
+			calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, x1+m*dx, y1+m*dy)
+			calculated += 1
+			stack[top, 0], stack[top, 1] = a, m
+			stack[top+1, 0], stack[top+1, 1] = m, b
+			top += 2
+
+	return calculated
+
+###############################################################################
+#
+# Draw area with solid guessing method
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   dataMap - Iteration data with shape (height, width, ID_SIZE)
+#   x1, y1, x2, y2 - Area, end points included
+#   gridStep - Distance of pixels of the coarse grid
+#   guessSafety - Guess safety level. Line segments and cells are only
+#     guessed, if they are not longer than gridStep >> guessSafety
+#
+# The pixels of a coarse grid are calculated first. Then the grid lines are
+# guessed from the grid pixels, see guessLine(). Every grid cell is guessed
+# by interpolating the iteration data of its border, if all border pixels
+# have the same iteration data. Otherwise the middle pixel of the cell is
+# calculated, the middle lines are guessed and the 4 sub cells are processed
+# in the same way. Guessing only depends on the iteration data, so features
+# smaller than the guessed segments may be missed. Higher safety levels
+# reduce the size of guessed segments. With oversampling, only segments and
+# cells with the same border color are guessed, see squareEstimation(). With
+# stripes or steps, only segments and cells inside the set are guessed, see
+# hasPatterns().
+#
+# Grid pixels, grid lines and grid cells are processed in parallel.
+#
+# Returns:
+#
+#   Statistics array [guessed pixels, calculated pixels]
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def solidGuessing(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, dataMap: np.ndarray,
+				  x1: int, y1: int, x2: int, y2: int, gridStep: int, guessSafety: int) -> np.ndarray:
+	bShading = colorArgs[3] & FO_SHADING != 0
+	bStripes = colorArgs[5][0] > 0
+	bPatterns = hasPatterns(colorArgs)
+	bOversampling = grid[-1].shape[0] > 1
+	maxGuess = max(gridStep >> guessSafety, 2)
+	xLines = gridLines(x1, x2, gridStep)
+	yLines = gridLines(y1, y2, gridStep)
+	columns = xLines.shape[0]
+	rows = yLines.shape[0]
+
+	# Grid pixels
+	for j in nb.prange(rows):
+		for i in range(columns):
+			calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, xLines[i], yLines[j])
+	calculated = columns * rows
+
+	# Grid lines, horizontal lines first
+	hLines = (columns-1) * rows
+	lineStats = np.zeros(hLines + columns * (rows-1), dtype=np.int64)
+	for l in nb.prange(lineStats.shape[0]):
+		if l < hLines:
+			i, j = l % (columns-1), l // (columns-1)
+			lineStats[l] = guessLine(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap,
+									 xLines[i], yLines[j], xLines[i+1], yLines[j], maxGuess, bShading, bStripes, bPatterns)
+		else:
+			i, j = (l-hLines) % columns, (l-hLines) // columns
+			lineStats[l] = guessLine(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap,
+									 xLines[i], yLines[j], xLines[i], yLines[j+1], maxGuess, bShading, bStripes, bPatterns)
+	calculated += lineStats.sum()
+
+	# Grid cells
+	cellStats = np.zeros((columns-1) * (rows-1), dtype=np.int64)
+	for c in nb.prange(cellStats.shape[0]):
+		i, j = c % (columns-1), c // (columns-1)
+		stack = np.zeros((SQEM_STACK_SIZE, 4), dtype=np.int64)
+		stack[0, 0], stack[0, 1], stack[0, 2], stack[0, 3] = xLines[i], yLines[j], xLines[i+1], yLines[j+1]
+		top = 1
+
+		while top > 0:
+			top -= 1
+			rx1, ry1, rx2, ry2 = stack[top]
+			if min(rx2-rx1+1, ry2-ry1+1) < 3:
+				# No inner pixels
+				continue
+
+			border = SQEM_SPLIT
+			if max(rx2-rx1, ry2-ry1) <= maxGuess:
+				border = checkBorder(imageMap, dataMap, rx1, ry1, rx2, ry2, bShading, bStripes, False)
+			if border == SQEM_INTERPOLATE and bOversampling:
+				border = SQEM_SPLIT
+			if bPatterns and dataMap[ry1, rx1, ID_ITER] >= 0:
+				border = SQEM_SPLIT
+
+			if border != SQEM_SPLIT:
+				interpolateArea(colorArgs, imageMap, dataMap, rx1, ry1, rx2, ry2, border == SQEM_INTERPOLATE)
+			else:
+				midX = (rx1+rx2) // 2
+				midY = (ry1+ry2) // 2
+				calculatePixel(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap, midX, midY)
+				cellStats[c] += 1
+				for lx1, ly1, lx2, ly2 in ((rx1, midY, midX, midY), (midX, midY, rx2, midY), (midX, ry1, midX, midY), (midX, midY, midX, ry2)):
+					cellStats[c] += guessLine(pointFnc, gridFnc, grid, args, colorArgs, imageMap, dataMap,
+											  lx1, ly1, lx2, ly2, maxGuess, bShading, bStripes, bPatterns)
+				for rect in subRectangles(rx1, ry1, rx2, ry2, midX, midY):
+					stack[top] = rect
+					top += 1
+	calculated += cellStats.sum()
+
+	stats = np.zeros(2, dtype=np.int64)
+	stats[0] = (x2-x1+1) * (y2-y1+1) - calculated
+	stats[1] = calculated
+	return stats
+
+###############################################################################
+#
+# Find pixels with high contrast to their neighbours
+#
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   dataMap - Iteration data with shape (height, width, ID_SIZE) or empty
+#     array, if the draw mode doesn't create iteration data
+#   x1, y1, x2, y2 - Area, end points included. Neighbours outside of the
+#     area are also compared
+#   threshold - Minimum difference of a color channel
+#
+# A pixel has high contrast, if one of its 8 neighbours differs by at least
+# threshold in a color channel, by more than AA_MAX_ITER_DIFF in the smooth
+# iteration count or if only one of both pixels is inside the set.
+#
+# Returns:
+#
+#   Boolean mask of the area with shape (y2-y1+1, x2-x1+1)
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def findContrastPixels(imageMap: np.ndarray, dataMap: np.ndarray, x1: int, y1: int, x2: int, y2: int, threshold: int) -> np.ndarray:
+	height, width = imageMap.shape[:2]
+	bData = dataMap.shape[0] == height
+	mask = np.zeros((y2-y1+1, x2-x1+1), dtype=np.bool_)
+
+	for y in nb.prange(y1, y2+1):
+		for x in range(x1, x2+1):
+			for ny in range(max(y-1, 0), min(y+2, height)):
+				for nx in range(max(x-1, 0), min(x+2, width)):
+					for c in range(3):
+						if abs(int(imageMap[y, x, c]) - int(imageMap[ny, nx, c])) >= threshold:
+							mask[y-y1, x-x1] = True
+					if bData:
+						i1, i2 = dataMap[y, x, ID_ITER], dataMap[ny, nx, ID_ITER]
+						if (i1 < 0) != (i2 < 0) or (i1 >= 0 and abs(i1 - i2) > AA_MAX_ITER_DIFF):
+							mask[y-y1, x-x1] = True
+	return mask
+
+###############################################################################
+#
+# Recalculate colors of pixels with all sub-samples
+#
+#   pointFnc, gridFnc, grid, args - Pixel function of calculation engine,
+#     the sub-samples are the last element of grid
+#   colorArgs - Parameters of fractal.colorizeData()
+#   imageMap - Image array with shape (height, width, 3), dtype=uint8
+#   xs, ys - Pixel coordinates
+#
+# The color of a pixel is the average color of its sub-samples in linear
+# light, see downsample.addLinear(). Iteration
+# data are not changed. Pixels are calculated in parallel.
+#
+###############################################################################
+@nb.njit(cache=False, parallel=True)
+def refinePixels(pointFnc, gridFnc, grid, args, colorArgs, imageMap: np.ndarray, xs: np.ndarray, ys: np.ndarray):
+	samples = grid[-1].shape[0]
+	for i in nb.prange(xs.shape[0]):
+		total = np.zeros(3, dtype=np.float64)
+		for s in range(samples):
+			ds.addLinear(total, frc.colorizeData(colorArgs[0], pointFnc(gridFnc(grid, xs[i], ys[i], s), *args), *colorArgs[1:]))
+		ds.storeAverage(total, samples, imageMap[ys[i], xs[i]])
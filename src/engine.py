@@ -0,0 +1,378 @@
+#
+# Calculation engines
+#
+# An engine hides the calculation method (standard, double-double or perturbation) behind
+# functions for calculating the colors of pixel coordinates. All draw
+# strategies of the Drawer calculate pixels through an engine, so every
+# draw strategy works with every calculation method.
+#
+# Engines are selected manually or automatically depending on the zoom
+# depth, see selectEngine().
+#
+# Compiled draw strategies (see drawmodes.py) get the point calculation
+# function of the engine with getPixelFunction().
+#
+
+import copy
+import math
+import time
+
+import numpy as np
+import numba as nb
+
+import fractal as frc
+import ddouble as dd
+import mandelbrot as man
+import julia as jul
+
+
+###############################################################################
+#
+# Engine base class, calculation with standard kernels
+#
+# Pixel coordinates are indices of the coordinate tables of the fractal,
+# which must be created with Fractal.beginCalc() before an engine is used.
+# The kernels combine the table values of the column and the row of a pixel,
+# so no complex grid is created, not even for the calculated area.
+#
+###############################################################################
+
+class Engine:
+
+	name = 'Float64'
+
+	# Engines with lower tier are faster. Automatic selection benchmarks suitable engines of the same tier
+	tier = 0
+
+	# Engine requires coordinate tables with distances to reference point
+	perturbation = False
+
+	# Minimum pixel spacing relative to the magnitude of the coordinates
+	minRelSpacing = 1e-13
+
+	# Vectorized kernels by fractal type
+	iterFnc = {
+		'Mandelbrot': man.calculateVectorZ2,
+		'Julia':      jul.calculateVectorZ2
+	}
+
+	# Point calculation functions by fractal type, used by compiled draw strategies
+	pointFnc = {
+		'Mandelbrot': man.calculatePointZ2,
+		'Julia':      jul.calculatePointZ2
+	}
+
+	def __init__(self, fractal: frc.Fractal, fractalType: str, palette: np.ndarray, calcParameters: tuple):
+		self.fractal = fractal
+		self.fractalType = fractalType
+		self.palette = palette
+		self.calcParameters = calcParameters
+		self.kernel = self.iterFnc.get(fractalType)
+
+	# Check if engine supports the fractal type
+	@classmethod
+	def supports(cls, fractalType: str) -> bool:
+		return cls.iterFnc.get(fractalType) is not None
+
+	# Check if engine is precise enough for the pixel spacing
+	@classmethod
+	def isSuitable(cls, spacing: float, relSpacing: float) -> bool:
+		return relSpacing >= cls.minRelSpacing
+
+	# Exponent for scaling the distances to the reference point
+	@classmethod
+	def getDeltaScale(cls, fractal: frc.Fractal) -> int:
+		return 0
+
+	# Additional kernel parameters passed after the coordinates
+	def getKernelArgs(self) -> tuple:
+		return ()
+
+	# Return coordinate tables (xTab, yTab) of the columns and rows
+	def getTables(self) -> tuple:
+		return (self.fractal.xTab, self.fractal.yTab)
+
+	# Return pixel function for compiled draw strategies as tuple (pointFnc, gridFnc, grid, args).
+	# The grid data are the coordinate tables and the sub-sample offsets (xTab, yTab, samples).
+	# The iteration data of sub-sample s of pixel (x, y) is calculated by pointFnc(gridFnc(grid, x, y, s), *args)
+	def getPixelFunction(self) -> tuple:
+		args = self.getKernelArgs() + self.fractal.getPointParameters(self.calcParameters)
+		return (self.pointFnc[self.fractalType], gridPoint, self.getTables() + (self.fractal.samples,), args)
+
+	# Return parameters for mapping iteration data to colors with fractal.colorizeData()
+	def getColorArgs(self) -> tuple:
+		return (self.palette,) + self.fractal.getColorParameters(self.calcParameters)
+
+	# Calculate colors of pixel rows. X contains the column coordinates of a row, Y the
+	# row coordinates. Y is broadcast against the leading dimensions of X. The colors of
+	# the sub-samples of every pixel are averaged inside the kernel
+	def calculate(self, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+		return self.kernel(X, Y, self.fractal.samples, *self.getKernelArgs(), self.palette, *self.calcParameters)
+
+	# Calculate colors of area (x1, y1) - (x2, y2), end points included. Only every xStep-th
+	# column and every yStep-th row is calculated
+	# Returns array with shape (rows, columns, 3)
+	def calculateArea(self, x1: int, y1: int, x2: int, y2: int, xStep: int = 1, yStep: int = 1) -> np.ndarray:
+		xTab, yTab = self.getTables()
+		return self.calculate(xTab[x1:x2+1:xStep], yTab[y1:y2+1:yStep])
+
+	# Calculate colors of horizontal or vertical line, end points included
+	# Returns array with shape (n, 3)
+	def calculateLine(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+		xTab, yTab = self.getTables()
+		if y1 == y2:
+			return self.calculate(xTab[x1:x2+1], yTab[y1])
+		else:
+			return self.calculate(xTab[x1:x1+1], yTab[y1:y2+1])[:, 0]
+
+	# Calculate colors of pixels with coordinates xs, ys (arrays of same shape or broadcastable)
+	# Returns array with the broadcast shape of xs and ys and an additional dimension of size 3
+	def calculatePoints(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+		xTab, yTab = self.getTables()
+		return self.calculate(xTab[np.expand_dims(xs, -1)], yTab[ys])[..., 0, :]
+
+
+###############################################################################
+#
+# Double-double engine
+#
+# Pixel coordinates are calculated with double-double precision from the
+# corner of the fractal area and the pixel offsets, see ddouble.py. The
+# coordinate tables of the fractal are only used for the grid size. The kernels
+# iterate with double-double precision, so this engine is about 10 times
+# slower than the standard engine, but doesn't need a reference orbit.
+#
+###############################################################################
+
+class DoubleDoubleEngine(Engine):
+
+	name = 'Double-double'
+
+	tier = 1
+
+	# Double-double numbers have 106 bits precision, some bits are lost during iteration
+	minRelSpacing = 1e-29
+
+	iterFnc = {
+		'Mandelbrot': man.calculateVectorZ2DD,
+		'Julia':      jul.calculateVectorZ2DD
+	}
+
+	pointFnc = {
+		'Mandelbrot': man.calculatePointZ2DD,
+		'Julia':      jul.calculatePointZ2DD
+	}
+
+	def __init__(self, fractal: frc.Fractal, fractalType: str, palette: np.ndarray, calcParameters: tuple):
+		super().__init__(fractal, fractalType, palette, calcParameters)
+		self.xTab, self.yTab = fractal.mapScreenCoordinatesDD(len(fractal.xTab), len(fractal.yTab))
+
+	# Table values are double-double numbers [hi, lo]
+	def getTables(self) -> tuple:
+		return (self.xTab, self.yTab)
+
+	def getPixelFunction(self) -> tuple:
+		pointFnc, _, grid, args = super().getPixelFunction()
+		return (pointFnc, gridPointDD, grid, args)
+
+
+###############################################################################
+#
+# Perturbation engine
+#
+# The coordinate tables contain the distances to the reference point. The
+# reference orbit is passed to the kernels.
+#
+###############################################################################
+
+class PerturbationEngine(Engine):
+
+	name = 'Perturbation'
+
+	tier = 1
+
+	perturbation = True
+
+	# Minimum absolute pixel spacing. Below, the derivation used for distance
+	# estimation and the squared deltas run out of double precision range
+	minSpacing = 1e-280
+
+	iterFnc = {
+		'Mandelbrot': man.calculateVectorZ2Pert,
+		'Julia':      None	# To be implemented
+	}
+
+	pointFnc = {
+		'Mandelbrot': man.calculatePointZ2Pert,
+		'Julia':      None
+	}
+
+	@classmethod
+	def isSuitable(cls, spacing: float, relSpacing: float) -> bool:
+		return spacing >= cls.minSpacing
+
+	def getKernelArgs(self) -> tuple:
+		return self.fractal.refOrbit.getKernelArgs() + (self.getDeltaScale(self.fractal),)
+
+
+###############################################################################
+#
+# Extended range perturbation engine
+#
+# Distances to the reference point are scaled by 2^deltaScale, so they don't
+# underflow. The kernel iterates scaled deltas until they are large enough
+# for double precision.
+#
+###############################################################################
+
+class ExtendedPerturbationEngine(PerturbationEngine):
+
+	name = 'Extended perturbation'
+
+	tier = 2
+
+	@classmethod
+	def isSuitable(cls, spacing: float, relSpacing: float) -> bool:
+		return True
+
+	# Scale size of fractal area to range [0.5, 1)
+	@classmethod
+	def getDeltaScale(cls, fractal: frc.Fractal) -> int:
+		return -math.frexp(abs(fractal.settings['size']))[1]
+
+
+# Grid value of sub-sample s of pixel (x, y) of coordinate tables (xTab, yTab, samples)
+@nb.njit(cache=False)
+def gridPoint(grid: tuple, x: int, y: int, s: int) -> complex:
+	xTab, yTab, samples = grid
+	return complex(xTab[x] + samples[s, 0], yTab[y] + samples[s, 1])
+
+# Grid value of sub-sample s of pixel (x, y) of double-double coordinate tables (xTab, yTab, samples)
+@nb.njit(cache=False)
+def gridPointDD(grid: tuple, x: int, y: int, s: int) -> tuple:
+	xTab, yTab, samples = grid
+	return dd.add(xTab[x, 0], xTab[x, 1], samples[s, 0], 0.0) + dd.add(yTab[y, 0], yTab[y, 1], samples[s, 1], 0.0)
+
+
+# Engines by name, in order of automatic selection
+engines = {
+	'Float64':               Engine,
+	'Double-double':         DoubleDoubleEngine,
+	'Perturbation':          PerturbationEngine,
+	'Extended perturbation': ExtendedPerturbationEngine
+}
+
+###############################################################################
+#
+# Benchmark engines
+#
+#   fractal - Fractal object
+#   fractalType - Fractal type
+#   candidates - List of engine classes
+#   palette - Color palette
+#   width, height - Image size
+#
+# Every engine calculates a probe grid with benchmarkSize x benchmarkSize
+# pixels spread over the whole fractal area. The time for drawing the
+# fractal is estimated from the time for preparing the calculation (i.e.
+# the reference orbit) and the calculation time per pixel. The engines are
+# benchmarked with a shallow copy of the fractal, so the coordinate tables
+# and the reference orbit of the fractal are kept. The settings are shared,
+# but not changed.
+#
+# Returns:
+#
+#   List with estimated drawing times in seconds
+#
+###############################################################################
+
+# Size of probe grid
+benchmarkSize = 24
+
+def benchmarkEngines(fractal: frc.Fractal, fractalType: str, candidates: list[type[Engine]], palette: np.ndarray,
+					 width: int, height: int) -> list[float]:
+	calcParameters = fractal.getCalcParameters()
+	probe = copy.copy(fractal)
+	times = []
+
+	for engineClass in candidates:
+		deltaScale = engineClass.getDeltaScale(probe)
+
+		# 1st run compiles the numba functions, so only the 2nd run is measured
+		for run in range(2):
+			startTime = time.perf_counter()
+			probe.mapScreenCoordinates(benchmarkSize, benchmarkSize, aspectRatio=False, perturbation=engineClass.perturbation, deltaScale=deltaScale)
+			engine = engineClass(probe, fractalType, palette, calcParameters)
+			prepareTime = time.perf_counter() - startTime
+
+			startTime = time.perf_counter()
+			engine.calculateArea(0, 0, benchmarkSize-1, benchmarkSize-1)
+			pixelTime = (time.perf_counter() - startTime) / (benchmarkSize * benchmarkSize)
+
+		times.append(prepareTime + pixelTime * width * height)
+
+	return times
+
+###############################################################################
+#
+# Select engine class for fractal
+#
+#   fractal - Fractal object
+#   fractalType - Fractal type
+#   width, height - Image size
+#   palette - Color palette, used for benchmarking engines
+#
+# If engine setting of the fractal is 'Auto', the engine with the lowest
+# tier which is precise enough for the pixel spacing is selected. The pixel
+# spacing is compared absolute and relative to the magnitude of the
+# coordinates. If several engines of this tier are suitable, they are
+# benchmarked and the fastest one is selected. Results are cached by zoom
+# depth.
+# If no suitable engine supports the fractal type, the last supporting
+# engine is selected.
+#
+# Returns:
+#
+#   Tuple with engine class (None if fractal type is not supported by the
+#   selected engine) and text with reason for selection
+#
+###############################################################################
+
+# Fastest engines by fractal type, zoom depth, max. iterations and image size
+benchmarkResults = {}
+
+# Pixel spacing of fractal area absolute and relative to the magnitude of the coordinates
+# Returns tuple (spacing, relative spacing)
+def getSpacing(fractal: frc.Fractal, width: int, height: int) -> tuple[float, float]:
+	corner, size = fractal.settings.getValues(['corner', 'size'])
+	spacing = min(abs(fractal.dx(width)), abs(fractal.dy(height)))
+	magnitude = max(abs(corner.real), abs(corner.imag), abs(corner.real + size.real), abs(corner.imag + size.imag))
+	return (spacing, spacing / magnitude if magnitude > 0 else math.inf)
+
+def selectEngine(fractal: frc.Fractal, fractalType: str, width: int, height: int, palette: np.ndarray) -> tuple[type[Engine] | None, str]:
+	engineName = fractal.settings['engine']
+
+	if engineName != 'Auto':
+		engineClass = engines[engineName]
+		return (engineClass if engineClass.supports(fractalType) else None, "selected manually")
+
+	spacing, relSpacing = getSpacing(fractal, width, height)
+	reason = f"pixel spacing {spacing:.3g}, relative {relSpacing:.3g}"
+
+	supported = [e for e in engines.values() if e.supports(fractalType)]
+	suitable = [e for e in supported if e.isSuitable(spacing, relSpacing)]
+	if len(suitable) == 0:
+		return (supported[-1], f"relative pixel spacing {relSpacing:.3g} too small for {fractalType}")
+
+	candidates = [e for e in suitable if e.tier == suitable[0].tier]
+	if len(candidates) == 1:
+		return (candidates[0], reason)
+
+	depth = math.floor(math.log10(relSpacing))
+	key = (fractalType, depth, fractal.getMaxValue(), width * height, tuple(e.name for e in candidates))
+	if key not in benchmarkResults:
+		times = benchmarkEngines(fractal, fractalType, candidates, palette, width, height)
+		print("Estimated drawing times: " + ", ".join(f"{e.name} {t:.3f}s" for e, t in zip(candidates, times)))
+		benchmarkResults[key] = candidates[times.index(min(times))]
+
+	return (benchmarkResults[key], reason + ", fastest at this depth")
@@ -0,0 +1,125 @@
+#
+# Image export
+#
+# Images are encoded on a background thread, so the GUI isn't blocked while
+# large images are compressed. The compression libraries release the GIL,
+# so encoding runs in parallel to the calculation of the next image.
+#
+# Image maps of the drawer contain the bottom row of the image first. They
+# are converted with the raw decoder of PIL, which reverses the row order
+# while copying the data. So no flipped copy of the image map is created.
+#
+
+import os
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import numpy as np
+from PIL import Image as Img
+
+
+# Export formats: name => (file extension, PIL format, encoder options)
+# Format None is a numpy array file with shape (height, width, 3)
+formats = {
+	'PNG (fast)':  ('.png',  'PNG',  {'compress_level': 1}),
+	'PNG':         ('.png',  'PNG',  {'compress_level': 6}),
+	'PNG (small)': ('.png',  'PNG',  {'compress_level': 9}),
+	'TIFF':        ('.tif',  'TIFF', {'compression': 'raw'}),
+	'NPY':         ('.npy',  None,   {}),
+	'JPEG':        ('.jpg',  'JPEG', {'quality': 90}),
+	'WebP':        ('.webp', 'WEBP', {'quality': 85, 'method': 0})
+}
+
+# Return name of export format for file name. The first format with the extension of the file is used
+def getFormat(fileName: str, default: str = 'PNG (fast)') -> str:
+	extension = os.path.splitext(fileName)[1].lower()
+	if extension == '.jpeg': extension = '.jpg'
+	if extension == '.tiff': extension = '.tif'
+	for name, (ext, _, _) in formats.items():
+		if ext == extension:
+			return name
+	return default
+
+# Convert image map with bottom row first to PIL image with top row first
+def toImage(imageMap: np.ndarray) -> Img.Image:
+	height, width = imageMap.shape[:2]
+	return Img.frombuffer('RGB', (width, height), np.ascontiguousarray(imageMap), 'raw', 'RGB', 0, -1)
+
+###############################################################################
+#
+# Save image map
+#
+#   imageMap - Image array with shape (height, width, 3) and bottom row first
+#     or PIL image
+#   fileName - Name of image file
+#   format - Export format, see formats
+#
+# The image is written to a temporary file first, so an incomplete file
+# never replaces an existing image.
+#
+###############################################################################
+def saveImage(imageMap: np.ndarray | Img.Image, fileName: str, format: str):
+	_, pilFormat, options = formats[format]
+	with open(fileName + '.tmp', 'wb') as f:
+		if pilFormat is None:
+			np.save(f, np.asarray(imageMap) if isinstance(imageMap, Img.Image) else imageMap[::-1])
+		else:
+			(imageMap if isinstance(imageMap, Img.Image) else toImage(imageMap)).save(f, pilFormat, **options)
+	os.replace(fileName + '.tmp', fileName)
+
+
+###############################################################################
+#
+# Background image exporter
+#
+#   maxPending - Maximum number of images waiting for encoding. Further
+#     images are refused, so memory usage is limited
+#
+# Images are encoded one after another in the order of submission. The
+# submit methods never block the calling thread. Failed exports are
+# reported by the future of the export, i.e. by a done callback. They are
+# never raised by the exporter.
+#
+###############################################################################
+
+class ImageExporter:
+
+	def __init__(self, maxPending: int = 2):
+		self.maxPending = maxPending
+		self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+		self.pending = []
+
+	# Number of exports not finished yet
+	def getPending(self) -> int:
+		self.pending = [future for future in self.pending if not future.done()]
+		return len(self.pending)
+
+	# Encode image in background. The image map is converted to a PIL image (or copied
+	# for NPY files) before, so the caller can modify the image map afterwards.
+	# Returns future of the export or None, if too many exports are pending
+	def submit(self, imageMap: np.ndarray, fileName: str, format: str, onDone=None) -> Future | None:
+		if self.getPending() >= self.maxPending:
+			return None
+		image = imageMap.copy() if formats[format][1] is None else toImage(imageMap)
+		return self.submitCall(saveImage, image, fileName, format, onDone=onDone)
+
+	# Call function in background. Used for writers, which encode image data themselves.
+	# onDone is called with the future, when the call is finished. Returns future of the
+	# call or None, if too many calls are pending
+	def submitCall(self, fnc, *args, onDone=None) -> Future | None:
+		if self.getPending() >= self.maxPending:
+			return None
+		future = self.executor.submit(fnc, *args)
+		if onDone is not None:
+			future.add_done_callback(onDone)
+		self.pending.append(future)
+		return future
+
+	# Wait until at most maxPending exports are pending. Must not be called by the GUI thread
+	def wait(self, maxPending: int = 0):
+		while self.getPending() > maxPending:
+			concurrent.futures.wait(self.pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+	def close(self):
+		self.executor.shutdown(wait=True)
+		self.pending = []
@@ -6,6 +6,8 @@ import numpy as np
 import numba as nb
 import tkconfigure.tkconfigure as tkc
 import colors as col
+import reforbit as ro
+import ddouble as dd
 
 from constants import *
 
@@ -16,6 +18,9 @@ from constants import *
 
 class Fractal:
 
+	# Symmetry of the fractal, see FS_xxx constants. Override in derived classes
+	symmetry = FS_NONE
+
 	def __init__(self, corner: complex, size: complex, stripes: int = 0, steps: int = 0, ncycle: int = 1):
 
 		"""
@@ -134,12 +139,35 @@ gives the object some color""",
 					"label":     "Size",
 					"width":     30
 				},
-				"perturbation": {
+				"cornerDD": {
+					"inputtype": "list",
+					"initvalue": []
+				},
+				"engine": {
+					"tooltip":   "Calculation engine. 'Auto' selects the engine depending on the zoom depth",
+					"inputtype": "str",
+					"valrange":  ["Auto", "Float64", "Double-double", "Perturbation", "Extended perturbation"],
+					"initvalue": "Auto",
+					"widget":    "TKCListbox",
+					"label":     "Engine",
+					"width":     20
+				},
+				"autoReference": {
+					"tooltip":   "Probe the view for the longest orbit and a periodic nucleus to be used as perturbation reference",
 					"inputtype": "int",
 					"valrange":  (0, 1),
-					"initvalue": 0,
+					"initvalue": 1,
 					"widget":    "TKCCheckbox",
-					"label":     "Use perturbation method"
+					"label":     "Automatic reference point"
+				},
+				"orbitStorage": {
+					"tooltip":   "Compressed reference orbits are recalculated on the fly by the perturbation kernel",
+					"inputtype": "str",
+					"valrange":  ["Auto", "Full", "Compressed"],
+					"initvalue": "Auto",
+					"widget":    "TKCListbox",
+					"label":     "Reference orbit",
+					"width":     12
 				}
 			},
 			"Colorization": {
@@ -197,12 +225,47 @@ gives the object some color""",
 					"width":     120
 				},
 				"oversampling": {
+					"tooltip":   "Number of sub-samples per pixel in each direction",
 					"inputtype": "int",
-					"valrange":  (1, 3),
+					"valrange":  (1, 8),
 					"initvalue": 1,
 					"widget":    "TKCSlider",
 					"label":     "Oversampling",
 					"width":     120
+				},
+				"aaFilter": {
+					"tooltip":   "Filter for reducing sub-samples to pixels. Other filters than Box average in linear light",
+					"inputtype": "str",
+					"valrange":  ["Box", "Tent", "Mitchell", "Lanczos3"],
+					"initvalue": "Box",
+					"widget":    "TKCListbox",
+					"label":     "Oversampling filter",
+					"width":     12
+				},
+				"jitter": {
+					"tooltip":   "Shift sub-samples randomly inside their part of the pixel (Box filter only)",
+					"inputtype": "int",
+					"valrange":  (0, 1),
+					"initvalue": 0,
+					"widget":    "TKCCheckbox",
+					"label":     "Jittered oversampling"
+				},
+				"adaptiveAA": {
+					"tooltip":   "Oversample only pixels with high contrast to their neighbours",
+					"inputtype": "int",
+					"valrange":  (0, 1),
+					"initvalue": 0,
+					"widget":    "TKCCheckbox",
+					"label":     "Adaptive oversampling"
+				},
+				"aaThreshold": {
+					"tooltip":   "Minimum color difference of neighbour pixels for adaptive oversampling",
+					"inputtype": "int",
+					"valrange":  (1, 128),
+					"initvalue": 16,
+					"widget":    "TKCSlider",
+					"label":     "Contrast threshold",
+					"width":     120
 				}
 			},
 			"Light": {
@@ -224,11 +287,20 @@ gives the object some color""",
 			}
 		})
 
-		# Complex grid for fractal calculation
-		self.cplxGrid = np.array([], dtype=np.complex128)
+		# Coordinate tables for fractal calculation. The grid is separable, pixel (x, y)
+		# has the coordinate complex(xTab[x], yTab[y])
+		self.xTab = np.array([], dtype=np.float64)
+		self.yTab = np.array([], dtype=np.float64)
 
-		# Reference orbit for perturbation method
-		self.refOrbit = np.array([], dtype=np.complex128)
+		# Offsets of the sub-samples of a pixel in units of the coordinate tables, see createSamplePattern().
+		# The pixel spacing in units of the coordinate tables is stored in sampleScale
+		self.samples = np.zeros((1, 2), dtype=np.float64)
+		self.sampleScale = (1.0, 1.0)
+
+		# Reference point and reference orbit for perturbation method
+		self.refPoint = complex(0.0, 0.0)
+		self.refOrbit = ro.ReferenceOrbit(self.refPoint, np.array([], dtype=np.complex128))
+		self.refParameters = None	# Tuple (maxIter, bailout) of reference orbit
 
 		# Calculation time measurement
 		self.startTime = 0
@@ -289,12 +361,46 @@ gives the object some color""",
 
 		return (self.settings['colorize'], self.settings['paletteMode'], colorOptions, colorPar, light)
 
-	# Change fractal dimensions
-	def setDimensions(self, corner: complex, size: complex, sync: bool = True):
+	# Return tuple of parameters for point calculation functions, passed after the color palette.
+	# calcParameters is the tuple returned by getCalcParameters(). Must be implemented in derived classes!
+	def getPointParameters(self, calcParameters: tuple) -> tuple:
+		pass
+
+	# Return tuple of parameters for fractal.colorizeData(), passed after the color palette.
+	# calcParameters is the tuple returned by getCalcParameters()
+	def getColorParameters(self, calcParameters: tuple) -> tuple:
+		colorize, paletteMode, colorOptions, colorPar, light = calcParameters[:5]
+		return (colorize, paletteMode, colorOptions, calcParameters[-1], np.array(colorPar, dtype=np.float64),
+				np.array(light, dtype=np.float64))
+
+	# Bailout radius. Iteration coloring without shading doesn't need a large radius
+	@staticmethod
+	def getBailout(colorize: int, paletteMode: int, colorOptions: int) -> float:
+		return 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
+
+	# Change fractal dimensions. On deep zooms, the corner is the double-double number
+	# corner + cornerLo, see getCornerDD()
+	def setDimensions(self, corner: complex, size: complex, sync: bool = True, cornerLo: complex = 0j):
 		if size.real == 0 or size.imag == 0:
 			print("Error: fractal size cannot be zero")
 			return
-		self.settings.setValues(sync=sync, corner=corner, size=size)
+		reHi, reLo = dd.twoSum(corner.real, cornerLo.real)
+		imHi, imLo = dd.twoSum(corner.imag, cornerLo.imag)
+		self.settings.setValues(sync=sync, corner=complex(reHi, imHi), size=size, cornerDD=[reHi, reLo, imHi, imLo])
+
+	# Return corner of fractal area as double-double number (corner, cornerLo). Below a relative
+	# pixel spacing of about 1e-16, float64 cannot represent the corner of the pixel grid. The
+	# setting cornerDD contains the double-double corner. It's ignored, if the corner has been
+	# changed otherwise, i.e. in the main window
+	def getCornerDD(self) -> tuple[complex, complex]:
+		corner, cornerDD = self.settings.getValues(['corner', 'cornerDD'])
+		if len(cornerDD) == 4 and complex(cornerDD[0], cornerDD[2]) == corner:
+			return (corner, complex(cornerDD[1], cornerDD[3]))
+		return (corner, 0j)
+
+	# Return double-double corner moved by offset, see getCornerDD()
+	def moveCornerDD(self, offset: complex) -> tuple[complex, complex]:
+		return addComplexDD(*self.getCornerDD(), offset)
 
 	# Change fractal coordinates
 	def setCoordinates(self, left: float, right: float, bottom: float, top: float, sync: bool = True):
@@ -303,22 +409,37 @@ gives the object some color""",
 	# Zoom into screen area
 	def zoomArea(self, imageWidth: int, imageHeight: int, x1: int, y1: int, x2: int, y2: int):
 		size = self.mapWH(x2-x1+1, y2-y1+1, imageWidth, imageHeight)
-		corner = self.mapXY(x1, y1, imageWidth, imageHeight)
-		self.setDimensions(corner, size)
-
-	# Zoom in or out by specified percentage value
-	def zoom(self, percent: float, imageWidth: int, imageHeight: int, x: int = 0, y: int = 0):
+		corner, cornerLo = self.mapXYDD(x1, y1, imageWidth, imageHeight)
+		self.setDimensions(corner, size, cornerLo=cornerLo)
+
+	# Move fractal area by dx, dy pixels. Pixel x of the moved area is pixel x+dx of the current area
+	# Returns the distance in pixels, which differs from dx, dy, if the corner cannot be represented
+	# precise enough, see getCornerDD()
+	def pan(self, dx: int, dy: int, imageWidth: int, imageHeight: int) -> tuple[float, float]:
+		corner, cornerLo = self.getCornerDD()
+		newCorner, newCornerLo = self.moveCornerDD(complex(dx * self.dx(imageWidth), dy * self.dy(imageHeight)))
+		self.setDimensions(newCorner, self.settings['size'], cornerLo=newCornerLo)
+		distance = (newCorner - corner) + (newCornerLo - cornerLo)
+		return (distance.real / self.dx(imageWidth), distance.imag / self.dy(imageHeight))
+
+	# Zoom in or out by specified percentage value. The new area is centered at pixel (x, y)
+	# or at the center of the image, if x is 0. If center is False, pixel (x, y) keeps its position
+	def zoom(self, percent: float, imageWidth: int, imageHeight: int, x: int = 0, y: int = 0, center: bool = True):
 		if percent == 100 or percent < 1: return
 
 		w = int(imageWidth * 1 / percent * 100)
 		h = int(imageHeight * 1 / percent * 100)
 
-		x1 = int(x - w / 2) if x > 0 else int((imageWidth - w) / 2)
-		y1 = int(y - h / 2) if y > 0 else int((imageHeight - h) / 2)
+		if not center:
+			x1 = round(x - x * w / imageWidth)
+			y1 = round(y - y * h / imageHeight)
+		else:
+			x1 = int(x - w / 2) if x > 0 else int((imageWidth - w) / 2)
+			y1 = int(y - h / 2) if y > 0 else int((imageHeight - h) / 2)
 
-		size   = self.mapWH(w, h, imageWidth, imageHeight)
-		corner = self.mapXY(x1, y1, imageWidth, imageHeight)
-		self.setDimensions(corner, size)
+		size = self.mapWH(w, h, imageWidth, imageHeight)
+		corner, cornerLo = self.mapXYDD(x1, y1, imageWidth, imageHeight)
+		self.setDimensions(corner, size, cornerLo=cornerLo)
 
 	# Pixel distance
 	def dx(self, imageWidth: int) -> float:
@@ -337,6 +458,9 @@ gives the object some color""",
 		return corner.imag + y * self.dy(imageHeight)
 	def mapXY(self, x: int, y: int, imageWidth: int, imageHeight: int) -> complex:
 		return complex(self.mapX(x, imageWidth), self.mapY(y, imageHeight))
+	# Map screen coordinates to double-double fractal coordinates, see getCornerDD()
+	def mapXYDD(self, x: int, y: int, imageWidth: int, imageHeight: int) -> tuple[complex, complex]:
+		return self.moveCornerDD(complex(x * self.dx(imageWidth), y * self.dy(imageHeight)))
 	def mapWH(self, width: int, height: int, imageWidth: int, imageHeight: int) -> complex:
 		return complex(self.dx(imageWidth) * width, self.dy(imageHeight) * height)
 	
@@ -347,39 +471,137 @@ gives the object some color""",
 
 		if imageRatio != fractalRatio:
 			fractalHeight = size.real / imageRatio
-			corner = complex(corner.real, corner.imag + (size.imag - fractalHeight) / 2)
+			cornerLo = self.getCornerDD()[1] if corner == self.settings['corner'] else 0j
+			imHi, imLo = dd.add(corner.imag, cornerLo.imag, (size.imag - fractalHeight) / 2, 0.0)
+			corner = complex(corner.real, imHi)
 			size   = complex(size.real, fractalHeight)
-			self.settings.setValues(sync=True, corner=corner, size=size)
+			self.setDimensions(corner, size, cornerLo=complex(cornerLo.real, imLo))
 
 		return (corner, size)
 
+	###############################################################################
+	#
+	# Snap the fractal area to the symmetry of the fractal
+	#
+	#   imageWidth, imageHeight - Image size
+	#
+	# The pixel grid of the image maps onto itself under the symmetry, if the
+	# symmetry axes are located on a pixel or in the middle between 2 pixels.
+	# Otherwise the corner is shifted by less than half a pixel to the next
+	# position where this is the case. Normal vectors for shading and stripe
+	# averages are not symmetric, so these color options disable the symmetry.
+	#
+	# Returns:
+	#
+	#   Tuple (kx, ky) with pixel x mapped to kx-x and pixel y mapped to ky-y.
+	#   kx is None, if the columns are not mirrored. None, if the image has
+	#   no symmetric part
+	#
+	###############################################################################
+	def snapSymmetry(self, imageWidth: int, imageHeight: int) -> tuple | None:
+		colorOptions, stripes, steps = self.settings.getValues(['colorOptions', 'stripes', 'steps'])
+		if self.symmetry == FS_NONE or colorOptions & FO_SHADING or stripes > 0 or steps > 0:
+			return None
+
+		corner, size = self.adjustAspectRatio(imageWidth, imageHeight, *self.settings.getValues(['corner', 'size']))
+		dx = self.dx(imageWidth)
+		dy = self.dy(imageHeight)
+
+		# Pixel coordinate of axis multiplied by 2
+		ky = round(-2.0 * corner.imag / dy)
+		if ky <= 0 or ky >= 2 * (imageHeight-1):
+			return None
+		kx = None
+		cornerX = corner.real
+		if self.symmetry == FS_POINT:
+			kx = round(-2.0 * corner.real / dx)
+			if kx <= 0 or kx >= 2 * (imageWidth-1):
+				return None
+			cornerX = -kx * dx / 2.0
+
+		self.setDimensions(complex(cornerX, -ky * dy / 2.0), size)
+		return (kx, ky)
+
 	def perturbationReference(self, C: complex, maxIter: int, bailout: float) -> np.ndarray:
 		pass  # Must be implemented in derived classes
 
-	# Create matrix with mapping of screen coordinates to fractal coordinates
-	def mapScreenCoordinates(self, imageWidth: int, imageHeight: int, aspectRatio: bool = True):
+	# Create reference orbit object for perturbation method. Orbit is compressed depending on storage mode
+	def createReferenceOrbit(self, C: complex, maxIter: int, bailout: float) -> ro.ReferenceOrbit:
+		orbitStorage = self.settings['orbitStorage']
+		refOrbit = ro.ReferenceOrbit(C, self.perturbationReference(C, maxIter, bailout))
+		if orbitStorage == 'Compressed' or (orbitStorage == 'Auto' and len(refOrbit) > ro.ReferenceOrbit.autoCompressLength):
+			refOrbit.compress()
+		return refOrbit
+
+	# Select reference point for perturbation method. Default is the center of the fractal area.
+	# Override in derived classes to search for a better reference point
+	def selectReference(self, corner: complex, size: complex, maxIter: int, bailout: float) -> complex:
+		return corner + size / 2.0
+
+	# Create coordinate tables for the columns and rows of the screen. The complex grid is not stored, the
+	# kernels combine the real part of the column and the imaginary part of the row of a pixel
+	# For perturbation method the tables contain the distances to the reference point, multiplied by 2^deltaScale
+	# The kernels calculate oversampling x oversampling sub-samples per pixel, see createSamplePattern()
+	# If keepReference is True, the current reference orbit is used as long as the reference point is inside the fractal area
+	# If reference is specified, this reference orbit is used, i.e. a reference orbit shared by several fractal areas
+	def mapScreenCoordinates(self, imageWidth: int, imageHeight: int, aspectRatio: bool = True, perturbation: bool = False, deltaScale: int = 0,
+							 keepReference: bool = False, reference: ro.ReferenceOrbit | None = None, oversampling: int = 1, jitter: bool = False):
 		corner, size = self.settings.getValues(['corner', 'size'])
 
 		if aspectRatio:
 			corner, size = self.adjustAspectRatio(imageWidth, imageHeight, corner, size)
 
-		dxTab = np.outer(np.ones((imageHeight,), dtype=np.float64),
-				   np.linspace(corner.real, corner.real + size.real, imageWidth, dtype=np.float64))
-		dyTab = np.outer(1j * np.linspace(corner.imag, corner.imag + size.imag, imageHeight, dtype=np.float64),
-				   np.ones((imageWidth,), dtype=np.complex128))
-		self.cplxGrid = dxTab + dyTab
+		if not perturbation:
+			self.xTab = np.linspace(corner.real, corner.real + size.real, imageWidth, dtype=np.float64)
+			self.yTab = np.linspace(corner.imag, corner.imag + size.imag, imageHeight, dtype=np.float64)
+			self.sampleScale = (self.dx(imageWidth), self.dy(imageHeight))
+			self.setOversampling(oversampling, jitter)
+			return
 
-		# For perturbation method, store distance from referenece point in matrix
+		# For perturbation method, store distance from reference point in tables
 		# Also create reference orbit for reference point
-		if self.settings['perturbation']:
-			colorOptions = self.settings['colorOptions']
-			colorize = self.settings['colorize']
-			paletteMode = self.settings['paletteMode']
-			bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
-
-			refPoint = corner + size / 2.0
-			self.cplxGrid = self.cplxGrid - refPoint
-			self.refOrbit = self.perturbationReference(refPoint, self.getMaxValue(), bailout)
+		bailout = Fractal.getBailout(*self.settings.getValues(['colorize', 'paletteMode', 'colorOptions']))
+
+		maxIter = self.getMaxValue()
+		offset = self.refPoint - corner
+		if reference is not None:
+			self.refPoint = reference.C
+			self.refOrbit = reference
+			self.refParameters = (maxIter, bailout)
+		elif (keepReference and self.refParameters == (maxIter, bailout) and
+			0 <= offset.real <= size.real and 0 <= offset.imag <= size.imag):
+			print(f"Reusing reference point {self.refPoint}")
+		else:
+			if self.settings['autoReference']:
+				self.refPoint = self.selectReference(corner, size, maxIter, bailout)
+			else:
+				self.refPoint = corner + size / 2.0
+			self.refOrbit = self.createReferenceOrbit(self.refPoint, maxIter, bailout)
+			self.refParameters = (maxIter, bailout)
+			print(f"Reference point {self.refPoint}, reference orbit length {len(self.refOrbit)}")
+
+		# Distances are calculated from pixel offsets, so they don't lose precision on deep zooms
+		offset = (corner - self.refPoint) + self.getCornerDD()[1]
+		self.xTab = math.ldexp(offset.real, deltaScale) + np.arange(imageWidth) * math.ldexp(self.dx(imageWidth), deltaScale)
+		self.yTab = math.ldexp(offset.imag, deltaScale) + np.arange(imageHeight) * math.ldexp(self.dy(imageHeight), deltaScale)
+		self.sampleScale = (math.ldexp(self.dx(imageWidth), deltaScale), math.ldexp(self.dy(imageHeight), deltaScale))
+		self.setOversampling(oversampling, jitter)
+
+	# Change the sub-samples of the pixels of the current coordinate tables, see createSamplePattern()
+	def setOversampling(self, oversampling: int, jitter: bool = False):
+		self.samples = createSamplePattern(oversampling, jitter) * self.sampleScale
+
+	# Use a single sub-sample with offset (dx, dy) in pixels for all pixels
+	def setSampleOffset(self, dx: float, dy: float):
+		self.samples = np.array([[dx, dy]], dtype=np.float64) * self.sampleScale
+
+	# Create double-double coordinate tables for the columns and rows of the screen. The coordinates
+	# are calculated from the double-double corner and the pixel offsets, see ddouble.linspace()
+	# Returns tuple with arrays of shape (imageWidth, 2) and (imageHeight, 2)
+	def mapScreenCoordinatesDD(self, imageWidth: int, imageHeight: int) -> tuple[np.ndarray]:
+		corner, cornerLo = self.getCornerDD()
+		return (dd.linspace(corner.real, self.dx(imageWidth), imageWidth, cornerLo.real),
+				dd.linspace(corner.imag, self.dy(imageHeight), imageHeight, cornerLo.imag))
 
 	# Maximum calculation value (i.e. max iterations)
 	# Override in derived classes!
@@ -390,9 +612,11 @@ gives the object some color""",
 		self.settings.syncConfig()
 	
 	# Called before calculation is started
-	def beginCalc(self, screenWidth: int, screenHeight: int) -> bool:
+	def beginCalc(self, screenWidth: int, screenHeight: int, perturbation: bool = False, deltaScale: int = 0, keepReference: bool = False,
+				  reference: ro.ReferenceOrbit | None = None, oversampling: int = 1, jitter: bool = False, aspectRatio: bool = True) -> bool:
 		self.updateParameters()
-		self.mapScreenCoordinates(screenWidth, screenHeight)
+		self.mapScreenCoordinates(screenWidth, screenHeight, aspectRatio=aspectRatio, perturbation=perturbation, deltaScale=deltaScale,
+								  keepReference=keepReference, reference=reference, oversampling=oversampling, jitter=jitter)
 		self.startTime = time.time()
 		return True
 
@@ -403,6 +627,39 @@ gives the object some color""",
 		return self.calcTime
 
 
+# Add offset to complex double-double number hi + lo. Returns tuple (hi, lo)
+def addComplexDD(hi: complex, lo: complex, offset: complex) -> tuple[complex, complex]:
+	reHi, reLo = dd.add(hi.real, lo.real, offset.real, 0.0)
+	imHi, imLo = dd.add(hi.imag, lo.imag, offset.imag, 0.0)
+	return (complex(reHi, imHi), complex(reLo, imLo))
+
+###############################################################################
+#
+# Create sample pattern for oversampling
+#
+#   oversampling - Number of sub-samples per pixel in each direction
+#   jitter - Shift sub-samples randomly inside their cell. The random
+#     offsets are the same for every pixel and every image, so images
+#     remain reproducible
+#
+# The pixel is divided into oversampling x oversampling cells with one
+# sub-sample in the center of each cell. The sub-samples are ordered by
+# their distance from the pixel center. The first sub-sample represents the
+# pixel in the iteration data.
+#
+# Returns:
+#
+#   Array of shape (oversampling * oversampling, 2) with the offsets of the
+#   sub-samples from the pixel in pixels (real part, imaginary part)
+#
+###############################################################################
+def createSamplePattern(oversampling: int, jitter: bool = False) -> np.ndarray:
+	cells = (np.arange(oversampling, dtype=np.float64) + 0.5) / oversampling - 0.5
+	samples = np.stack(np.meshgrid(cells, cells, indexing='ij'), axis=-1).reshape(-1, 2)
+	if jitter and oversampling > 1:
+		samples += np.random.default_rng(oversampling).uniform(-0.5, 0.5, samples.shape) / oversampling
+	return samples[np.argsort(np.hypot(samples[:, 0], samples[:, 1]), kind='stable')]
+
 # Find orbit
 @nb.njit(cache=False)
 def findOrbit(O: np.ndarray, Z: complex, tolerance1: float, tolerance2: float):
@@ -498,6 +755,34 @@ def mapColorValue(palette: np.ndarray, iter: float, nZ: float, normal: complex,
 	else:
 		return (color * 255).astype(np.uint8)
 
+###############################################################################
+# Map iteration data of point to color
+#
+#   palette - Color palette
+#   data - Iteration data, tuple or array with ID_SIZE values, see ID_xxx
+#          constants. Returned by the point calculation functions
+#   maxIter - Maximum number of iterations
+#   colorPar - Color calculation parameters, see Fractal.getCalcParameters()
+#   light - Light parameters for shading
+#
+# Returns rgbi color array [red, green, blue], dtype=uint8
+#
+###############################################################################
+@nb.njit(cache=False)
+def colorizeData(palette: np.ndarray, data, colorize: int, paletteMode: int, colorOptions: int, maxIter: int,
+				 colorPar: list[float], light: list[float]) -> np.ndarray:
+	iter = data[ID_ITER]
+
+	if iter == ID_INSIDE:
+		return col.rgb2rgbi(palette[-1])
+	elif iter == ID_ORBIT:
+		# Hue depends on orbit length, brightness on iterations until orbit has been detected
+		return col.rgb2rgbi(col.hsb2rgb(min(1.0, data[ID_NORMAL_RE] / 10.0), 1.0, 1 - data[ID_NZ] / maxIter))
+
+	mapColorPar = [data[ID_STRIPE], colorPar[2], colorPar[3], float(maxIter), data[ID_POT]]
+	return mapColorValue(palette, iter, data[ID_NZ], complex(data[ID_NORMAL_RE], data[ID_NORMAL_IM]), data[ID_DIST],
+						 mapColorPar, light, colorize, paletteMode, colorOptions)
+
 #
 # Blending of 2 values (layers) with gamma correction
 # Called by shading()
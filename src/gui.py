@@ -134,6 +134,8 @@ class Selection:
 	POINT       = 1
 	AREA        = 2
 	MOVEAREA    = 3
+	PAN         = 4
+	ZOOM        = 5
 
 	def __init__(self, canvas: object, color = 'red', width = 2, flipY: bool = False, keepAR: bool = True):
 		self.canvas     = canvas
@@ -171,14 +173,22 @@ class Selection:
 		self.active   = False
 		self.xs = self.ys = self.xe = self.ye = 0
 
+	# Size of the displayed image. The scroll region of a virtual viewport is larger than the canvas
+	def getImageSize(self) -> tuple[int, int]:
+		x1, y1, x2, y2 = (int(float(v)) for v in str(self.canvas.cget('scrollregion')).split())
+		return (x2-x1, y2-y1)
+
+	# Convert window coordinates of an event to canvas coordinates of the scrolled canvas
+	def canvasXY(self, event) -> tuple[int, int]:
+		return int(self.canvas.canvasx(event.x)), int(self.canvas.canvasy(event.y))
+
 	# Scale coordinates
 	def scale(self, x: int, y: int) -> tuple[int]:
 		return int(x / self.scaleFactor), int(y / self.scaleFactor)
 	
 	# Return selected point
 	def getPoint(self) -> tuple[int, int]:
-		self.width  = self.canvas.winfo_reqwidth()
-		self.height = self.canvas.winfo_reqheight()
+		self.width, self.height = self.getImageSize()
 
 		if self.flipY:
 			return self.scale(self.xs, self.height-self.ys-1)
@@ -187,8 +197,7 @@ class Selection:
 	
 	# Return selected area
 	def getArea(self) -> tuple[int, int, int, int]:
-		self.width  = self.canvas.winfo_reqwidth()
-		self.height = self.canvas.winfo_reqheight()
+		self.width, self.height = self.getImageSize()
 
 		if self.flipY:
 			return self.scale(self.xs, self.height-self.ye) + self.scale(self.xe, self.height-self.ys)
@@ -215,8 +224,7 @@ class Selection:
 		if not self.enabled:
 			return False
 		
-		x = event.x
-		y = event.y
+		x, y = self.canvasXY(event)
 
 		if self.selected and (self.mode == Selection.AREA or self.mode == Selection.MOVEAREA):
 			# Area selected
@@ -243,8 +251,7 @@ class Selection:
 			self.selected = False
 			self.active   = True
 
-			self.width  = self.canvas.winfo_reqwidth()
-			self.height = self.canvas.winfo_reqheight()
+			self.width, self.height = self.getImageSize()
 			self.aspectRatio = max(self.width, self.height)/min(self.width, self.height)
 
 
@@ -256,8 +263,7 @@ class Selection:
 		if not self.enabled:
 			return False
 
-		x = event.x
-		y = event.y
+		x, y = self.canvasXY(event)
 
 		if self.mode == Selection.POINT and not self.selected:
 			# Point selected, dragging from selected point => change size of area
@@ -295,8 +301,7 @@ class Selection:
 		if not self.enabled:
 			return False
 
-		x = event.x
-		y = event.y
+		x, y = self.canvasXY(event)
 		
 		if self.active:
 			if self.mode == Selection.AREA:
@@ -325,6 +330,72 @@ class Selection:
 		print(f"buttonReleased: mode={self.mode} selected={self.selected} active={self.active}")
 		return True
 
+	# Start moving the image. Called when left button is pressed with shift key
+	def onPanStart(self, event) -> bool:
+		if not self.enabled:
+			return False
+
+		self.reset(enabled=True)
+		self.xs, self.ys = event.x, event.y
+		self.xe, self.ye = event.x, event.y
+		self.mode   = Selection.PAN
+		self.active = True
+
+		self.canvas.config(cursor='fleur')
+		return True
+
+	# Move image with the mouse
+	def onPanDrag(self, event) -> bool:
+		if not self.active or self.mode != Selection.PAN:
+			return False
+
+		self.canvas.move('all', event.x-self.xe, event.y-self.ye)
+		self.xe, self.ye = event.x, event.y
+		return True
+
+	# End of moving. Returns distance of fractal area in image pixels (dx, dy), pixel (x, y)
+	# of the moved image is pixel (x+dx, y+dy) of the current image. None if not moving
+	def onPanEnd(self, event) -> tuple[float, float] | None:
+		if not self.active or self.mode != Selection.PAN:
+			return None
+
+		dx = -(event.x - self.xs) / self.scaleFactor
+		dy = (event.y - self.ys) / self.scaleFactor
+		self.reset(enabled=True)
+		self.canvas.config(cursor='cross')
+
+		return (dx, dy) if self.flipY else (dx, -dy)
+
+	# Start real time zoom. Called when a mouse button is pressed with control key
+	def onZoomStart(self, event) -> bool:
+		if not self.enabled:
+			return False
+
+		self.reset(enabled=True)
+		self.xs, self.ys = event.x, event.y
+		self.mode   = Selection.ZOOM
+		self.active = True
+
+		self.canvas.config(cursor='sizing')
+		return True
+
+	# Move zoom center
+	def onZoomDrag(self, event) -> bool:
+		if not self.active or self.mode != Selection.ZOOM:
+			return False
+
+		self.xs, self.ys = event.x, event.y
+		return True
+
+	# End of real time zoom
+	def onZoomEnd(self, event) -> bool:
+		if not self.active or self.mode != Selection.ZOOM:
+			return False
+
+		self.reset(enabled=True)
+		self.canvas.config(cursor='cross')
+		return True
+
 	# Check if selection mode is enabled
 	def isEnabled(self) -> bool:
 		return self.enabled
@@ -376,27 +447,52 @@ class GUI:
 		self.statusFrame.addLabel('screenCoord', 25, value="0,0")
 		self.statusFrame.addLabel('complexCoord', 10, value="TEXT")
 		self.statusFrame.addLabel('drawing', 15, value="Idle")
+		self.statusFrame.addLabel('engine', 45, value="")
 		self.statusFrame.addProgressbar('progress', 100)
 
 		# Screen selection
 		self.selection = Selection(self.drawFrame.canvas, flipY=True)
 
+		# The right mouse button is button 2 on macOS and button 3 on other systems
+		right = 2 if self.mainWindow.tk.call('tk', 'windowingsystem') == 'aqua' else 3
+
 		# Event handler
 		self.drawFrame.canvas.bind('<Motion>',          self.onMove)
 		self.drawFrame.canvas.bind('<ButtonPress-1>',   self.onLeftButtonPressed)
 		self.drawFrame.canvas.bind('<B1-Motion>',       self.onLeftButtonDrag)
 		self.drawFrame.canvas.bind('<ButtonRelease-1>', self.onLeftButtonReleased)
-		self.drawFrame.canvas.bind('<Button-2>',        self.onRightButtonClicked)
+		self.drawFrame.canvas.bind(f'<Button-{right}>', self.onRightButtonClicked)
+
+		# Shift + drag moves the image
+		self.drawFrame.canvas.bind('<Shift-ButtonPress-1>',   self.onPanStart)
+		self.drawFrame.canvas.bind('<Shift-B1-Motion>',       self.onPanDrag)
+		self.drawFrame.canvas.bind('<Shift-ButtonRelease-1>', self.onPanEnd)
+
+		# Control + left button zooms in, control + right button zooms out while the button is pressed.
+		# Zooming continues, if the control key is released before the button. The handlers without
+		# control key only have an effect while zooming, like onLeftButtonDrag() for the left button
+		self.drawFrame.canvas.bind('<Control-ButtonPress-1>',          lambda event: self.onZoomStart(event, True))
+		self.drawFrame.canvas.bind(f'<Control-ButtonPress-{right}>',   lambda event: self.onZoomStart(event, False))
+		self.drawFrame.canvas.bind('<Control-B1-Motion>',              self.onZoomDrag)
+		self.drawFrame.canvas.bind(f'<Control-B{right}-Motion>',       self.onZoomDrag)
+		self.drawFrame.canvas.bind(f'<B{right}-Motion>',               self.onZoomDrag)
+		self.drawFrame.canvas.bind('<Control-ButtonRelease-1>',        self.onZoomEnd)
+		self.drawFrame.canvas.bind(f'<Control-ButtonRelease-{right}>', self.onZoomEnd)
+		self.drawFrame.canvas.bind(f'<ButtonRelease-{right}>',         self.onZoomEnd)
 
 		# Registered callback functions for selections
 		self.onPoint  = None   # Point selected
 		self.onArea   = None   # Area selected
 		self.onCancel = None   # Selection cancelled
+		self.onPan    = None   # Image moved
+		self.onZoom   = None   # Real time zoom started, moved or stopped
 
-	def setSelectionHandler(self, onPoint = None, onArea = None, onCancel = None):
+	def setSelectionHandler(self, onPoint = None, onArea = None, onCancel = None, onPan = None, onZoom = None):
 		self.onPoint  = onPoint
 		self.onArea   = onArea
 		self.onCancel = onCancel
+		self.onPan    = onPan
+		self.onZoom   = onZoom
 
 	def onMove(self, event):
 		if not self.selection.isActive() and not self.selection.isSelected():
@@ -408,14 +504,24 @@ class GUI:
 		self.selection.onLeftButtonPressed(event)
 
 	def onLeftButtonDrag(self, event):
-		if self.selection.onLeftDrag(event):
+		if self.selection.mode == Selection.PAN:
+			# Shift key released while moving
+			self.onPanDrag(event)
+		elif self.selection.mode == Selection.ZOOM:
+			# Control key released while zooming
+			self.onZoomDrag(event)
+		elif self.selection.onLeftDrag(event):
 			x1, y1, x2, y2 = self.selection.getArea()
 			w = x2 - x1 + 1
 			h = y2 - y1 + 1
 			self.statusFrame.setFieldValue('screenCoord', f"{x1},{y1} - {w}x{h}", fg='white')
 
 	def onLeftButtonReleased(self, event):
-		if self.selection.onLeftButtonReleased(event):
+		if self.selection.mode == Selection.PAN:
+			self.onPanEnd(event)
+		elif self.selection.mode == Selection.ZOOM:
+			self.onZoomEnd(event)
+		elif self.selection.onLeftButtonReleased(event):
 			if self.selection.isSelected():
 				if self.selection.mode == Selection.POINT:
 					x, y = self.selection.getPoint()
@@ -436,6 +542,34 @@ class GUI:
 				if self.onCancel is not None:
 					self.onCancel()
 
+	def onPanStart(self, event):
+		self.selection.onPanStart(event)
+
+	def onPanDrag(self, event):
+		if self.selection.onPanDrag(event):
+			self.statusFrame.setFieldValue('screenCoord', f"Move: {event.x-self.selection.xs},{event.y-self.selection.ys}", fg='white')
+
+	def onPanEnd(self, event):
+		distance = self.selection.onPanEnd(event)
+		if distance is not None and self.onPan is not None:
+			self.onPan(*distance)
+
+	# Real time zoom. Handler is called with the zoom center and direction 1 (zoom in), -1 (zoom out)
+	# or 0 (zoom stopped)
+	def onZoomStart(self, event, zoomIn: bool):
+		if self.selection.onZoomStart(event) and self.onZoom is not None:
+			self.onZoom(*self.selection.getPoint(), 1 if zoomIn else -1)
+
+	def onZoomDrag(self, event):
+		if self.selection.onZoomDrag(event) and self.onZoom is not None:
+			x, y = self.selection.getPoint()
+			self.statusFrame.setFieldValue('screenCoord', f"Zoom: {x},{y}", fg='white')
+			self.onZoom(x, y, None)
+
+	def onZoomEnd(self, event):
+		if self.selection.onZoomEnd(event) and self.onZoom is not None:
+			self.onZoom(0, 0, 0)
+
 	def onRightButtonClicked(self, event):
 		self.statusFrame.setFieldValue('screenCoord', "Cancelled selection")
 		if self.onCancel is not None:
@@ -11,13 +11,17 @@ import numpy as np
 import numba as nb
 
 import fractal as frc
+import downsample as ds
 import colors as col
+import ddouble as dd
 import tkconfigure.tkconfigure as tkc
 
 from constants import *
 
 class Julia(frc.Fractal):
 
+	symmetry = FS_POINT
+
 	def __init__(self, point: complex = complex(-0.7269, 0.1889), corner: complex = complex(-1.5, -1.5) , size: complex = complex(3.0, 3.0), maxIter: int = 500,
 				stripes: int = 0, steps: int = 0, ncycle: int = 1):
 		super().__init__(corner, size, stripes, steps, ncycle)
@@ -62,11 +66,15 @@ class Julia(frc.Fractal):
 		maxIter = self.getMaxValue()
 		return super().getCalcParameters() + (self.settings['point'], maxIter)
 
+	def getPointParameters(self, calcParameters: tuple) -> tuple:
+		colorize, paletteMode, colorOptions, colorPar, light, point, maxIter = calcParameters
+		bailout = float(self.getBailout(colorize, paletteMode, colorOptions))
+		return (point, colorize, paletteMode, colorOptions, maxIter, bailout, np.array(colorPar, dtype=np.float64))
+
 # Iterate complex point using standard Mandelbrot formular Z = Z * Z + C
-# Return color array [red, green, blue]
+# Return iteration data tuple, see fractal.colorizeData()
 @nb.njit(cache=False)
-def calculatePointZ2(Z, P, C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar, light):
-	diaScale = maxIter/10.0
+def calculatePointZ2(Z, C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar):
 
 	dist = 0.0
 	pot = 0.0
@@ -110,16 +118,99 @@ def calculatePointZ2(Z, P, C, colorize, paletteMode, colorOptions, maxIter, bail
 				logZn = math.log(nZ)/2.0
 				pot = math.log(logZn / math.log(2)) / math.log(2)	
 
-			mapColorPar = [stripe_a, step_s, ncycle, float(maxIter), pot]
+			normal = Z / D
+			return (float(i+smooth_i), nZ, normal.real, normal.imag, dist/diag, stripe_a, pot)
 
-			return frc.mapColorValue(P, float(i+smooth_i), nZ, Z/D, dist/diag, mapColorPar, light, colorize, paletteMode, colorOptions)
+		if bOrbits:
+			# Search for orbits (full periodicity check)
+			idx = frc.findOrbit(orbits[:i], Z, 1e-15, 1e-11)
+			if idx > -1:
+				# Found orbit, colorize point inside mandelbrot set
+				return (ID_ORBIT, float(i), float(i-idx), 0.0, 0.0, 0.0, 0.0)
+			orbits[i] = Z
+		else:
+			# Simplified periodicity check, no orbit colorization
+			if abs(nZ - nZ1) < 1e-10:
+				i = maxIter
+				break
+			else:
+				period += 1
+				if period > 20:
+					period = 0
+					nZ1 = nZ
+
+		if bStripe:
+			stripe_a = stripe_a * stripe_sig + stripe_t * (1-stripe_sig)
+
+	return (ID_INSIDE, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+# Iterate complex point with double-double precision using standard Mandelbrot formular Z = Z * Z + C
+# Z is passed as double-double array [real hi, real lo, imag hi, imag lo]. Only Z is iterated with
+# double-double precision, derivation and coloring values are calculated with the float64 value of Z
+# Return iteration data tuple, see fractal.colorizeData()
+@nb.njit(cache=False)
+def calculatePointZ2DD(Z0, C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar):
+
+	dist = 0.0
+	pot = 0.0
+	stripe_a = 0.0
+	stripe_s, stripe_sig, step_s, ncycle, diag = colorPar
+
+	bStripe = stripe_s > 0
+	bStep   = step_s > 0
+	bOrbits = colorOptions & FO_ORBITS
+	bDist   = colorize == FC_DISTANCE or bStripe or bStep
+
+	zrh, zrl, zih, zil = Z0[0], Z0[1], Z0[2], Z0[3]
+	Z = complex(zrh, zih)
+	nZ1 = 0.0               # Old value of abs(Z)^2
+	D = complex(1.0, 0.0)   # 1st derivation
+	period = 0              # Period counter for simplified orbit detection
+	smooth_i = 0
+
+	if bOrbits:
+		orbits = np.zeros(maxIter, dtype=np.complex128)
+
+	for i in range(0, maxIter+1):
+		if bDist or colorOptions & FO_SHADING:
+			D = D * 2 * Z
+
+		# Z = Z * Z + C = (zr^2 - zi^2 + cr) + (2 * zr * zi + ci) * i
+		rrh, rrl = dd.sqr(zrh, zrl)
+		iih, iil = dd.sqr(zih, zil)
+		rih, ril = dd.mul(zrh, zrl, zih, zil)
+		zrh, zrl = dd.sub(rrh, rrl, iih, iil)
+		zrh, zrl = dd.add(zrh, zrl, C.real, 0.0)
+		zih, zil = dd.add(2.0 * rih, 2.0 * ril, C.imag, 0.0)
+		Z = complex(zrh, zih)
+
+		if bStripe:
+			stripe_t = (math.sin(stripe_s * math.atan2(Z.imag, Z.real)) + 1) / 2
+
+		nZ = Z.real * Z.real + Z.imag * Z.imag
+		if nZ > bailout:
+			if bDist or bStripe:
+				aZ = math.sqrt(nZ)
+				log_ratio = 2*math.log(aZ) / math.log(bailout)
+				smooth_i = 1 - math.log(log_ratio) / math.log(2)
+				dist = aZ * math.log(aZ) / abs(D) / 2
+
+			if bStripe:
+				stripe_a = (stripe_a * (1 + smooth_i * (stripe_sig-1)) + stripe_t * smooth_i * (1 - stripe_sig))
+				stripe_a = stripe_a / (1 - stripe_sig**i * (1 + smooth_i * (stripe_sig-1)))
+			if colorize == FC_POTENTIAL:
+				logZn = math.log(nZ)/2.0
+				pot = math.log(logZn / math.log(2)) / math.log(2)	
+
+			normal = Z / D
+			return (float(i+smooth_i), nZ, normal.real, normal.imag, dist/diag, stripe_a, pot)
 
 		if bOrbits:
 			# Search for orbits (full periodicity check)
 			idx = frc.findOrbit(orbits[:i], Z, 1e-15, 1e-11)
 			if idx > -1:
 				# Found orbit, colorize point inside mandelbrot set
-				return col.rgb2rgbi(col.hsb2rgb(min(1.0,(i-idx)/maxIter*diaScale), 1.0, 1-i/maxIter))
+				return (ID_ORBIT, float(i), float(i-idx), 0.0, 0.0, 0.0, 0.0)
 			orbits[i] = Z
 		else:
 			# Simplified periodicity check, no orbit colorization
@@ -135,12 +226,34 @@ def calculatePointZ2(Z, P, C, colorize, paletteMode, colorOptions, maxIter, bail
 		if bStripe:
 			stripe_a = stripe_a * stripe_sig + stripe_t * (1-stripe_sig)
 
-	return col.rgb2rgbi(P[-1])
+	return (ID_INSIDE, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+# Pixel coordinates are passed as separable tables: X contains the real parts of a row
+# of pixels, Y the imaginary part of the row. The complex grid is never materialized.
+# S contains the offsets of the sub-samples of a pixel, see fractal.createSamplePattern().
+# The colors of the sub-samples are averaged in linear light.
 
-@nb.guvectorize([(nb.complex128[:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.complex128, nb.int32, nb.uint8[:,:])], '(n),(i,j),(),(),(),(k),(l),(),() -> (n,j)', nopython=True, cache=False, target='parallel')
-def calculateVectorZ2(Z, P, colorize, paletteMode, colorOptions, colorPar, light, C, maxIter, R):
+@nb.guvectorize([(nb.float64[:], nb.float64, nb.float64[:,:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.complex128, nb.int32, nb.uint8[:,:])], '(n),(),(s,t),(i,j),(),(),(),(k),(l),(),() -> (n,j)', nopython=True, cache=False, target='parallel')
+def calculateVectorZ2(X, Y, S, P, colorize, paletteMode, colorOptions, colorPar, light, C, maxIter, R):
 	bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
+	A = np.zeros(3, dtype=np.float64)
 
-	for p in range(Z.shape[0]):
-		R[p,:] = calculatePointZ2(Z[p], P, C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar, light)
+	for p in range(X.shape[0]):
+		A[:] = 0
+		for s in range(S.shape[0]):
+			ds.addLinear(A, frc.colorizeData(P, calculatePointZ2(complex(X[p] + S[s,0], Y + S[s,1]), C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar),
+								  colorize, paletteMode, colorOptions, maxIter, colorPar, light))
+		ds.storeAverage(A, S.shape[0], R[p])
+
+@nb.guvectorize([(nb.float64[:,:], nb.float64[:], nb.float64[:,:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.complex128, nb.int32, nb.uint8[:,:])], '(n,d),(d),(s,t),(i,j),(),(),(),(k),(l),(),() -> (n,j)', nopython=True, cache=False, target='parallel')
+def calculateVectorZ2DD(X, Y, S, P, colorize, paletteMode, colorOptions, colorPar, light, C, maxIter, R):
+	bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
+	A = np.zeros(3, dtype=np.float64)
 
+	for p in range(X.shape[0]):
+		A[:] = 0
+		for s in range(S.shape[0]):
+			Z = dd.add(X[p,0], X[p,1], S[s,0], 0.0) + dd.add(Y[0], Y[1], S[s,1], 0.0)
+			ds.addLinear(A, frc.colorizeData(P, calculatePointZ2DD(Z, C, colorize, paletteMode, colorOptions, maxIter, bailout, colorPar),
+								  colorize, paletteMode, colorOptions, maxIter, colorPar, light))
+		ds.storeAverage(A, S.shape[0], R[p])
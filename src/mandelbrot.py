@@ -14,7 +14,10 @@ import numpy as np
 import numba as nb
 
 import fractal as frc
+import downsample as ds
 import colors as col
+import reforbit as ro
+import ddouble as dd
 import tkconfigure.tkconfigure as tkc
 
 from constants import *
@@ -22,6 +25,8 @@ from constants import *
 
 class Mandelbrot(frc.Fractal):
 
+	symmetry = FS_CONJUGATE
+
 	def __init__(self, corner: complex = complex(-2.25, -1.5) , size: complex = complex(3.0, 3.0), maxIter: int = 500,
 			  stripes: int = 0, steps: int = 0, ncycle: int = 1):
 		super().__init__(corner, size, stripes, steps, ncycle)
@@ -59,6 +64,12 @@ class Mandelbrot(frc.Fractal):
 		maxIter = self.getMaxValue()
 		return super().getCalcParameters()+(maxIter,)
 
+	def getPointParameters(self, calcParameters: tuple) -> tuple:
+		colorize, paletteMode, colorOptions, colorPar, light, maxIter = calcParameters
+		bailout = self.getBailout(colorize, paletteMode, colorOptions)
+		return (colorize, paletteMode, colorOptions, maxIter, np.array([bailout, 2.0 / math.log(bailout)]),
+				np.array(colorPar, dtype=np.float64))
+
 	###############################################################################
 	#
 	# Calculate reference points
@@ -86,6 +97,123 @@ class Mandelbrot(frc.Fractal):
 
 		return R[:i]
 
+	###############################################################################
+	#
+	# Select reference point for perturbation method
+	#
+	#   corner, size - Fractal area
+	#   maxIter - Maximum number of iterations
+	#   bailout - Bailout radius
+	#
+	# Probes a grid of candidate points inside the fractal area and selects the
+	# candidate with the longest orbit. If this candidate doesn't escape, the
+	# period detected during probing is used to search for the nucleus of the
+	# nearby hyperbolic component with Newton's method. A nucleus has a periodic
+	# orbit, so the reference orbit never escapes.
+	#
+	# Returns:
+	#
+	#   Reference point
+	#
+	###############################################################################
+	def selectReference(self, corner: complex, size: complex, maxIter: int, bailout: float, probes: int = 9) -> complex:
+		center = corner + size / 2.0
+		points = np.add.outer(1j * np.linspace(corner.imag, corner.imag + size.imag, probes+2)[1:-1],
+					np.linspace(corner.real, corner.real + size.real, probes+2)[1:-1]).ravel()
+		points = np.append(points, center)
+
+		iterations, periods = probeOrbits(points, maxIter, bailout)
+
+		# Longest orbit, prefer the candidate nearest to the center
+		best = max(range(len(points)), key=lambda p: (iterations[p], -abs(points[p] - center)))
+		refPoint = points[best]
+
+		if iterations[best] >= maxIter and periods[best] > 0:
+			nucleus, bFound = findNucleus(refPoint, periods[best], 64, abs(size) * 1e-12)
+			if (bFound and abs(nucleus.real - center.real) <= abs(size.real) and abs(nucleus.imag - center.imag) <= abs(size.imag) and
+				probeOrbits(np.array([nucleus]), maxIter, bailout)[0][0] >= maxIter):
+				print(f"Found nucleus of period {periods[best]} at {nucleus}")
+				return nucleus
+
+		print(f"Selected reference point with orbit length {iterations[best]}")
+		return refPoint
+
+###############################################################################
+#
+# Probe orbits of candidate reference points
+#
+#   C - Array of points in the complex plain
+#   maxIter - Maximum number of iterations
+#   bailout - Bailout radius
+#
+# Period detection: the iteration where abs(Z) reaches a new minimum is the
+# period of the atom domain containing the point.
+#
+# Returns:
+#
+#   Tuple with arrays of orbit lengths (maxIter if point doesn't escape) and
+#   detected periods (0 = no period detected)
+#
+###############################################################################
+@nb.njit(cache=False)
+def probeOrbits(C: np.ndarray, maxIter: int, bailout: float) -> tuple:
+	iterations = np.full(C.shape[0], maxIter, dtype=np.int64)
+	periods = np.zeros(C.shape[0], dtype=np.int64)
+
+	for p in range(C.shape[0]):
+		Z = complex(0.0, 0.0)
+		minNZ = math.inf
+
+		for i in range(1, maxIter+1):
+			Z = Z * Z + C[p]
+			nZ = Z.real * Z.real + Z.imag * Z.imag
+			if nZ > bailout:
+				iterations[p] = i
+				break
+			if nZ < minNZ:
+				minNZ = nZ
+				periods[p] = i
+
+	return iterations, periods
+
+# Machine epsilon of float64, used for the precision of a nucleus, see findNucleus()
+NUCLEUS_EPSILON = float(np.finfo(np.float64).eps)
+
+###############################################################################
+#
+# Find nucleus of a hyperbolic component with Newton's method
+#
+#   C - Start point in the complex plain
+#   period - Period of the hyperbolic component
+#   maxSteps - Maximum number of Newton steps
+#   tolerance - Stop if step size is less than tolerance. Steps below the
+#     precision of C are accepted, too, because Newton's method cannot
+#     converge any further in double precision
+#
+# Returns:
+#
+#   Tuple with nucleus and flag for successful search
+#
+###############################################################################
+@nb.njit(cache=False)
+def findNucleus(C: complex, period: int, maxSteps: int, tolerance: float) -> tuple:
+	for n in range(maxSteps):
+		Z = complex(0.0, 0.0)
+		dC = complex(0.0, 0.0)   # 1st derivation of Z by C
+		for i in range(period):
+			dC = 2.0 * Z * dC + 1.0
+			Z = Z * Z + C
+
+		if dC == 0:
+			break
+
+		step = Z / dC
+		C = C - step
+		if abs(step) < max(tolerance, 4.0 * NUCLEUS_EPSILON * abs(C)):
+			return C, True
+
+	return C, False
+
 ###############################################################################
 #
 # Iterate complex point using standard Mandelbrot formular Z = Z * Z + C
@@ -94,8 +222,6 @@ class Mandelbrot(frc.Fractal):
 #
 #   C - Point in complex plain
 #
-#   P - Color palette np.array((n, 3), dtype=float64), rgb range = 0-1
-#
 #   colorize - Value to be used for color calculation:
 #      FC_ITERATIONS - Number of iterations
 #      FC_DISTANCE   - Distance to mandelbrot set
@@ -131,21 +257,17 @@ class Mandelbrot(frc.Fractal):
 #                         Range 1-200, 1 = No cycling, default = 32
 #      [4] = diag       - Distance normalization value
 #
-#   light - Light parameters for shading
-#
 # Return:
 #
-#   rgbi color array [red, green, blue], dtype=uint8, rgb range = 0-255
+#   Iteration data tuple, see fractal.colorizeData()
 #
 ###############################################################################
 @nb.njit(cache=False)
-def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int, colorOptions: int, maxIter: int, bailoutPar: list[float],
-					 colorPar: list[float], light: list[float]) -> np.ndarray:
+def calculatePointZ2(C: complex, colorize: int, paletteMode: int, colorOptions: int, maxIter: int, bailoutPar: list[float],
+					 colorPar: list[float]) -> tuple:
 	stripe_s, stripe_sig, step_s, ncycle, diag = colorPar
 	bailout, log_2_bailout = bailoutPar
 
-	diaScale = maxIter/10.0
-
 	dist = 0.0
 	pot = 0.0
 	stripe_a = 0.0
@@ -194,19 +316,124 @@ def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int,
 				stripe_a = (stripe_a * (1 + smooth_i * (stripe_sig-1)) + stripe_t * smooth_i * one_minus_stripe_sig)
 				stripe_a = stripe_a / (1 - stripe_sig**i * (1 + smooth_i * (stripe_sig-1)))
 
-			# Color mapping
-			mapColorPar = [stripe_a, step_s, ncycle, float(maxIter), pot]
-			return frc.mapColorValue(P, float(i+smooth_i), nZ, Z/D, dist/diag, mapColorPar, light, colorize, paletteMode, colorOptions)
+			normal = Z / D
+			return (float(i+smooth_i), nZ, normal.real, normal.imag, dist/diag, stripe_a, pot)
+
+		if bOrbits:
+			# Search for orbits (full periodicity check)
+			idx = frc.findOrbit(orbits[:i], Z, 1e-15, 1e-11)
+			if idx > -1:
+				# Found orbit, colorize point inside mandelbrot set
+				return (ID_ORBIT, float(i), float(i - idx), 0.0, 0.0, 0.0, 0.0)
+			orbits[i] = Z
+		else:
+			# Simplified periodicity check, no orbit colorization
+			if abs(nZ - nZ1) < 1e-10:
+				i = maxIter
+				break
+			else:
+				period += 1
+				if period > 20:
+					period = 0
+					nZ1 = nZ
+
+		if bStripe:
+			stripe_a = stripe_a * stripe_sig + stripe_t * one_minus_stripe_sig
+
+		# Derivation of Z
+		D = D * 2 * Z + 1
+
+		potf *= 0.5
+
+	return (ID_INSIDE, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+###############################################################################
+#
+# Iterate complex point with double-double precision using standard
+# Mandelbrot formular Z = Z * Z + C
+#
+# Parameters:
+#
+#   C - Point in complex plain as double-double array [real hi, real lo, imag hi, imag lo]
+#
+#   Other parameters, see calculatePointZ2()
+#
+# Only the iteration of Z is calculated with double-double precision. The
+# derivation and the coloring values only need the magnitude of Z, so they
+# are calculated with the float64 value of Z.
+#
+# Return:
+#
+#   Iteration data tuple, see fractal.colorizeData()
+#
+###############################################################################
+@nb.njit(cache=False)
+def calculatePointZ2DD(C: np.ndarray, colorize: int, paletteMode: int, colorOptions: int, maxIter: int, bailoutPar: list[float],
+					   colorPar: list[float]) -> tuple:
+	stripe_s, stripe_sig, step_s, ncycle, diag = colorPar
+	bailout, log_2_bailout = bailoutPar
+
+	dist = 0.0
+	pot = 0.0
+	stripe_a = 0.0
+	one_minus_stripe_sig = 1.0 - stripe_sig
+
+	bStripe = stripe_s > 0 and colorOptions & FO_SHADING
+	bOrbits = colorOptions & FO_ORBITS
+
+	crh, crl, cih, cil = C[0], C[1], C[2], C[3]
+	zrh, zrl, zih, zil = 0.0, 0.0, 0.0, 0.0
+	nZ1 = 0.0               # Old value of abs(Z) ** 2 for fast orbit detection
+	period = 0              # Period counter for fast orbit detection
+	D = complex(1.0, 0.0)   # 1st derivation of Z
+	smooth_i = 0			# Smooth iteration counter
+	potf = 0.5              # Potential factor 1/2^N
+
+	if bOrbits:
+		orbits = np.zeros(maxIter, dtype=np.complex128)
+
+	for i in range(0, maxIter+1):
+
+		# Z = Z * Z + C = (zr^2 - zi^2 + cr) + (2 * zr * zi + ci) * i
+		rrh, rrl = dd.sqr(zrh, zrl)
+		iih, iil = dd.sqr(zih, zil)
+		rih, ril = dd.mul(zrh, zrl, zih, zil)
+		zrh, zrl = dd.sub(rrh, rrl, iih, iil)
+		zrh, zrl = dd.add(zrh, zrl, crh, crl)
+		zih, zil = dd.add(2.0 * rih, 2.0 * ril, cih, cil)
+		Z = complex(zrh, zih)
+
+		if bStripe:
+			stripe_t = (math.sin(stripe_s * math.atan2(Z.imag, Z.real)) + 1) * 0.5
+
+		nZ = Z.real * Z.real + Z.imag * Z.imag
+		if nZ > bailout:
+			aZ = math.sqrt(nZ)   # abs(Z)
+			log_aZ = math.log(aZ)
+
+			# Smooth iteration counter
+			log_ratio = log_aZ * log_2_bailout
+			smooth_i = 1.0 - math.log(log_ratio) * NC_1_LOG2
+
+			# Exterior distance to mandelbrot set
+			dist = aZ * log_aZ / abs(D) / 2
+
+			# Calculate potential
+			pot = log_aZ * potf
+
+			if bStripe:
+				stripe_a = (stripe_a * (1 + smooth_i * (stripe_sig-1)) + stripe_t * smooth_i * one_minus_stripe_sig)
+				stripe_a = stripe_a / (1 - stripe_sig**i * (1 + smooth_i * (stripe_sig-1)))
+
+			normal = Z / D
+			return (float(i+smooth_i), nZ, normal.real, normal.imag, dist/diag, stripe_a, pot)
 
 		if bOrbits:
 			# Search for orbits (full periodicity check)
 			idx = frc.findOrbit(orbits[:i], Z, 1e-15, 1e-11)
 			if idx > -1:
 				# Found orbit, colorize point inside mandelbrot set
-				#palIdx = int((i - idx) / maxIter * (P.shape[0]-2))
-				#color = P[palIdx]
-				#return (color * 255).astype(np.uint8)
-				return col.rgb2rgbi(col.hsb2rgb(min(1.0,(i - idx) / maxIter * diaScale), 1.0, 1 - i / maxIter))
+				return (ID_ORBIT, float(i), float(i - idx), 0.0, 0.0, 0.0, 0.0)
 			orbits[i] = Z
 		else:
 			# Simplified periodicity check, no orbit colorization
@@ -227,7 +454,7 @@ def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int,
 
 		potf *= 0.5
 
-	return col.rgb2rgbi(P[-1])
+	return (ID_INSIDE, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
 
 ###############################################################################
 #
@@ -238,7 +465,15 @@ def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int,
 #
 #   DC - Distance to reference point in complex plain
 #
-#   P - Color palette np.array((n, 3), dtype=float64), rgb range = 0-1
+#   RO, RC, CI, CV, RN - Reference orbit, see reforbit.ReferenceOrbit:
+#      RO - Full reference orbit, empty array for compressed orbits
+#      RC - Reference point
+#      CI, CV - Checkpoint indices and values of compressed orbit
+#      RN - Length of reference orbit
+#
+#   DS - Delta scale exponent for extended range. DC is multiplied by 2^DS.
+#        Deltas are iterated scaled until they are large enough for double
+#        precision, the derivation is always scaled. 0 = no scaling
 #
 #   colorize - Value to be used for color calculation:
 #      FC_ITERATIONS - Number of iterations
@@ -275,11 +510,9 @@ def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int,
 #                         Range 1-200, 1 = No cycling, default = 32
 #      [4] = diag       - Distance normalization value
 #
-#   light - Light parameters for shading
-#
 # Return:
 #
-#   rgbi color array [red, green, blue], dtype=uint8, rgb range = 0-255
+#   Iteration data tuple, see fractal.colorizeData()
 #
 ###############################################################################
 #
@@ -290,13 +523,11 @@ def calculatePointZ2(C: complex, P: np.ndarray, colorize: int, paletteMode: int,
 #
 ###############################################################################
 @nb.njit(cache=False)
-def calculatePointZ2Pert(DC: complex, RO: np.ndarray, P: np.ndarray, colorize: int, paletteMode: int, colorOptions: int, maxIter: int, bailoutPar: list[float],
-					     colorPar: list[float], light: list[float]) -> np.ndarray:
+def calculatePointZ2Pert(DC: complex, RO: np.ndarray, RC: complex, CI: np.ndarray, CV: np.ndarray, RN: int, DS: int, colorize: int, paletteMode: int, colorOptions: int, maxIter: int, bailoutPar: list[float],
+					     colorPar: list[float]) -> tuple:
 	stripe_s, stripe_sig, step_s, ncycle, diag = colorPar
 	bailout, log_2_bailout = bailoutPar
 
-	diaScale = maxIter/10.0
-
 	dist = 0.0
 	pot = 0.0
 	stripe_a = 0.0
@@ -308,10 +539,17 @@ def calculatePointZ2Pert(DC: complex, RO: np.ndarray, P: np.ndarray, colorize: i
 	Z = 0
 	dZ = 0
 	refidx = 0
-	maxRefIter = RO.shape[0] - 1
+	maxRefIter = RN - 1
+	bCompressed = RO.shape[0] == 0
+	RZ = complex(0.0, 0.0)  # Current point of reference orbit
+	cpidx = 0               # Next checkpoint of compressed reference orbit
+	bScaled = DS != 0       # Delta is scaled by 2^DS
+	invScale = math.ldexp(1.0, -DS)
+	maxScaled = math.ldexp(1.0, 2 * (DS - 900))   # Leave scaled mode if abs(dZ) > 2^-900
+	diagScaled = math.ldexp(diag, DS)
 	nZ1 = 0.0               # Old value of abs(Z) ** 2 for fast orbit detection
 	period = 0              # Period counter for fast orbit detection
-	D = complex(1.0, 0.0)   # 1st derivation of Z
+	D = complex(invScale, 0.0)   # 1st derivation of Z, scaled by 2^-DS
 	smooth_i = 0			# Smooth iteration counter
 	potf = 0.5              # Potential factor 1/2^N
 
@@ -321,11 +559,31 @@ def calculatePointZ2Pert(DC: complex, RO: np.ndarray, P: np.ndarray, colorize: i
 	for i in range(0, maxIter+1):
         # dz = 2 * refOrbit[ri] * dz + dz * dz + dc
         # We could optimize the above line by using precomputed refOrbit2 (already multiplied by 2)
-		dZ = 2.0 * RO[refidx] * dZ + dZ * dZ + DC
+		if bScaled:
+			dZ = 2.0 * RZ * dZ + dZ * dZ * invScale + DC
+		else:
+			dZ = 2.0 * RZ * dZ + dZ * dZ + DC
 		refidx += 1
+
+		# Next point of reference orbit. Compressed orbits are recalculated on the fly
+		if bCompressed:
+			RZ, cpidx = ro.nextOrbitPoint(RZ, refidx, RC, CI, CV, cpidx)
+		else:
+			RZ = RO[refidx]
  
 		# Add the delta orbit to the reference orbit
-		Z = RO[refidx] + dZ
+		if bScaled:
+			nDZ = dZ.real * dZ.real + dZ.imag * dZ.imag
+			if nDZ > maxScaled:
+				# Delta is large enough for double precision
+				dZ *= invScale
+				DC *= invScale
+				bScaled = False
+				Z = RZ + dZ
+			else:
+				Z = RZ + dZ * invScale
+		else:
+			Z = RZ + dZ
 		
 		if bStripe:
 			stripe_t = (math.sin(stripe_s * math.atan2(Z.imag, Z.real)) + 1) * 0.5
@@ -353,19 +611,15 @@ def calculatePointZ2Pert(DC: complex, RO: np.ndarray, P: np.ndarray, colorize: i
 				stripe_a = (stripe_a * (1 + smooth_i * (stripe_sig-1)) + stripe_t * smooth_i * one_minus_stripe_sig)
 				stripe_a = stripe_a / (1 - stripe_sig**i * (1 + smooth_i * (stripe_sig-1)))
 
-			# Color mapping
-			mapColorPar = [stripe_a, step_s, ncycle, float(maxIter), pot]
-			return frc.mapColorValue(P, float(i+smooth_i), nZ, Z/D, dist/diag, mapColorPar, light, colorize, paletteMode, colorOptions)
+			normal = Z / D
+			return (float(i+smooth_i), nZ, normal.real, normal.imag, dist/diagScaled, stripe_a, pot)
 
 		if bOrbits:
 			# Search for orbits (full periodicity check)
 			idx = frc.findOrbit(orbits[:i], Z, 1e-15, 1e-11)
 			if idx > -1:
 				# Found orbit, colorize point inside mandelbrot set
-				#palIdx = int((i - idx) / maxIter * (P.shape[0]-2))
-				#color = P[palIdx]
-				#return (color * 255).astype(np.uint8)
-				return col.rgb2rgbi(col.hsb2rgb(min(1.0,(i - idx) / maxIter * diaScale), 1.0, 1 - i / maxIter))
+				return (ID_ORBIT, float(i), float(i - idx), 0.0, 0.0, 0.0, 0.0)
 			orbits[i] = Z
 		else:
 			# Simplified periodicity check, no orbit colorization
@@ -383,34 +637,68 @@ def calculatePointZ2Pert(DC: complex, RO: np.ndarray, P: np.ndarray, colorize: i
 
 		# If the delta is larger than the reference, or if the reference orbit has already escaped,
 		# reset back to the beginning of the SAME reference orbit!
-		if aZ < abs(dZ) or refidx == maxRefIter:
+		# A scaled delta is always smaller than the reference
+		if (not bScaled and nZ < dZ.real * dZ.real + dZ.imag * dZ.imag) or refidx == maxRefIter:
 			dZ = Z
 			refidx = 0
+			RZ = complex(0.0, 0.0)
+			cpidx = 0
+			if bScaled:
+				DC *= invScale
+				bScaled = False
 
 		# Derivation of Z
-		D = D * 2 * Z + 1
+		D = D * 2 * Z + invScale
 
 		potf *= 0.5
 
-	return col.rgb2rgbi(P[-1])
+	return (ID_INSIDE, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
 
 ###############################################################################
 # Vectorized calculation functions
 ###############################################################################
 
-@nb.guvectorize([(nb.complex128[:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.int32, nb.uint8[:,:])], '(n),(i,j),(),(),(),(k),(l),() -> (n,j)', nopython=True, cache=False, target='parallel')
-def calculateVectorZ2(C, P, colorize, paletteMode, colorOptions, colorPar, light, maxIter, R):
+# Pixel coordinates are passed as separable tables: X contains the real parts of a row
+# of pixels, Y the imaginary part of the row. The complex grid is never materialized.
+# S contains the offsets of the sub-samples of a pixel, see fractal.createSamplePattern().
+# The colors of the sub-samples are averaged in linear light.
+
+@nb.guvectorize([(nb.float64[:], nb.float64, nb.float64[:,:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.int32, nb.uint8[:,:])], '(n),(),(s,t),(i,j),(),(),(),(k),(l),() -> (n,j)', nopython=True, cache=False, target='parallel')
+def calculateVectorZ2(X, Y, S, P, colorize, paletteMode, colorOptions, colorPar, light, maxIter, R):
 	bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
 	log_2_Bailout = 2.0 / math.log(bailout)
+	A = np.zeros(3, dtype=np.float64)
 
-	for p in range(C.shape[0]):
-		R[p,:] = calculatePointZ2(C[p], P, colorize, paletteMode, colorOptions, maxIter, [bailout, log_2_Bailout], colorPar, light)
+	for p in range(X.shape[0]):
+		A[:] = 0
+		for s in range(S.shape[0]):
+			ds.addLinear(A, frc.colorizeData(P, calculatePointZ2(complex(X[p] + S[s,0], Y + S[s,1]), colorize, paletteMode, colorOptions, maxIter, [bailout, log_2_Bailout], colorPar),
+								  colorize, paletteMode, colorOptions, maxIter, colorPar, light))
+		ds.storeAverage(A, S.shape[0], R[p])
 
-@nb.guvectorize([(nb.complex128[:], nb.complex128[:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.int32, nb.uint8[:,:])], '(n),(m),(i,j),(),(),(),(k),(l),() -> (n,j)', nopython=True, cache=False, target='parallel')
-def calculateVectorZ2Pert(DC, RO, P, colorize, paletteMode, colorOptions, colorPar, light, maxIter, R):
+@nb.guvectorize([(nb.float64[:,:], nb.float64[:], nb.float64[:,:], nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.int32, nb.uint8[:,:])], '(n,d),(d),(s,t),(i,j),(),(),(),(k),(l),() -> (n,j)', nopython=True, cache=False, target='parallel')
+def calculateVectorZ2DD(X, Y, S, P, colorize, paletteMode, colorOptions, colorPar, light, maxIter, R):
 	bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
 	log_2_Bailout = 2.0 / math.log(bailout)
-
-	for p in range(DC.shape[0]):
-		R[p,:] = calculatePointZ2Pert(DC[p], RO, P, colorize, paletteMode, colorOptions, maxIter, [bailout, log_2_Bailout], colorPar, light)
-
+	A = np.zeros(3, dtype=np.float64)
+
+	for p in range(X.shape[0]):
+		A[:] = 0
+		for s in range(S.shape[0]):
+			C = dd.add(X[p,0], X[p,1], S[s,0], 0.0) + dd.add(Y[0], Y[1], S[s,1], 0.0)
+			ds.addLinear(A, frc.colorizeData(P, calculatePointZ2DD(C, colorize, paletteMode, colorOptions, maxIter, [bailout, log_2_Bailout], colorPar),
+								  colorize, paletteMode, colorOptions, maxIter, colorPar, light))
+		ds.storeAverage(A, S.shape[0], R[p])
+
+@nb.guvectorize([(nb.float64[:], nb.float64, nb.float64[:,:], nb.complex128[:], nb.complex128, nb.int64[:], nb.complex128[:], nb.int64, nb.int64, nb.float64[:,:], nb.int32, nb.int32, nb.int32, nb.float64[:], nb.float64[:], nb.int32, nb.uint8[:,:])], '(n),(),(s,t),(m),(),(c),(c),(),(),(i,j),(),(),(),(k),(l),() -> (n,j)', nopython=True, cache=False, target='parallel')
+def calculateVectorZ2Pert(DX, DY, S, RO, RC, CI, CV, RN, DS, P, colorize, paletteMode, colorOptions, colorPar, light, maxIter, R):
+	bailout = 4.0 if colorize == FC_ITERATIONS and paletteMode != FP_HUE and colorOptions == 0 else 10**10
+	log_2_Bailout = 2.0 / math.log(bailout)
+	A = np.zeros(3, dtype=np.float64)
+
+	for p in range(DX.shape[0]):
+		A[:] = 0
+		for s in range(S.shape[0]):
+			ds.addLinear(A, frc.colorizeData(P, calculatePointZ2Pert(complex(DX[p] + S[s,0], DY + S[s,1]), RO, RC, CI, CV, RN, DS, colorize, paletteMode, colorOptions, maxIter, [bailout, log_2_Bailout], colorPar),
+								  colorize, paletteMode, colorOptions, maxIter, colorPar, light))
+		ds.storeAverage(A, S.shape[0], R[p])
@@ -0,0 +1,467 @@
+#
+# Poster rendering
+#
+# Renders images of arbitrary size (i.e. 65536 x 65536 pixels) tile by tile
+# and streams every tile to disk, so memory usage only depends on the tile
+# size. Output formats:
+#
+#   - Deep Zoom tile set (.dzi): the tiles of the full resolution level are
+#     written while rendering. The lower levels of the pyramid are created
+#     afterwards from 2 x 2 tiles of the next higher level.
+#   - Tiled BigTIFF (.tif, .tiff): uncompressed RGB tiles are written into a
+#     memory-mapped file.
+#
+# An interrupted render is resumed from the completed tiles, if it is
+# started again with the same parameters. Deep Zoom tiles are complete if
+# the tile file exists. For TIFF files the completed tiles are recorded in
+# a progress file, which is deleted when the image is complete. A hash of
+# the fractal settings, palette, image size and engine is stored next to
+# the output. If it doesn't match, the image is rendered from scratch, so
+# tiles of different renders are never mixed.
+#
+# All tiles are calculated with the same engine. Tiles calculated with
+# perturbation share the reference orbit of the whole image. Tiles can be
+# calculated by several worker processes. The reference orbit is then
+# stored in a temporary file, which all workers map read-only into memory,
+# see reforbit.ReferenceOrbit.share().
+#
+# Usage:
+#
+#   python poster.py fractal.frc poster.dzi --width 65536 --height 65536 [--processes 4]
+#
+
+import os
+import math
+import json
+import shutil
+import struct
+import argparse
+import tempfile
+import time
+import multiprocessing as mp
+
+import numpy as np
+import numba as nb
+from PIL import Image as Img
+
+import tkconfigure.tkconfigure as tkc
+
+import fractal as frc
+import engine as eng
+import reforbit as ro
+import tileserver as ts
+import rendercache as rc
+import export as ex
+
+
+# Return True, if the render key stored in keyFile matches renderKey
+def checkRenderKey(keyFile: str, renderKey: str) -> bool:
+	if not os.path.exists(keyFile):
+		return False
+	with open(keyFile, 'r') as f:
+		return f.read().strip() == renderKey
+
+def writeRenderKey(keyFile: str, renderKey: str):
+	with open(keyFile, 'w') as f:
+		f.write(renderKey + '\n')
+
+
+###############################################################################
+#
+# Deep Zoom tile set writer
+#
+#   fileName - Name of .dzi file. Tiles are stored in directory <name>_files
+#   width, height - Image size
+#   tileSize - Tile size in pixels
+#   renderKey - Hash of the render parameters, see PosterRenderer
+#   tileFormat - 'png' or 'jpg'
+#
+# The render key is stored in the tile directory. Existing tiles of another
+# render are deleted.
+#
+###############################################################################
+
+class DZIWriter:
+
+	def __init__(self, fileName: str, width: int, height: int, tileSize: int, renderKey: str, tileFormat: str = 'png'):
+		self.width      = width
+		self.height     = height
+		self.tileSize   = tileSize
+		self.tileFormat = tileFormat
+		self.directory  = os.path.splitext(fileName)[0] + '_files'
+		self.maxLevel   = math.ceil(math.log2(max(width, height, 2)))
+
+		keyFile = os.path.join(self.directory, 'render.key')
+		if os.path.isdir(self.directory) and not checkRenderKey(keyFile, renderKey):
+			print(f"Deleting tiles of another render in {self.directory}")
+			shutil.rmtree(self.directory)
+		os.makedirs(os.path.join(self.directory, str(self.maxLevel)), exist_ok=True)
+		writeRenderKey(keyFile, renderKey)
+		with open(fileName, 'w') as dziFile:
+			dziFile.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+						  f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tileSize}" Overlap="0" Format="{tileFormat}">\n'
+						  f'  <Size Width="{width}" Height="{height}"/>\n'
+						  '</Image>\n')
+
+	def tileFile(self, level: int, tx: int, ty: int) -> str:
+		return os.path.join(self.directory, str(level), f"{tx}_{ty}.{self.tileFormat}")
+
+	# Image size of pyramid level
+	def levelSize(self, level: int) -> tuple[int, int]:
+		scale = 1 << (self.maxLevel - level)
+		return ((self.width + scale - 1) // scale, (self.height + scale - 1) // scale)
+
+	def isDone(self, tx: int, ty: int) -> bool:
+		return os.path.exists(self.tileFile(self.maxLevel, tx, ty))
+
+	def writeTile(self, tx: int, ty: int, tile: np.ndarray):
+		self.saveTile(Img.fromarray(tile, 'RGB'), self.maxLevel, tx, ty)
+
+	# Tiles are written to a temporary file first, so incomplete tiles are never used
+	def saveTile(self, image: Img.Image, level: int, tx: int, ty: int):
+		fileName = self.tileFile(level, tx, ty)
+		if self.tileFormat == 'jpg':
+			image.save(fileName + '.tmp', 'jpeg', **ex.formats['JPEG'][2])
+		else:
+			image.save(fileName + '.tmp', 'png', **ex.formats['PNG (fast)'][2])
+		os.replace(fileName + '.tmp', fileName)
+
+	# Create lower pyramid levels
+	def close(self):
+		size = self.tileSize
+		for level in range(self.maxLevel-1, -1, -1):
+			os.makedirs(os.path.join(self.directory, str(level)), exist_ok=True)
+			width, height = self.levelSize(level)
+			childWidth, childHeight = self.levelSize(level+1)
+			for ty in range((height + size - 1) // size):
+				for tx in range((width + size - 1) // size):
+					if os.path.exists(self.tileFile(level, tx, ty)):
+						continue
+					cw = min(2 * size, childWidth - 2 * tx * size)
+					ch = min(2 * size, childHeight - 2 * ty * size)
+					canvas = Img.new('RGB', (cw, ch))
+					for j in range(2):
+						for i in range(2):
+							if 2*tx+i < (childWidth + size - 1) // size and 2*ty+j < (childHeight + size - 1) // size:
+								with Img.open(self.tileFile(level+1, 2*tx+i, 2*ty+j)) as child:
+									canvas.paste(child, (i * size, j * size))
+					self.saveTile(canvas.resize(((cw + 1) // 2, (ch + 1) // 2), Img.Resampling.BOX), level, tx, ty)
+		print(f"Created {self.maxLevel+1} pyramid levels in {self.directory}")
+
+
+###############################################################################
+#
+# Tiled BigTIFF writer
+#
+#   fileName - Name of TIFF file
+#   width, height - Image size
+#   tileSize - Tile size in pixels, must be a multiple of 16
+#   renderKey - Hash of the render parameters, see PosterRenderer
+#
+# The file is created with its final size, tile data are written through a
+# memory map. Edge tiles are padded with black pixels. The render key is
+# stored in a key file, which is deleted together with the progress file.
+#
+###############################################################################
+
+class TIFFWriter:
+
+	# Tag types
+	SHORT = 3
+	LONG  = 4
+	LONG8 = 16
+
+	def __init__(self, fileName: str, width: int, height: int, tileSize: int, renderKey: str):
+		if tileSize % 16 != 0:
+			raise ValueError("TIFF tile size must be a multiple of 16")
+
+		self.fileName = fileName
+		self.tilesX = (width + tileSize - 1) // tileSize
+		self.tilesY = (height + tileSize - 1) // tileSize
+		tiles = self.tilesX * self.tilesY
+		tileBytes = tileSize * tileSize * 3
+
+		tags = [
+			(256, self.LONG,  [width]),				# ImageWidth
+			(257, self.LONG,  [height]),			# ImageLength
+			(258, self.SHORT, [8, 8, 8]),			# BitsPerSample
+			(259, self.SHORT, [1]),					# Compression: none
+			(262, self.SHORT, [2]),					# PhotometricInterpretation: RGB
+			(277, self.SHORT, [3]),					# SamplesPerPixel
+			(284, self.SHORT, [1]),					# PlanarConfiguration: contiguous
+			(322, self.LONG,  [tileSize]),			# TileWidth
+			(323, self.LONG,  [tileSize]),			# TileLength
+			(324, self.LONG8, None),				# TileOffsets
+			(325, self.LONG8, None)					# TileByteCounts
+		]
+		offsetsPos = 16 + 8 + len(tags) * 20 + 8
+		countsPos = offsetsPos + tiles * 8
+		dataStart = (countsPos + tiles * 8 + 4095) // 4096 * 4096
+		fileSize = dataStart + tiles * tileBytes
+
+		self.progressFile = fileName + '.progress'
+		self.keyFile = fileName + '.key'
+		resume = (os.path.exists(fileName) and os.path.getsize(fileName) == fileSize and
+				  os.path.exists(self.progressFile) and os.path.getsize(self.progressFile) == tiles and
+				  checkRenderKey(self.keyFile, renderKey))
+
+		if not resume:
+			header = struct.pack('<2sHHHQ', b'II', 43, 8, 0, 16) + struct.pack('<Q', len(tags))
+			for tag, type, values in tags:
+				if tag == 324:
+					header += struct.pack('<HHQQ', tag, type, tiles, offsetsPos)
+				elif tag == 325:
+					header += struct.pack('<HHQQ', tag, type, tiles, countsPos)
+				else:
+					format = '<' + ('H' if type == self.SHORT else 'I') * len(values)
+					header += struct.pack('<HHQ', tag, type, len(values)) + struct.pack(format, *values).ljust(8, b'\0')
+			header += struct.pack('<Q', 0)
+
+			with open(fileName, 'wb') as tiffFile:
+				tiffFile.write(header)
+				(dataStart + np.arange(tiles, dtype='<u8') * tileBytes).tofile(tiffFile)
+				np.full(tiles, tileBytes, dtype='<u8').tofile(tiffFile)
+				tiffFile.truncate(fileSize)
+			np.zeros(tiles, dtype=np.uint8).tofile(self.progressFile)
+			writeRenderKey(self.keyFile, renderKey)
+		else:
+			print(f"Resuming {fileName}")
+
+		self.data = np.memmap(fileName, dtype=np.uint8, mode='r+', offset=dataStart, shape=(self.tilesY, self.tilesX, tileSize, tileSize, 3))
+		self.done = np.memmap(self.progressFile, dtype=np.uint8, mode='r+', shape=(self.tilesY, self.tilesX))
+
+	def isDone(self, tx: int, ty: int) -> bool:
+		return self.done[ty, tx] != 0
+
+	# The tile is marked as done after its data are written to disk
+	def writeTile(self, tx: int, ty: int, tile: np.ndarray):
+		self.data[ty, tx, :tile.shape[0], :tile.shape[1]] = tile
+		self.data.flush()
+		self.done[ty, tx] = 1
+		self.done.flush()
+
+	def close(self):
+		complete = bool(self.done.all())
+		del self.data
+		del self.done
+		if complete:
+			os.remove(self.progressFile)
+			os.remove(self.keyFile)
+
+
+###############################################################################
+#
+# Poster renderer
+#
+#   fractal - Fractal with the area of the image. The area is adjusted to
+#     the aspect ratio of the image
+#   fractalType - Fractal type
+#   palette - Color palette
+#   width, height - Image size
+#   tileSize - Width and height of tiles in pixels
+#   engineClass - Calculation engine. If None, the engine is selected
+#     automatically
+#   reference - Reference orbit of perturbation engines. If None, the
+#     reference orbit is calculated
+#
+# Every tile is calculated as a square of tileSize x tileSize pixels with
+# the pixel spacing of the image. Parts of edge tiles outside of the image
+# are cropped. The attribute renderKey identifies the rendered image for
+# resuming, see DZIWriter and TIFFWriter.
+#
+###############################################################################
+
+class PosterRenderer:
+
+	def __init__(self, fractal: frc.Fractal, fractalType: str, palette: np.ndarray, width: int, height: int, tileSize: int = 512,
+				 engineClass: type[eng.Engine] | None = None, reference: ro.ReferenceOrbit | None = None):
+		self.fractal     = fractal
+		self.fractalType = fractalType
+		self.palette     = palette
+		self.width       = width
+		self.height      = height
+		self.tileSize    = tileSize
+
+		self.corner, size = fractal.adjustAspectRatio(width, height, *fractal.settings.getValues(['corner', 'size']))
+		self.cornerLo = fractal.getCornerDD()[1]
+		self.dx = fractal.dx(width)
+		self.dy = fractal.dy(height)
+
+		self.engineClass = engineClass
+		if engineClass is None:
+			self.engineClass, reason = eng.selectEngine(fractal, fractalType, width, height, palette)
+			if self.engineClass is None:
+				raise ValueError(f"Fractal type '{fractalType}' not supported by engine")
+			print(f"Rendering {width}x{height} pixels with {self.engineClass.name} engine, {reason}")
+
+		self.settingsJSON = fractal.settings.getJSON()
+		self.renderKey = rc.hashKey('poster', fractalType, self.settingsJSON, palette, width, height,
+									tileSize, self.engineClass.name)
+
+		# Reference orbit shared by all tiles
+		self.reference = reference
+		if self.engineClass.perturbation and reference is None:
+			maxIter = fractal.getMaxValue()
+			bailout = frc.Fractal.getBailout(*fractal.settings.getValues(['colorize', 'paletteMode', 'colorOptions']))
+			if fractal.settings['autoReference']:
+				refPoint = fractal.selectReference(self.corner, size, maxIter, bailout)
+			else:
+				refPoint = self.corner + size / 2.0
+			self.reference = fractal.createReferenceOrbit(refPoint, maxIter, bailout)
+			print(f"Reference point {refPoint}, reference orbit length {len(self.reference)}")
+
+	# Render tile (tx, ty), tile (0, 0) is the upper left tile. Returns image array
+	def renderTile(self, tx: int, ty: int) -> np.ndarray:
+		size = self.tileSize
+		x = tx * size
+		y = self.height - (ty + 1) * size
+		corner, cornerLo = frc.addComplexDD(self.corner, self.cornerLo, complex(x * self.dx, y * self.dy))
+		self.fractal.setDimensions(corner, complex((size-1) * self.dx, (size-1) * self.dy), sync=False, cornerLo=cornerLo)
+
+		oversampling, jitter = self.fractal.settings.getValues(['oversampling', 'jitter'])
+		self.fractal.beginCalc(size, size, self.engineClass.perturbation, self.engineClass.getDeltaScale(self.fractal), reference=self.reference,
+							   oversampling=oversampling, jitter=bool(jitter), aspectRatio=False)
+		engine = self.engineClass(self.fractal, self.fractalType, self.palette, self.fractal.getCalcParameters())
+		imageMap = engine.calculateArea(0, 0, size-1, size-1)
+		self.fractal.endCalc()
+
+		return imageMap[::-1][:min(size, self.height - ty * size), :min(size, self.width - x)]
+
+	# Render all tiles, which are not completed by the writer. If processes is
+	# greater than 0, the tiles are calculated by this number of worker processes
+	def render(self, writer: DZIWriter | TIFFWriter, processes: int = 0):
+		tiles = [(tx, ty) for ty in range((self.height + self.tileSize - 1) // self.tileSize)
+				 for tx in range((self.width + self.tileSize - 1) // self.tileSize)]
+		pending = [(tx, ty) for tx, ty in tiles if not writer.isDone(tx, ty)]
+		print(f"{len(tiles) - len(pending)} of {len(tiles)} tiles already rendered")
+
+		# Tiles are written in background while the next tile is calculated. Pending
+		# tiles are written, before the writer is closed or an interrupt is passed on.
+		# Write errors are passed on after the next tile
+		errors = []
+		def onWritten(future):
+			if future.exception() is not None:
+				errors.append(future.exception())
+
+		exporter = ex.ImageExporter()
+		pool = None
+		orbitFile = None
+		startTime = time.time()
+		try:
+			if processes > 0 and len(pending) > 0:
+				pool, orbitFile = self.startWorkers(processes)
+				results = pool.imap_unordered(renderWorkerTile, pending)
+			else:
+				results = ((tx, ty, self.renderTile(tx, ty)) for tx, ty in pending)
+
+			for n, (tx, ty, tile) in enumerate(results):
+				exporter.wait(exporter.maxPending - 1)
+				if errors:
+					break
+				exporter.submitCall(writer.writeTile, tx, ty, tile, onDone=onWritten)
+				elapsed = time.time() - startTime
+				print(f"Tile {tx}/{ty} done, {n+1} of {len(pending)}, {elapsed / (n+1) * (len(pending)-n-1):.0f} s remaining")
+		finally:
+			if pool is not None:
+				pool.terminate()
+				pool.join()
+			if orbitFile is not None:
+				os.remove(orbitFile)
+			exporter.close()
+		if errors:
+			raise errors[0]
+		writer.close()
+
+	# Start worker processes. Every worker creates a copy of the fractal and calculates tiles
+	# with the same engine. The reference orbit is shared by a memory mapped file.
+	# Returns tuple (pool, name of orbit file or None)
+	def startWorkers(self, processes: int) -> tuple:
+		orbitFile = None
+		if self.reference is not None:
+			fd, orbitFile = tempfile.mkstemp(suffix='.npz', prefix='orbit')
+			os.close(fd)
+			# The orbit array of this process is replaced by the memory map, so
+			# the orbit file can only be deleted after the workers are finished
+			self.reference.share(orbitFile)
+
+		threads = max(nb.config.NUMBA_NUM_THREADS // processes, 1)
+		print(f"Starting {processes} worker processes with {threads} threads")
+		pool = mp.get_context('spawn').Pool(processes, initializer=initWorker,
+											initargs=(type(self.fractal), self.settingsJSON, self.fractalType, self.palette, self.width,
+													  self.height, self.tileSize, self.engineClass, orbitFile, threads))
+		return (pool, orbitFile)
+
+
+# Poster renderer of a worker process, see PosterRenderer.startWorkers()
+workerRenderer = None
+
+def initWorker(fractalClass: type[frc.Fractal], settingsJSON: str, fractalType: str, palette: np.ndarray, width: int, height: int,
+			   tileSize: int, engineClass: type[eng.Engine], orbitFile: str | None, threads: int):
+	global workerRenderer
+	nb.set_num_threads(threads)
+	fractal = fractalClass()
+	ts.setFractalConfig(fractal, json.loads(settingsJSON, object_hook=tkc.TKConfigure._decodeJSON))
+	reference = ro.ReferenceOrbit.load(orbitFile, mmap=True) if orbitFile is not None else None
+	workerRenderer = PosterRenderer(fractal, fractalType, palette, width, height, tileSize, engineClass, reference)
+
+# Returns tuple (tx, ty, image array)
+def renderWorkerTile(tile: tuple[int, int]) -> tuple:
+	return (*tile, workerRenderer.renderTile(*tile))
+
+
+###############################################################################
+#
+# Render poster of a fractal definition
+#
+#   js - Settings in the format of .frc files, see Application.getSettings()
+#   fileName - Output file (.dzi, .tif or .tiff)
+#   width, height - Image size
+#   tileSize - Tile size in pixels
+#   tileFormat - Format of Deep Zoom tiles, 'png' or 'jpg'
+#   processes - Number of worker processes, 0 calculates all tiles in the
+#     calling process
+#
+# The GUI calls this function in a separate process, so the calculation
+# kernels never run in a background thread of the GUI process. Parallel
+# numba kernels must not be called by several threads at the same time.
+#
+###############################################################################
+def renderPoster(js: dict, fileName: str, width: int, height: int, tileSize: int = 512, tileFormat: str = 'png', processes: int = 0):
+	extension = os.path.splitext(fileName)[1].lower()
+	if extension not in ('.dzi', '.tif', '.tiff'):
+		raise ValueError("Output file must be a .dzi, .tif or .tiff file")
+
+	fractal, fractalType, palette = ts.createFractal(js)
+	renderer = PosterRenderer(fractal, fractalType, palette, width, height, tileSize)
+	if extension == '.dzi':
+		writer = DZIWriter(fileName, width, height, tileSize, renderer.renderKey, tileFormat)
+	else:
+		writer = TIFFWriter(fileName, width, height, tileSize, renderer.renderKey)
+	renderer.render(writer, processes)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Render large image of a fractal definition tile by tile")
+	parser.add_argument('filename', help="Fractal definition (.frc)")
+	parser.add_argument('output', help="Output file (.dzi, .tif or .tiff)")
+	parser.add_argument('--width', type=int, required=True, help="Image width in pixels")
+	parser.add_argument('--height', type=int, required=True, help="Image height in pixels")
+	parser.add_argument('--tilesize', type=int, default=512, help="Tile size in pixels")
+	parser.add_argument('--tileformat', choices=['png', 'jpg'], default='png', help="Format of Deep Zoom tiles")
+	parser.add_argument('--processes', type=int, default=0, help="Number of worker processes, 0 renders in the main process")
+	args = parser.parse_args()
+
+	if os.path.splitext(args.output)[1].lower() not in ('.dzi', '.tif', '.tiff'):
+		parser.error("Output file must be a .dzi, .tif or .tiff file")
+
+	with open(args.filename, "r") as inputFile:
+		js = json.load(inputFile, object_hook=tkc.TKConfigure._decodeJSON)
+
+	try:
+		renderPoster(js, args.output, args.width, args.height, args.tilesize, args.tileformat, args.processes)
+	except KeyboardInterrupt:
+		print("Rendering interrupted, start again to resume")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,175 @@
+#
+# Real time zoom
+#
+# Zooming reuses the pixels of the previous frame (XaoS method). The image
+# grid is separable: all pixels of a column have the same real part and all
+# pixels of a row have the same imaginary part. So the samples of the
+# previous frame are reprojected by columns and rows. A column or row of the
+# new frame reuses the nearest column or row of the previous frame, if its
+# coordinate is close enough to the new pixel position. Only the remaining
+# columns and rows are calculated, those with the largest position error
+# first, as long as the time budget of the frame allows. Columns and rows
+# which are not calculated are approximated by the nearest previous sample
+# and keep its coordinate, so they are calculated in one of the next frames.
+#
+# References:
+#
+#   - XaoS: https://xaos-project.github.io
+#
+
+import time
+
+import numpy as np
+import numba as nb
+
+import engine as eng
+
+
+class RealtimeZoom:
+
+	# Time budget for calculating pixels per frame in seconds
+	frameTime = 0.04
+
+	# Maximum distance of a reused sample from the new pixel position in pixels
+	maxDistance = 0.5
+
+	def __init__(self, drawer: object, fractalType: str):
+		self.drawer  = drawer
+		self.fractal = drawer.fractal
+		self.width   = drawer.width
+		self.height  = drawer.height
+
+		# Coordinates of columns and rows are stored relative to the corner of the first frame
+		self.origin = self.fractal.settings['corner']
+		self.xs = np.arange(self.width) * self.fractal.dx(self.width)
+		self.ys = np.arange(self.height) * self.fractal.dy(self.height)
+		self.imageMap = drawer.imageMap.copy()
+
+		# Zoom factor, which is not applied yet, see frame()
+		self.factor = 1.0
+
+		# Calculation time per pixel, measured during zooming
+		self.pixelTime = 1e-6
+
+		self.engine = eng.Engine(self.fractal, fractalType, drawer.palette, self.fractal.getCalcParameters())
+
+	###############################################################################
+	#
+	# Zoom and draw a frame
+	#
+	#   factor - Zoom factor, > 1 zooms in, < 1 zooms out
+	#   x, y - Pixel which keeps its position
+	#
+	# Zoom factors, which don't change the fractal area by at least one pixel,
+	# are accumulated until the next frame.
+	#
+	# Returns:
+	#
+	#   False, if the standard engine is not precise enough for the new area.
+	#   The fractal area is not changed in this case
+	#
+	###############################################################################
+	def frame(self, factor: float, x: int, y: int) -> bool:
+		self.factor *= factor
+		if int(self.width / self.factor) == self.width:
+			return True
+
+		(corner, cornerLo), size = self.fractal.getCornerDD(), self.fractal.settings['size']
+		self.fractal.zoom(self.factor * 100.0, self.width, self.height, x, y, center=False)
+		self.factor = 1.0
+		if not eng.Engine.isSuitable(*eng.getSpacing(self.fractal, self.width, self.height)):
+			self.fractal.setDimensions(corner, size, cornerLo=cornerLo)
+			return False
+
+		startTime = time.perf_counter()
+
+		# New pixel positions
+		offset = self.fractal.settings['corner'] - self.origin
+		newXs = offset.real + np.arange(self.width) * self.fractal.dx(self.width)
+		newYs = offset.imag + np.arange(self.height) * self.fractal.dy(self.height)
+		colSrc, colError = matchSamples(self.xs, newXs, self.maxDistance)
+		rowSrc, rowError = matchSamples(self.ys, newYs, self.maxDistance)
+
+		# Select columns and rows with the largest errors within the time budget
+		budget = max(self.frameTime / self.pixelTime, max(self.width, self.height))
+		errors = np.concatenate((colError, rowError))
+		costs = np.concatenate((np.full(self.width, self.height), np.full(self.height, self.width)))
+		order = np.argsort(-errors, kind='stable')
+		order = order[errors[order] > 0]
+		order = order[np.cumsum(costs[order]) <= budget]
+		cols = order[order < self.width]
+		rows = order[order >= self.width] - self.width
+
+		# Reproject previous frame, calculated columns and rows get the new coordinates
+		self.imageMap = self.imageMap[rowSrc][:, colSrc]
+		self.xs = self.xs[colSrc]
+		self.ys = self.ys[rowSrc]
+		self.xs[cols] = newXs[cols]
+		self.ys[rows] = newYs[rows]
+
+		# Calculate rows, then columns without the calculated rows. Frames are calculated without oversampling
+		others = np.setdiff1d(np.arange(self.height), rows)
+		self.fractal.xTab = self.origin.real + self.xs
+		self.fractal.yTab = self.origin.imag + self.ys
+		self.fractal.samples = np.zeros((1, 2), dtype=np.float64)
+		if len(rows) > 0:
+			self.imageMap[rows] = self.engine.calculatePoints(np.arange(self.width)[np.newaxis, :], rows[:, np.newaxis])
+		if len(cols) > 0 and len(others) > 0:
+			self.imageMap[others[:, np.newaxis], cols[np.newaxis, :]] = self.engine.calculatePoints(cols[np.newaxis, :], others[:, np.newaxis])
+
+		pixels = len(rows) * self.width + len(cols) * len(others)
+		if pixels > 0:
+			self.pixelTime = max((time.perf_counter() - startTime) / pixels, 1e-9)
+
+		self.show()
+		return True
+
+	# Show current frame
+	def show(self):
+		self.drawer.imageMap = self.imageMap
+		self.drawer.dataMap = None
+		corner, cornerLo = self.fractal.getCornerDD()
+		self.drawer.area = (corner, self.fractal.settings['size'], cornerLo)
+		self.drawer.bImage = True
+		self.drawer.showImage(self.drawer.app['autoScale'])
+
+
+###############################################################################
+#
+# Match samples of previous frame to new pixel positions
+#
+#   old - Sorted coordinates of previous samples
+#   new - Sorted coordinates of new pixels
+#   maxDistance - Maximum distance of reused samples in pixels
+#
+# Every new pixel gets the nearest previous sample. Samples closer than
+# maxDistance are reused, every sample only once.
+#
+# Returns:
+#
+#   Tuple with indices of previous samples and position errors in pixels,
+#   0 for reused samples
+#
+###############################################################################
+@nb.njit(cache=False)
+def matchSamples(old: np.ndarray, new: np.ndarray, maxDistance: float) -> tuple:
+	n = new.shape[0]
+	spacing = abs(new[-1] - new[0]) / max(n-1, 1)
+	src = np.zeros(n, dtype=np.int64)
+	error = np.zeros(n, dtype=np.float64)
+	lastUsed = -1
+
+	for i in range(n):
+		j = min(max(np.searchsorted(old, new[i]), 1), old.shape[0]-1)
+		if abs(old[j-1] - new[i]) <= abs(old[j] - new[i]):
+			j -= 1
+		src[i] = j
+		error[i] = abs(old[j] - new[i]) / spacing
+		if error[i] <= maxDistance and j != lastUsed:
+			error[i] = 0.0
+			lastUsed = j
+		elif error[i] == 0.0:
+			# Sample already used by the previous pixel
+			error[i] = maxDistance
+
+	return src, error
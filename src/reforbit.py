@@ -0,0 +1,238 @@
+#
+# Reference orbits for perturbation method
+#
+# References:
+#
+#   - Orbit compression: https://fractalforums.org/index.php?topic=4360.0 (Zhuoran)
+#
+
+import zipfile
+
+import numpy as np
+import numba as nb
+
+
+###############################################################################
+#
+# Reference orbit
+#
+# A reference orbit is stored either as full array with all orbit points or
+# compressed. A compressed orbit only contains the reference point and the
+# checkpoints where the orbit recalculated with double precision deviates
+# from the stored orbit. The kernel recalculates the orbit on the fly and
+# replaces the recalculated value by the checkpoint value at checkpoint
+# indices (Zhuoran's orbit compression).
+#
+# If the reference orbit is calculated with double precision, the compressed
+# orbit has no checkpoints at all, so memory usage doesn't depend on the
+# orbit length.
+#
+# Attributes:
+#
+#   C       - Reference point
+#   length  - Number of orbit points
+#   orbit   - Array with orbit points. Empty for compressed orbits
+#   cpIndex - Orbit indices of checkpoints, dtype=int64
+#   cpValue - Orbit values at checkpoints, dtype=complex128
+#
+###############################################################################
+
+class ReferenceOrbit:
+
+	# Orbits longer than this are compressed in storage mode 'Auto'
+	autoCompressLength = 1000000
+
+	def __init__(self, C: complex, orbit: np.ndarray, compress: bool = False, tolerance: float = 1e-15):
+		self.C       = complex(C)
+		self.length  = orbit.shape[0]
+		self.orbit   = orbit
+		self.cpIndex = np.zeros(0, dtype=np.int64)
+		self.cpValue = np.zeros(0, dtype=np.complex128)
+
+		if compress:
+			self.compress(tolerance)
+
+	def __len__(self):
+		return self.length
+
+	def isCompressed(self) -> bool:
+		return self.orbit.shape[0] == 0 and self.length > 0
+
+	# Memory used by orbit data in bytes
+	def nbytes(self) -> int:
+		return self.orbit.nbytes + self.cpIndex.nbytes + self.cpValue.nbytes
+
+	# Compress orbit, the full orbit array is released
+	def compress(self, tolerance: float = 1e-15):
+		if not self.isCompressed() and self.length > 0:
+			self.cpIndex, self.cpValue = compressOrbit(np.ascontiguousarray(self.orbit, dtype=np.complex128), self.C, tolerance)
+			self.orbit = np.zeros(0, dtype=np.complex128)
+			print(f"Compressed reference orbit of length {self.length} to {len(self.cpIndex)} checkpoints")
+
+	# Return full orbit array (decompress orbit if required)
+	def getOrbit(self) -> np.ndarray:
+		if self.isCompressed():
+			return decompressOrbit(self.C, self.length, self.cpIndex, self.cpValue)
+		return self.orbit
+
+	# Return orbit parameters for perturbation kernels: (RO, RC, CI, CV, RN)
+	def getKernelArgs(self) -> tuple:
+		return (self.orbit, self.C, self.cpIndex, self.cpValue, self.length)
+
+	# Return orbit data as dictionary of arrays. The names are prefixed by prefix,
+	# so the orbit can be stored together with other arrays, see sidecar.py
+	def getArrays(self, prefix: str = '') -> dict:
+		return {
+			prefix+'C': np.array([self.C]), prefix+'length': np.array([self.length]),
+			prefix+'orbit': self.orbit, prefix+'cpIndex': self.cpIndex, prefix+'cpValue': self.cpValue
+		}
+
+	# Create orbit from dictionary of arrays returned by getArrays(). The orbit
+	# array is used as it is, i.e. a memory map is kept
+	@classmethod
+	def fromArrays(cls, arrays: dict, prefix: str = '') -> 'ReferenceOrbit':
+		refOrbit = cls(arrays[prefix+'C'][0], arrays[prefix+'orbit'])
+		refOrbit.length  = int(arrays[prefix+'length'][0])
+		refOrbit.cpIndex = np.array(arrays[prefix+'cpIndex'])
+		refOrbit.cpValue = np.array(arrays[prefix+'cpValue'])
+		return refOrbit
+
+	# Save orbit. The file is a uncompressed numpy .npz file, which allows
+	# memory mapping of the orbit array
+	def save(self, fileName: str):
+		np.savez(fileName, **self.getArrays())
+
+	# Load orbit. If mmap is True, the orbit array is mapped read-only into
+	# memory, so several processes can share one orbit file
+	@classmethod
+	def load(cls, fileName: str, mmap: bool = True) -> 'ReferenceOrbit':
+		return cls.fromArrays(loadArrays(fileName, mmap=mmap))
+
+	# Save orbit to file and replace orbit array by read-only memory map of the file
+	def share(self, fileName: str) -> 'ReferenceOrbit':
+		self.save(fileName)
+		self.orbit = loadArrays(fileName, mmap=True)['orbit']
+		return self
+
+
+###############################################################################
+#
+# Load arrays from uncompressed .npz file
+#
+#   fileName - Name of .npz file
+#   mmap - Map arrays read-only into memory instead of reading them
+#
+# Returns:
+#
+#   Dictionary with arrays
+#
+###############################################################################
+def loadArrays(fileName: str, mmap: bool = True) -> dict:
+	arrays = {}
+
+	with zipfile.ZipFile(fileName) as zf, open(fileName, 'rb') as f:
+		for info in zf.infolist():
+			name = info.filename.removesuffix('.npy')
+			if not mmap or info.compress_type != zipfile.ZIP_STORED:
+				with zf.open(info) as member:
+					arrays[name] = np.lib.format.read_array(member)
+				continue
+
+			# Skip local file header (30 bytes + file name + extra field)
+			f.seek(info.header_offset + 26)
+			nameLen, extraLen = np.frombuffer(f.read(4), dtype='<u2')
+			f.seek(info.header_offset + 30 + int(nameLen) + int(extraLen))
+
+			# Read header of .npy file
+			if np.lib.format.read_magic(f) == (1, 0):
+				shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(f)
+			else:
+				shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0(f)
+			if dtype.hasobject or np.prod(shape) == 0:
+				with zf.open(info) as member:
+					arrays[name] = np.lib.format.read_array(member)
+			else:
+				arrays[name] = np.memmap(fileName, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+										 order='F' if fortranOrder else 'C')
+
+	return arrays
+
+###############################################################################
+#
+# Compress orbit
+#
+#   R - Full orbit
+#   C - Reference point
+#   tolerance - Maximum relative deviation of recalculated orbit
+#
+# Returns:
+#
+#   Tuple with arrays of checkpoint indices and checkpoint values
+#
+###############################################################################
+@nb.njit(cache=False)
+def compressOrbit(R: np.ndarray, C: complex, tolerance: float) -> tuple:
+	cpIndex = np.zeros(0, dtype=np.int64)
+	cpValue = np.zeros(0, dtype=np.complex128)
+
+	# 1st pass counts checkpoints, 2nd pass stores them
+	for p in range(2):
+		n = 0
+		Z = R[0]
+		for i in range(1, R.shape[0]):
+			Z = Z * Z + C
+			if abs(Z - R[i]) > tolerance * abs(R[i]):
+				if p == 1:
+					cpIndex[n] = i
+					cpValue[n] = R[i]
+				n += 1
+				Z = R[i]
+		if p == 0:
+			cpIndex = np.zeros(n, dtype=np.int64)
+			cpValue = np.zeros(n, dtype=np.complex128)
+
+	return cpIndex, cpValue
+
+###############################################################################
+#
+# Decompress orbit
+#
+#   C - Reference point
+#   length - Orbit length
+#   cpIndex, cpValue - Checkpoints
+#
+# Returns:
+#
+#   Full orbit array
+#
+###############################################################################
+@nb.njit(cache=False)
+def decompressOrbit(C: complex, length: int, cpIndex: np.ndarray, cpValue: np.ndarray) -> np.ndarray:
+	R = np.zeros(length, dtype=np.complex128)
+	Z = complex(0.0, 0.0)
+	k = 0
+	for i in range(1, length):
+		Z, k = nextOrbitPoint(Z, i, C, cpIndex, cpValue, k)
+		R[i] = Z
+	return R
+
+###############################################################################
+#
+# Calculate next point of compressed orbit
+#
+#   Z - Current orbit point
+#   i - Index of next orbit point
+#   C - Reference point
+#   cpIndex, cpValue - Checkpoints
+#   k - Index of next checkpoint
+#
+# Returns:
+#
+#   Tuple with next orbit point and index of next checkpoint
+#
+###############################################################################
+@nb.njit(cache=False)
+def nextOrbitPoint(Z: complex, i: int, C: complex, cpIndex: np.ndarray, cpValue: np.ndarray, k: int) -> tuple:
+	if k < cpIndex.shape[0] and cpIndex[k] == i:
+		return cpValue[k], k+1
+	return Z * Z + C, k
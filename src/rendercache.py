@@ -0,0 +1,181 @@
+#
+# Cache of drawn images and iteration data
+#
+# Entries are addressed by a hash of all parameters, which influence the
+# result (content addressed). Images and iteration data have separate keys,
+# so an image with a different palette can be recolored from cached
+# iteration data.
+#
+
+import os
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Increase, if the meaning of cached data changes
+CACHE_VERSION = 1
+
+
+###############################################################################
+#
+# Calculate cache key
+#
+#   values - Values of any type. Numpy arrays, lists, tuples and dictionaries
+#     are hashed by content
+#
+# Returns:
+#
+#   Hex digest of the values
+#
+###############################################################################
+def hashKey(*values) -> str:
+	h = hashlib.sha1(str(CACHE_VERSION).encode())
+
+	def update(value):
+		if isinstance(value, np.ndarray):
+			h.update(f"array{value.dtype}{value.shape}".encode())
+			h.update(np.ascontiguousarray(value).tobytes())
+		elif isinstance(value, (list, tuple)):
+			h.update(f"seq{len(value)}".encode())
+			for v in value:
+				update(v)
+		elif isinstance(value, dict):
+			h.update(f"dict{len(value)}".encode())
+			for k in sorted(value):
+				update(k)
+				update(value[k])
+		else:
+			h.update(repr(value).encode())
+
+	update(values)
+	return h.hexdigest()
+
+
+###############################################################################
+#
+# LRU cache for numpy arrays
+#
+# Entries are kept in memory up to maxMemory bytes. The least recently used
+# entries are removed, if the limit is exceeded. If directory is specified,
+# removed entries are written to this directory and loaded again on
+# request. The directory is limited to maxDiskSize bytes, the least recently
+# used files are deleted. Files in the directory are kept between sessions.
+#
+# Arrays passed to put() and returned by get() belong to the cache and must
+# not be modified.
+#
+###############################################################################
+
+class RenderCache:
+
+	def __init__(self, maxMemory: int = 512 * 2**20, directory: str | None = None, maxDiskSize: int = 2 * 2**30):
+		self.maxMemory   = maxMemory
+		self.directory   = directory
+		self.maxDiskSize = maxDiskSize
+
+		# Entries in memory in LRU order (least recently used first)
+		self.entries = OrderedDict()
+		self.memory = 0
+
+		# Size of files on disk in LRU order
+		self.files = OrderedDict()
+		self.diskSize = 0
+
+		self.hits = 0
+		self.misses = 0
+
+		if directory is not None:
+			try:
+				os.makedirs(directory, exist_ok=True)
+				files = [(e.stat().st_mtime, e.name[:-4], e.stat().st_size) for e in os.scandir(directory) if e.name.endswith('.npy')]
+				for _, key, size in sorted(files):
+					self.files[key] = size
+					self.diskSize += size
+				self.trimDisk()
+			except OSError as e:
+				print(f"Cannot use cache directory {directory}: {e}")
+				self.directory = None
+
+	def __contains__(self, key: str) -> bool:
+		return key in self.entries or key in self.files
+
+	def __len__(self) -> int:
+		return len(self.entries) + len(self.files)
+
+	# Return cached array or None
+	def get(self, key: str) -> np.ndarray | None:
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return self.entries[key]
+
+		if key in self.files:
+			try:
+				data = np.load(self.fileName(key))
+				self.removeFile(key)
+				self.put(key, data)
+				self.hits += 1
+				return data
+			except (OSError, ValueError) as e:
+				print(f"Cannot read cache file {self.fileName(key)}: {e}")
+				self.removeFile(key)
+
+		self.misses += 1
+		return None
+
+	# Add array to cache. Arrays larger than the memory limit are not cached
+	def put(self, key: str, data: np.ndarray):
+		if data.nbytes > self.maxMemory:
+			return
+		if key in self.entries:
+			self.memory -= self.entries.pop(key).nbytes
+		self.entries[key] = data
+		self.memory += data.nbytes
+
+		while self.memory > self.maxMemory:
+			oldKey, oldData = self.entries.popitem(last=False)
+			self.memory -= oldData.nbytes
+			self.spill(oldKey, oldData)
+
+	# Move all entries from memory to disk, i.e. before the program ends
+	def flush(self):
+		while len(self.entries) > 0:
+			key, data = self.entries.popitem(last=False)
+			self.memory -= data.nbytes
+			self.spill(key, data)
+
+	# Remove all entries from memory and disk
+	def clear(self):
+		self.entries.clear()
+		self.memory = 0
+		for key in list(self.files):
+			self.removeFile(key)
+
+	def fileName(self, key: str) -> str:
+		return os.path.join(self.directory, key + '.npy')
+
+	# Write entry removed from memory to disk
+	def spill(self, key: str, data: np.ndarray):
+		if self.directory is None or data.nbytes > self.maxDiskSize:
+			return
+		try:
+			np.save(self.fileName(key), data)
+			self.files[key] = os.path.getsize(self.fileName(key))
+			self.diskSize += self.files[key]
+			self.trimDisk()
+		except OSError as e:
+			print(f"Cannot write cache file {self.fileName(key)}: {e}")
+
+	def removeFile(self, key: str):
+		self.diskSize -= self.files.pop(key)
+		try:
+			os.remove(self.fileName(key))
+		except OSError:
+			pass
+
+	# Delete least recently used files until the disk limit is met
+	def trimDisk(self):
+		while self.diskSize > self.maxDiskSize and len(self.files) > 0:
+			self.removeFile(next(iter(self.files)))
@@ -0,0 +1,114 @@
+#
+# Binary sidecar files of fractal definitions
+#
+# A fractal definition file (.frc) contains only the settings. The sidecar
+# file with the same name and extension .npz contains the drawn image, the
+# iteration data, the reference orbit and a thumbnail. The file is an
+# uncompressed numpy .npz file, so the arrays are mapped into memory when
+# the file is loaded, see reforbit.loadArrays().
+#
+# The header contains the cache keys of the drawn image, see
+# Drawer.getCacheKeys(). When a fractal definition is loaded, the image is
+# shown or recolored from the iteration data only if the keys of the
+# loaded settings match. Otherwise the fractal is drawn again. The
+# reference orbit is reused, if it has been calculated with the same
+# parameters.
+#
+
+import os
+import json
+
+import numpy as np
+
+import reforbit as ro
+import export as ex
+
+
+# Increase, if the meaning of the stored data changes
+SIDECAR_VERSION = 2
+
+# Maximum width or height of thumbnail
+THUMBNAIL_SIZE = 256
+
+
+# Return name of sidecar file of a fractal definition file
+def sidecarFile(fileName: str) -> str:
+	return os.path.splitext(fileName)[0] + '.npz'
+
+# Create thumbnail of image map. The image map contains the bottom row first, the
+# thumbnail contains the top row first, so it can be shown without the drawer
+def createThumbnail(imageMap: np.ndarray, maxSize: int = THUMBNAIL_SIZE) -> np.ndarray:
+	image = ex.toImage(imageMap)
+	image.thumbnail((maxSize, maxSize))
+	return np.asarray(image)
+
+
+###############################################################################
+#
+# Sidecar data
+#
+# Attributes:
+#
+#   header    - Dictionary with version, image size, fractal area and the
+#               keys dataKey, imageKey and orbitKey
+#   imageMap  - Image array with shape (height, width, 3) or None
+#   dataMap   - Iteration data with shape (height, width, ID_SIZE) or None
+#   thumbnail - Reduced image with top row first
+#   arrays    - All arrays of the file, the reference orbit is prefixed by 'ref_'
+#
+# Arrays of a loaded sidecar are read-only memory maps.
+#
+###############################################################################
+
+class Sidecar:
+
+	def __init__(self, header: dict, arrays: dict):
+		self.header    = header
+		self.arrays    = arrays
+		self.imageMap  = arrays.get('imageMap')
+		self.dataMap   = arrays.get('dataMap')
+		self.thumbnail = arrays.get('thumbnail')
+
+	# Return stored reference orbit, if it has been calculated with parameters matching orbitKey.
+	# The orbit is copied, because the fractal keeps it. A memory map would prevent replacing
+	# the sidecar file on Windows, when it's saved again
+	def getReference(self, orbitKey: str) -> ro.ReferenceOrbit | None:
+		if self.header.get('orbitKey') != orbitKey or 'ref_orbit' not in self.arrays:
+			return None
+		reference = ro.ReferenceOrbit.fromArrays(self.arrays, prefix='ref_')
+		reference.orbit = np.array(reference.orbit)
+		return reference
+
+	# Save sidecar file. The file is written to a temporary file first, so
+	# a sidecar file is never left incomplete
+	@staticmethod
+	def save(fileName: str, header: dict, imageMap: np.ndarray, dataMap: np.ndarray | None = None,
+			 refOrbit: ro.ReferenceOrbit | None = None):
+		arrays = {
+			'header':    np.array(json.dumps(dict(header, version=SIDECAR_VERSION))),
+			'imageMap':  imageMap,
+			'thumbnail': createThumbnail(imageMap)
+		}
+		if dataMap is not None:
+			arrays['dataMap'] = dataMap
+		if refOrbit is not None:
+			arrays.update(refOrbit.getArrays(prefix='ref_'))
+
+		# Passing a file object prevents numpy from appending .npz to the name
+		with open(fileName + '.tmp', 'wb') as f:
+			np.savez(f, **arrays)
+		os.replace(fileName + '.tmp', fileName)
+
+	# Load sidecar file. Returns None, if the file doesn't exist or has another version
+	@classmethod
+	def load(cls, fileName: str) -> 'Sidecar | None':
+		if not os.path.isfile(fileName):
+			return None
+
+		arrays = ro.loadArrays(fileName, mmap=True)
+		header = json.loads(str(arrays['header'][()]))
+		if header.get('version') != SIDECAR_VERSION:
+			print(f"Ignoring sidecar file {fileName} of version {header.get('version')}")
+			return None
+
+		return cls(header, arrays)
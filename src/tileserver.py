@@ -0,0 +1,366 @@
+#
+# Tile pyramid renderer and local tile server
+#
+# The fractal area of a fractal definition (.frc file) is the root tile of a
+# quadtree. At zoom level z the area is divided into 2^z x 2^z tiles of
+# tileSize x tileSize pixels. Tiles are addressed by z/x/y like slippy map
+# tiles, y counts from top to bottom.
+#
+# Tiles are rendered on demand by a limited number of worker threads.
+# Concurrent requests of the same tile wait for the same rendering job.
+# The parallel calculation kernels of numba must not be called by several
+# threads at once, so tiles are calculated one after another. The workers
+# only encode the PNG data of tiles in parallel.
+# Rendered tiles are stored as PNG data in a render cache with LRU eviction
+# in memory and on disk. Tiles calculated with perturbation share the
+# reference orbit of the tile orbitLevels zoom levels above.
+#
+# Usage:
+#
+#   python tileserver.py fractal.frc [--port 8000] [--cache directory]
+#
+# The server shows the tiles with Leaflet at http://localhost:8000/
+#
+
+import io
+import re
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+import tkconfigure.tkconfigure as tkc
+
+import colors as col
+import fractal as frc
+import mandelbrot as man
+import julia as jul
+import engine as eng
+import rendercache as rc
+import export as ex
+
+
+# Fractal classes by fractal type
+fractalClasses = {
+	'Mandelbrot': man.Mandelbrot,
+	'Julia':      jul.Julia
+}
+
+
+###############################################################################
+#
+# Create fractal and palette from fractal definition
+#
+#   js - Settings in the format of .frc files, see Application.getSettings()
+#
+# Returns:
+#
+#   Tuple (fractal, fractalType, palette)
+#
+###############################################################################
+def createFractal(js: dict) -> tuple[frc.Fractal, str, np.ndarray]:
+	for section in ('application', 'fractal'):
+		if section not in js:
+			raise KeyError(f"Missing section {section} in JSON")
+
+	fractalType = js['application']['fractalType']
+	if fractalType not in fractalClasses:
+		raise KeyError(f"Unknow fractal type {fractalType}")
+
+	# Files of older versions contain the perturbation flag instead of the engine
+	if js['fractal'].pop('perturbation', 0) == 1:
+		js['fractal']['engine'] = 'Perturbation'
+
+	fractal = fractalClasses[fractalType]()
+	setFractalConfig(fractal, js['fractal'])
+
+	defColor = col.str2rgb(js['application']['defColor'])
+	palette = col.createPaletteFromDef(js['application']['colorTable'], defColor=defColor)
+
+	return (fractal, fractalType, palette)
+
+# Set fractal settings without input mask. TKConfigure.setConfig() requires
+# widgets for nested settings like the light source
+def setFractalConfig(fractal: frc.Fractal, config: dict):
+	for id, value in config.items():
+		if isinstance(value, dict):
+			fractal.settings[id].setConfig(value, simple=True)
+		else:
+			fractal.settings.set(id, value, init=True)
+
+
+###############################################################################
+#
+# Tile pyramid renderer
+#
+#   fractal - Fractal with the area of the root tile. The area is extended
+#     to a square
+#   fractalType - Fractal type
+#   palette - Color palette
+#   tileSize - Width and height of tiles in pixels
+#   cache - Render cache for tile images
+#   workers - Number of worker threads. Tiles are calculated one after
+#     another with all CPU cores, only PNG encoding runs in parallel
+#   maxPending - Maximum number of tiles waiting for rendering
+#
+###############################################################################
+
+class TileRenderer:
+
+	# Tiles with perturbation share the reference orbit of the tile orbitLevels levels above
+	orbitLevels = 2
+
+	# Maximum number of shared reference orbits
+	maxOrbits = 16
+
+	def __init__(self, fractal: frc.Fractal, fractalType: str, palette: np.ndarray, tileSize: int = 256, cache: rc.RenderCache | None = None,
+				 workers: int = 1, maxPending: int = 64, maxZoom: int = 40):
+		self.fractalType = fractalType
+		self.palette     = palette
+		self.tileSize    = tileSize
+		self.cache       = cache if cache is not None else rc.RenderCache(maxMemory=64 * 2**20)
+		self.maxPending  = maxPending
+		self.maxZoom     = maxZoom
+
+		# Fractal settings, a copy of the fractal is used by every worker thread
+		self.config = fractal.settings.getConfig(simple=True)
+		self.fractalClass = type(fractal)
+		self.local = threading.local()
+
+		# Root tile
+		(corner, cornerLo), size = fractal.getCornerDD(), fractal.settings['size']
+		side = max(size.real, size.imag)
+		self.corner, self.cornerLo = frc.addComplexDD(corner, cornerLo, (size - complex(side, side)) / 2.0)
+		self.side = side
+
+		# Identifies the tile pyramid in the render cache
+		self.definition = rc.hashKey('tiles', fractalType, fractal.settings.getJSON(), palette, tileSize)
+
+		# The lock is reentrant, because callbacks of finished jobs are called immediately
+		self.executor = ThreadPoolExecutor(max_workers=workers)
+		self.lock = threading.RLock()
+		self.pending = {}
+
+		self.orbitLock = threading.Lock()
+		self.orbits = OrderedDict()
+
+		# Serializes the calculation of tiles, see renderTile()
+		self.calcLock = threading.Lock()
+
+	# Return fractal area (corner, size, cornerLo) of tile, see Fractal.getCornerDD(). Adjacent tiles don't
+	# overlap, the last pixel of a tile is one pixel spacing away from the first pixel of the next tile
+	def getTileArea(self, z: int, x: int, y: int) -> tuple[complex, complex, complex]:
+		n = 1 << z
+		side = self.side / n
+		corner, cornerLo = frc.addComplexDD(self.corner, self.cornerLo, complex(x * side, (n-1-y) * side))
+		size = side * (self.tileSize-1) / self.tileSize
+		return (corner, complex(size, size), cornerLo)
+
+	def isValidTile(self, z: int, x: int, y: int) -> bool:
+		return 0 <= z <= self.maxZoom and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+	###############################################################################
+	#
+	# Get PNG image of tile
+	#
+	# The tile is rendered, if it's not cached. Concurrent requests of the same
+	# tile wait for the same job.
+	#
+	# Returns:
+	#
+	#   PNG data or None, if too many tiles are waiting for rendering
+	#
+	###############################################################################
+	def getTile(self, z: int, x: int, y: int) -> bytes | None:
+		key = rc.hashKey(self.definition, z, x, y)
+
+		with self.lock:
+			data = self.cache.get(key)
+			if data is not None:
+				return data.tobytes()
+
+			future = self.pending.get(key)
+			if future is None:
+				if len(self.pending) >= self.maxPending:
+					return None
+				future = self.executor.submit(self.renderTile, z, x, y)
+				self.pending[key] = future
+				future.add_done_callback(lambda f: self.tileRendered(key, f))
+
+		return future.result()
+
+	# Store rendered tile in cache
+	def tileRendered(self, key: str, future: Future):
+		with self.lock:
+			del self.pending[key]
+			if future.exception() is None:
+				self.cache.put(key, np.frombuffer(future.result(), dtype=np.uint8))
+
+	# Return fractal of current worker thread
+	def getFractal(self) -> frc.Fractal:
+		if not hasattr(self.local, 'fractal'):
+			self.local.fractal = self.fractalClass()
+			setFractalConfig(self.local.fractal, self.config)
+		return self.local.fractal
+
+	# Render tile, returns PNG data
+	def renderTile(self, z: int, x: int, y: int) -> bytes:
+		fractal = self.getFractal()
+		corner, size, cornerLo = self.getTileArea(z, x, y)
+		fractal.setDimensions(corner, size, sync=False, cornerLo=cornerLo)
+
+		# Concurrent calls of parallel numba kernels abort the process with the default threading layer
+		with self.calcLock:
+			engineClass, reason = eng.selectEngine(fractal, self.fractalType, self.tileSize, self.tileSize, self.palette)
+			if engineClass is None:
+				raise ValueError(f"Fractal type '{self.fractalType}' not supported by engine")
+			print(f"Rendering tile {z}/{x}/{y} with {engineClass.name} engine, {reason}")
+
+			reference = self.getReference(fractal, z, x, y) if engineClass.perturbation else None
+			oversampling, jitter = fractal.settings.getValues(['oversampling', 'jitter'])
+			fractal.beginCalc(self.tileSize, self.tileSize, engineClass.perturbation, engineClass.getDeltaScale(fractal), reference=reference,
+							  oversampling=oversampling, jitter=bool(jitter))
+			engine = engineClass(fractal, self.fractalType, self.palette, fractal.getCalcParameters())
+			imageMap = engine.calculateArea(0, 0, self.tileSize-1, self.tileSize-1)
+			fractal.endCalc()
+
+		output = io.BytesIO()
+		ex.toImage(imageMap).save(output, 'png', **ex.formats['PNG (fast)'][2])
+		return output.getvalue()
+
+	# Return reference orbit shared by the tiles of the tile orbitLevels levels above
+	def getReference(self, fractal: frc.Fractal, z: int, x: int, y: int):
+		levels = min(z, self.orbitLevels)
+		maxIter = fractal.getMaxValue()
+		bailout = frc.Fractal.getBailout(*fractal.settings.getValues(['colorize', 'paletteMode', 'colorOptions']))
+		key = (z-levels, x >> levels, y >> levels, maxIter, bailout)
+
+		with self.orbitLock:
+			if key in self.orbits:
+				self.orbits.move_to_end(key)
+				return self.orbits[key]
+
+			corner, size, _ = self.getTileArea(*key[:3])
+			if fractal.settings['autoReference']:
+				refPoint = fractal.selectReference(corner, size, maxIter, bailout)
+			else:
+				refPoint = corner + size / 2.0
+			orbit = fractal.createReferenceOrbit(refPoint, maxIter, bailout)
+			print(f"Shared reference point {refPoint} of tile {key[0]}/{key[1]}/{key[2]}, reference orbit length {len(orbit)}")
+
+			self.orbits[key] = orbit
+			if len(self.orbits) > self.maxOrbits:
+				self.orbits.popitem(last=False)
+			return orbit
+
+	def shutdown(self):
+		self.executor.shutdown(wait=True)
+		self.cache.flush()
+
+
+###############################################################################
+#
+# HTTP server for tiles
+#
+#   /             - Tile viewer (Leaflet)
+#   /z/x/y.png    - Tile
+#
+###############################################################################
+
+viewerPage = """<!DOCTYPE html>
+<html>
+<head>
+<title>PyFracExplore</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html, body, #map { width: 100%; height: 100%; margin: 0; background: #000; }</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var map = L.map('map', { crs: L.CRS.Simple, minZoom: 0, maxZoom: MAXZOOM });
+var bounds = [[-TILESIZE, 0], [0, TILESIZE]];
+L.tileLayer('/{z}/{x}/{y}.png', { tileSize: TILESIZE, noWrap: true, bounds: bounds, maxZoom: MAXZOOM }).addTo(map);
+map.fitBounds(bounds);
+</script>
+</body>
+</html>
+"""
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+
+	renderer = None
+
+	def do_GET(self):
+		if self.path in ('/', '/index.html'):
+			page = viewerPage.replace('MAXZOOM', str(self.renderer.maxZoom)).replace('TILESIZE', str(self.renderer.tileSize))
+			self.sendData(200, 'text/html', page.encode())
+			return
+
+		match = re.fullmatch(r'/(\d+)/(\d+)/(\d+)\.png', self.path)
+		if match is None or not self.renderer.isValidTile(*map(int, match.groups())):
+			self.sendData(404, 'text/plain', b"Tile not found")
+			return
+
+		try:
+			data = self.renderer.getTile(*map(int, match.groups()))
+		except Exception as e:
+			print(f"Error rendering tile {self.path}: {e}")
+			self.sendData(500, 'text/plain', b"Cannot render tile")
+			return
+
+		if data is None:
+			self.sendData(503, 'text/plain', b"Too many pending tiles")
+		else:
+			self.sendData(200, 'image/png', data)
+
+	def sendData(self, status: int, contentType: str, data: bytes):
+		self.send_response(status)
+		self.send_header('Content-Type', contentType)
+		self.send_header('Content-Length', str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+
+# Serve tiles until the server is stopped with Ctrl+C
+def serveTiles(renderer: TileRenderer, host: str = 'localhost', port: int = 8000):
+	handler = type('Handler', (TileRequestHandler,), {'renderer': renderer})
+	server = ThreadingHTTPServer((host, port), handler)
+	print(f"Serving tiles at http://{host}:{port}/")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		renderer.shutdown()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Serve tiles of a fractal definition")
+	parser.add_argument('filename', help="Fractal definition (.frc)")
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--port', type=int, default=8000)
+	parser.add_argument('--tilesize', type=int, default=256, help="Tile size in pixels")
+	parser.add_argument('--maxzoom', type=int, default=40, help="Maximum zoom level")
+	parser.add_argument('--workers', type=int, default=1, help="Number of worker threads, tiles are calculated one after another")
+	parser.add_argument('--cache', default=None, help="Directory for cached tiles")
+	parser.add_argument('--cachesize', type=int, default=1024, help="Maximum size of cache directory in MB")
+	args = parser.parse_args()
+
+	with open(args.filename, "r") as inputFile:
+		js = json.load(inputFile, object_hook=tkc.TKConfigure._decodeJSON)
+	fractal, fractalType, palette = createFractal(js)
+
+	cache = rc.RenderCache(maxMemory=64 * 2**20, directory=args.cache, maxDiskSize=args.cachesize * 2**20)
+	renderer = TileRenderer(fractal, fractalType, palette, tileSize=args.tilesize, cache=cache, workers=args.workers,
+							maxZoom=args.maxzoom)
+	serveTiles(renderer, args.host, args.port)
+
+
+if __name__ == "__main__":
+	main()
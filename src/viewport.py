@@ -0,0 +1,185 @@
+#
+# Virtual viewport
+#
+# Images larger than the drawing frame are shown in a scrollable canvas
+# without calculating the whole image. The image is divided into tiles at
+# the display resolution. Only the tiles in the visible part of the canvas
+# and a margin around it are calculated and converted to photo images.
+# More tiles are calculated, when the view is scrolled. Tiles far outside
+# of the view are released. The image is calculated in full resolution
+# only on export, see Application.onImageSaveAs().
+#
+# Tiles are calculated by poster.PosterRenderer with a copy of the fractal,
+# so all tiles share one engine and one reference orbit. Tiles are
+# calculated one by one in the Tk event loop, so the GUI stays responsive.
+#
+
+import math
+import json
+import time
+
+from PIL import Image as Img
+from PIL import ImageTk
+
+import tkconfigure.tkconfigure as tkc
+
+import tileserver as ts
+import poster as po
+
+
+class Viewport:
+
+	def __init__(self, app: object, width: int, height: int):
+		self.app      = app
+		self.width    = width
+		self.height   = height
+		self.canvas   = app.gui.drawFrame.canvas
+		self.bDrawing = False
+		self.cancel   = False
+		self.calcTime = 0.0
+		self.onStatus = None
+
+		# The viewport never has an image map, images are exported with the poster renderer
+		self.bImage = False
+
+		# Tile size in display pixels, number of tiles calculated around the visible tiles
+		# and maximum number of tiles kept
+		self.tileSize = 256
+		self.margin = 1
+		self.maxTiles = 256
+
+		# Renderer for tiles of the display size, created by drawFractal()
+		self.renderer = None
+		self.scaleFactor = 1.0
+		self.displaySize = (width, height)
+
+		# Calculated tiles (tx, ty) => (photo image, canvas item), tiles to be calculated
+		# and id of scheduled calculation
+		self.tiles = {}
+		self.queue = []
+		self.job = None
+
+	# Start drawing of visible tiles. Tiles are calculated in the background of the
+	# Tk event loop, the method returns before the tiles are drawn
+	def drawFractal(self, fractal: object, onStatus=None) -> bool:
+		self.onStatus = onStatus
+		fractal.updateParameters()
+		fractal.adjustAspectRatio(self.width, self.height, *fractal.settings.getValues(['corner', 'size']))
+		return self.showImage(self.app['autoScale'])
+
+	# Show viewport. If scale is 1, the image is reduced to fit in the drawing frame
+	def showImage(self, scale: int) -> bool:
+		self.close()
+
+		frameWidth, frameHeight = self.app.gui.drawFrame.winfo_width(), self.app.gui.drawFrame.winfo_height()
+		if scale == 1 and max(self.width, self.height) > min(frameWidth, frameHeight):
+			self.scaleFactor = min(frameWidth, frameHeight) / max(self.width, self.height)
+		else:
+			self.scaleFactor = 1.0
+		self.displaySize = (max(int(self.width * self.scaleFactor), 1), max(int(self.height * self.scaleFactor), 1))
+
+		# Tiles are calculated with a copy of the fractal, the renderer changes the fractal area
+		js = json.loads(tkc.TKConfigure.toJSON(self.app.getSettings()), object_hook=tkc.TKConfigure._decodeJSON)
+		fractal, fractalType, palette = ts.createFractal(js)
+		self.renderer = po.PosterRenderer(fractal, fractalType, palette, *self.displaySize, self.tileSize)
+		if self.onStatus is not None:
+			self.onStatus({'engine': f"{self.renderer.engineClass.name} (viewport {self.scaleFactor:.3g}x)", 'update': False})
+
+		# The canvas shows the visible part of the image, the scroll region covers the whole image
+		displayWidth, displayHeight = self.displaySize
+		self.canvas.configure(width=min(displayWidth, frameWidth), height=min(displayHeight, frameHeight),
+							  scrollregion=(0, 0, displayWidth, displayHeight),
+							  xscrollcommand=self.onXScroll, yscrollcommand=self.onYScroll)
+		self.canvas.xview_moveto(0)
+		self.canvas.yview_moveto(0)
+		self.calcTime = 0.0
+		self.cancel = False
+		self.update()
+		return True
+
+	# Stop calculation, remove tiles and restore scrollbar handling of the canvas
+	def close(self):
+		if self.job is not None:
+			self.canvas.after_cancel(self.job)
+			self.job = None
+		for _, item in self.tiles.values():
+			self.canvas.delete(item)
+		self.tiles = {}
+		self.queue = []
+		self.bDrawing = False
+		frame = self.app.gui.drawFrame
+		self.canvas.configure(xscrollcommand=frame.hScroll.set, yscrollcommand=frame.vScroll.set)
+
+	def onXScroll(self, first: str, last: str):
+		self.app.gui.drawFrame.hScroll.set(first, last)
+		self.update()
+
+	def onYScroll(self, first: str, last: str):
+		self.app.gui.drawFrame.vScroll.set(first, last)
+		self.update()
+
+	# Return range of tiles (tx1, ty1, tx2, ty2) in the visible part of the canvas, end points included
+	def getVisibleTiles(self) -> tuple[int, int, int, int]:
+		x1, y1 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+		x2, y2 = x1 + self.canvas.winfo_width() - 1, y1 + self.canvas.winfo_height() - 1
+		maxX, maxY = (self.displaySize[0] - 1) // self.tileSize, (self.displaySize[1] - 1) // self.tileSize
+		return (max(int(x1) // self.tileSize, 0), max(int(y1) // self.tileSize, 0),
+				min(int(x2) // self.tileSize, maxX), min(int(y2) // self.tileSize, maxY))
+
+	# Queue missing tiles of the visible part and the margin, nearest tiles first.
+	# Tiles far from the view are released, if more than maxTiles tiles are kept
+	def update(self):
+		if self.renderer is None:
+			return
+		tx1, ty1, tx2, ty2 = self.getVisibleTiles()
+		cx, cy = (tx1 + tx2) / 2, (ty1 + ty2) / 2
+		tiles = [(tx, ty) for ty in range(max(ty1 - self.margin, 0), ty2 + self.margin + 1)
+				 for tx in range(max(tx1 - self.margin, 0), tx2 + self.margin + 1)
+				 if tx * self.tileSize < self.displaySize[0] and ty * self.tileSize < self.displaySize[1]]
+		distance = lambda tile: math.hypot(tile[0] - cx, tile[1] - cy)
+		self.queue = sorted([tile for tile in tiles if tile not in self.tiles], key=distance)
+
+		if len(self.tiles) > self.maxTiles:
+			for tile in sorted(self.tiles, key=distance, reverse=True)[:len(self.tiles) - self.maxTiles]:
+				self.canvas.delete(self.tiles.pop(tile)[1])
+
+		if self.queue and self.job is None and not self.cancel:
+			self.bDrawing = True
+			self.job = self.canvas.after_idle(self.drawNextTile)
+
+	# Calculate and show next tile of the queue
+	def drawNextTile(self):
+		self.job = None
+		if self.cancel or not self.queue:
+			self.bDrawing = False
+			if self.onStatus is not None:
+				self.onStatus({'drawing': "Cancelled" if self.cancel else "{:.2f} s".format(self.calcTime), 'update': False})
+			return
+
+		tx, ty = self.queue.pop(0)
+		startTime = time.perf_counter()
+		image = Img.fromarray(self.renderer.renderTile(tx, ty), 'RGB')
+		self.calcTime += time.perf_counter() - startTime
+
+		photo = ImageTk.PhotoImage(image)
+		item = self.canvas.create_image(tx * self.tileSize, ty * self.tileSize, image=photo, anchor='nw')
+		self.canvas.tag_lower(item)
+		self.tiles[(tx, ty)] = (photo, item)
+
+		if self.onStatus is not None:
+			self.onStatus({'drawing': f"{len(self.queue)} tiles ...", 'update': False})
+		self.job = self.canvas.after(1, self.drawNextTile)
+
+	# The image was moved with the mouse by (dx, dy) image pixels, see gui.Selection.onPanEnd().
+	# The view is scrolled instead of moving the fractal area
+	def panFractal(self, dx: float, dy: float, onStatus=None) -> bool:
+		for (tx, ty), (_, item) in self.tiles.items():
+			self.canvas.coords(item, tx * self.tileSize, ty * self.tileSize)
+		displayWidth, displayHeight = self.displaySize
+		self.canvas.xview_moveto((self.canvas.canvasx(0) + dx * self.scaleFactor) / displayWidth)
+		self.canvas.yview_moveto((self.canvas.canvasy(0) - dy * self.scaleFactor) / displayHeight)
+		return False
+
+	# The viewport has no image to be saved in a sidecar file
+	def saveSidecar(self, fileName: str) -> bool:
+		return False